@@ -1,3 +1,4 @@
+import sys
 import time
 from pyv.models.model import Model
 from pyv.models.singlecycle import SingleCycleModel
@@ -6,7 +7,7 @@ from pyv.models.singlecycle import SingleCycleModel
 def execute_bin(
         core_type: str,
         program_name: str,
-        path_to_bin: str,
+        path_to_elf: str,
         num_cycles: int) -> Model:
     print("===== " + program_name + " =====")
 
@@ -15,21 +16,27 @@ def execute_bin(
     if core_type == 'single':
         core = SingleCycleModel()
 
-    # Load binary into memory
-    print("* Loading binary...")
-    core.load_binary(path_to_bin)
+    # Load program into memory
+    print("* Loading program...")
+    core.load_elf(path_to_elf)
 
     # Set probes
     core.setProbes([])
 
+    # Let the program exit and print (see pyv/semihost.py)
+    host = core.enable_semihosting(stream=sys.stdout)
+
     # Simulate
     print("* Starting simulation...\n")
 
     start = time.perf_counter()
-    core.run(num_cycles)
+    core.run_until(max_cycles=num_cycles)
     end = time.perf_counter()
 
-    print(f"Simulation done at cycle {core.getCycles()} after {end-start}s.\n")
+    print(f"Simulation done at cycle {core.getCycles()} after {end-start}s.")
+    if host.exit_code is not None:
+        print(f"Program exited with code {host.exit_code}.")
+    print("")
 
     return core
 
@@ -37,10 +44,10 @@ def execute_bin(
 def loop_acc():
     core_type = 'single'
     program_name = 'LOOP_ACC'
-    path_to_bin = 'programs/loop_acc/loop_acc.bin'
+    path_to_elf = 'programs/loop_acc/loop_acc.out'
     num_cycles = 2010
 
-    core = execute_bin(core_type, program_name, path_to_bin, num_cycles)
+    core = execute_bin(core_type, program_name, path_to_elf, num_cycles)
 
     # Print register and memory contents
     print("x1 = " + str(core.readReg(1)))
@@ -54,23 +61,23 @@ def loop_acc():
 def fibonacci():
     core_type = 'single'
     program_name = 'FIBONACCI'
-    path_to_bin = 'programs/fibonacci/fibonacci.bin'
-    num_cycles = 140
+    path_to_elf = 'programs/fibonacci/fibonacci.out'
+    num_cycles = 1000
 
-    core = execute_bin(core_type, program_name, path_to_bin, num_cycles)
+    core = execute_bin(core_type, program_name, path_to_elf, num_cycles)
 
     # Print result
-    print("Result = ", core.readDataMem(2048, 4))
+    print("Result = ", core.readDataMem('result', 4))
     print("")
 
 
 def endless_loop():
     core_type = 'single'
     program_name = 'ENDLESS_LOOP'
-    path_to_bin = 'programs/endless_loop/endless_loop.bin'
+    path_to_elf = 'programs/endless_loop/endless_loop.out'
     num_cycles = 1000
 
-    execute_bin(core_type, program_name, path_to_bin, num_cycles)
+    execute_bin(core_type, program_name, path_to_elf, num_cycles)
 
 
 def main():
@@ -0,0 +1,24 @@
+// Semihosting helpers (see pyv/semihost.py)
+#ifndef SEMIHOST_H
+#define SEMIHOST_H
+
+extern volatile unsigned tohost;
+extern volatile unsigned console;
+
+// Exits the simulation with exit code `code`
+static inline void sim_exit(int code) {
+    tohost = (code << 1) | 1;
+    while (1);
+}
+
+// Prints a character/string to the host console
+static inline void sim_putc(char c) {
+    console = c;
+}
+
+static inline void sim_puts(const char *s) {
+    while (*s)
+        sim_putc(*s++);
+}
+
+#endif
@@ -1,10 +1,13 @@
+#include "../common/semihost.h"
+
 #define N 10
 
-int main() {
-    volatile unsigned * result = (unsigned*) 2048;
+// Placed at 2048 by the linker (see Makefile)
+extern volatile unsigned result;
 
+int main() {
     if(N < 2)
-        *result = N;
+        result = N;
     else {
         int a = 0;
         int b = 1;
@@ -14,8 +17,9 @@ int main() {
             b = c;
             c = a + b;
         }
-        *result = c;
+        result = c;
     }
 
-    while (1);
+    sim_puts("fibonacci done\n");
+    return 0;
 }
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""Batch runner for many programs/configurations.
+
+Runs a list of jobs across a pool of worker processes. Each worker elaborates
+its own model, loads the job's binary, simulates it for the job's cycle
+budget, and returns a compact `JobResult`. ELF programs that define a
+`tohost` symbol stop as soon as they exit (see `pyv.semihost`).
+
+Example:
+
+    jobs = [
+        Job('programs/loop_acc/loop_acc.out', cycles=2010, regs=[1, 2]),
+        Job('programs/fibonacci/fibonacci.out', cycles=1000,
+            mem=[(2048, 4)]),
+    ]
+    for res in run_batch(jobs):
+        print(res.name, res.cycles, res.wall_time, res.regs, res.mem)
+
+The same is available from the command line:
+
+    python3 -m pyv.batch programs/*/*.out --cycles 1000 --regs 1 2 \\
+        --mem 0x800:4
+
+Jobs can also be read from a JSON file (`--jobs-file`), which contains a list
+of objects with the fields of `Job`. Results are written as JSON lines.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+from pyv.elf import is_elf
+from pyv.models.singlecycle import SingleCycleModel
+
+MODELS = {
+    'single': SingleCycleModel,
+}
+"""Available model types"""
+
+
+@dataclass
+class Job:
+    """A single simulation job."""
+    binary: str
+    """Path to the program (an ELF file, or a raw binary loaded at 0)"""
+    model: str = 'single'
+    """Model type (see `MODELS`)"""
+    cycles: int = 1000
+    """Number of cycles to simulate"""
+    regs: list[int] = field(default_factory=list)
+    """Registers to collect"""
+    mem: list[tuple[int, int]] = field(default_factory=list)
+    """Memory ranges to collect, as `(address, number of bytes)`"""
+    name: str = ''
+    """Job name. Defaults to the binary's file name."""
+
+    def __post_init__(self):
+        if not self.name:
+            self.name = os.path.basename(self.binary)
+        self.mem = [tuple(r) for r in self.mem]
+
+
+@dataclass
+class JobResult:
+    """Result of a simulation job."""
+    name: str
+    """Job name"""
+    cycles: int = 0
+    """Number of simulated cycles"""
+    wall_time: float = 0.0
+    """Wall time of the job in seconds (elaboration, loading, simulation)"""
+    pc: int = 0
+    """Final program counter"""
+    regs: dict[int, int] = field(default_factory=dict)
+    """Collected registers"""
+    mem: dict[int, bytes] = field(default_factory=dict)
+    """Collected memory ranges, by start address"""
+    exit_code: Optional[int] = None
+    """Exit code, if the program exited (see `pyv.semihost`)"""
+    output: str = ''
+    """Console output of the program (see `pyv.semihost`)"""
+    error: Optional[str] = None
+    """Error message, if the job failed"""
+
+    @property
+    def ok(self) -> bool:
+        """Whether the job succeeded."""
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        """Returns the result as a JSON-serializable dict. Memory contents
+        are hex strings."""
+        res = asdict(self)
+        res['mem'] = {addr: data.hex() for addr, data in self.mem.items()}
+        return res
+
+
+def run_job(job: Job) -> JobResult:
+    """Runs a single job in the current process.
+
+    Exceptions are not raised, but reported in `JobResult.error`.
+
+    Args:
+        job (Job): The job to run.
+
+    Returns:
+        JobResult: The result.
+    """
+    res = JobResult(job.name)
+    start = time.perf_counter()
+    try:
+        if job.model not in MODELS:
+            raise ValueError(f"Unknown model type '{job.model}'")
+        # Keep the model's progress messages out of the results stream
+        with contextlib.redirect_stdout(io.StringIO()):
+            model = MODELS[job.model]()
+        if is_elf(job.binary):
+            model.load_elf(job.binary)
+        else:
+            model.load_binary(job.binary)
+        if 'tohost' in model.symbols:
+            # The program can exit before the cycle budget is used up
+            host = model.enable_semihosting()
+            model.run_until(max_cycles=job.cycles)
+            res.exit_code = host.exit_code
+            res.output = host.text
+        else:
+            model.run(job.cycles)
+
+        res.cycles = model.getCycles()
+        res.pc = model.readPC()
+        res.regs = {r: model.readReg(r) for r in job.regs}
+        res.mem = {addr: model.readDataBytes(addr, n) for addr, n in job.mem}
+    except Exception:
+        res.error = traceback.format_exc(limit=1).strip()
+    res.wall_time = time.perf_counter() - start
+    return res
+
+
+def run_batch(jobs: list[Job], max_workers: int = None) -> list[JobResult]:
+    """Runs jobs across a pool of worker processes.
+
+    Args:
+        jobs (list[Job]): The jobs to run.
+        max_workers (int, optional): Number of worker processes. Defaults to
+            the number of CPUs.
+
+    Returns:
+        list[JobResult]: The results, in the same order as `jobs`.
+    """
+    if not jobs:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(run_job, jobs))
+
+
+def _parse_mem_range(arg: str) -> tuple[int, int]:
+    addr, _, n = arg.partition(':')
+    return int(addr, 0), int(n or '4', 0)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m pyv.batch',
+        description='Run many programs across worker processes.')
+    parser.add_argument('binaries', nargs='*',
+                        help='program binaries (one job each)')
+    parser.add_argument('--jobs-file',
+                        help='JSON file with a list of jobs')
+    parser.add_argument('--model', default='single', choices=list(MODELS),
+                        help='model type (default: %(default)s)')
+    parser.add_argument('--cycles', type=int, default=1000,
+                        help='cycles per job (default: %(default)s)')
+    parser.add_argument('--regs', type=int, nargs='*', default=[],
+                        help='registers to collect')
+    parser.add_argument('--mem', type=_parse_mem_range, nargs='*',
+                        default=[], metavar='ADDR[:N]',
+                        help='memory ranges to collect (default N: 4)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: #CPUs)')
+    parser.add_argument('-o', '--output',
+                        help='write results to this file instead of stdout')
+    args = parser.parse_args(argv)
+    if not args.binaries and not args.jobs_file:
+        parser.error('no jobs given')
+    return args
+
+
+def main(argv: list[str] = None) -> int:
+    """Command line interface.
+
+    Returns:
+        int: Exit code (1 if any job failed).
+    """
+    args = _parse_args(argv)
+
+    jobs = [Job(b, args.model, args.cycles, args.regs, args.mem)
+            for b in args.binaries]
+    if args.jobs_file:
+        with open(args.jobs_file) as f:
+            jobs += [Job(**j) for j in json.load(f)]
+
+    results = run_batch(jobs, args.workers)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for res in results:
+            out.write(json.dumps(res.to_dict()) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    return 0 if all(res.ok for res in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""Checkpoints of the complete simulation state.
+
+A checkpoint contains the state of every object of a design: the values of
+all root ports (and with them all register outputs), the internal state of
+registers, register files and memories, and the plain (data) attributes of all
+modules. It also contains the simulator state: the cycle count, pending
+events, and the process methods pending in the change queue.
+
+Attributes that are neither plain data nor part of the design hierarchy
+cannot be stored, and raise a `ValueError`. Classes list attributes that are
+not part of their state (e.g., caches) in `_checkpoint_exclude`.
+
+The design itself is not stored. A checkpoint is restored into a freshly
+elaborated instance of the same design, whose objects are matched by their
+position in the design hierarchy. Continuing the simulation after a restore
+gives the same results as continuing the original simulation. Objects
+with caches derived from their state can implement `_on_restore()`, which is
+called after their attributes have been restored.
+
+Event callbacks and pending process methods are stored by reference: methods
+of objects in the design by their hierarchical path, other callbacks
+(module-level functions) by their module and qualified name.
+
+File format: `MAGIC`, followed by the zlib-compressed pickled state.
+
+**Only load checkpoints from trusted sources.** Unpickling is restricted to
+plain data, and to dataclasses and enums of modules that are already
+imported, so loading a checkpoint does not run code by itself. Event
+callbacks, however, are looked up by name, and are called when the
+simulation continues.
+"""
+import builtins
+import dataclasses
+import enum
+import io
+import pickle
+import sys
+import types
+import zlib
+from pyv.clocked import Clock, Clocked
+from pyv.port import Port
+from pyv.simulator import Simulator, _EventQueue
+from pyv.util import PyVObj, obj_attrs
+
+MAGIC = b'PYVCKPT2'
+"""Header of checkpoint files (includes the format version)"""
+
+_PLAIN_TYPES = (int, float, bool, complex, str, bytes, type(None))
+
+# Attributes that are part of the design structure, not of its state
+_SKIP_ATTRS = {
+    'name', '_visited', '_ctx', '_type', '_root_driver', '_parent',
+    '_children', '_downstreamInputs', '_processMethodHandler',
+    '_stable_callbacks', '_net', '_mark_dirty',
+}
+
+_skip_attrs_cache = {}
+
+
+def _skip_attrs(cls) -> set:
+    """Returns the attributes of `cls` that are not part of the state:
+    `_SKIP_ATTRS` and the `_checkpoint_exclude` attributes of `cls` and its
+    base classes."""
+    skip = _skip_attrs_cache.get(cls)
+    if skip is None:
+        skip = set(_SKIP_ATTRS)
+        for c in cls.__mro__:
+            skip.update(c.__dict__.get('_checkpoint_exclude', ()))
+        _skip_attrs_cache[cls] = skip
+    return skip
+
+
+def _is_plain(val) -> bool:
+    """Whether `val` is plain data (that can be part of a checkpoint)."""
+    if isinstance(val, _PLAIN_TYPES):
+        return True
+    if isinstance(val, (list, tuple, bytearray)):
+        return all(_is_plain(v) for v in val)
+    if isinstance(val, dict):
+        return all(_is_plain(k) and _is_plain(v) for k, v in val.items())
+    if dataclasses.is_dataclass(val) and not isinstance(val, type):
+        return all(_is_plain(getattr(val, f.name))
+                   for f in dataclasses.fields(val))
+    return False
+
+
+def _is_node(val) -> bool:
+    return isinstance(val, (PyVObj, Clocked))
+
+
+def _is_hierarchy(val) -> bool:
+    """Whether `val` is an object of the design, or a container of them."""
+    if isinstance(val, (list, tuple)):
+        return all(_is_node(v) for v in val)
+    if isinstance(val, dict):
+        return all(_is_node(v) for v in val.values())
+    return _is_node(val)
+
+
+def _walk(top, ctx):
+    """Yields `(path, obj)` for every object of the design.
+
+    Objects are visited in a deterministic order, starting at the top module.
+    Registers, memories and ports not reachable from the top module are
+    visited at the end.
+    """
+    seen = set()
+    todo = [(top.name, top)]
+    extra = [(f'#port{i}', p) for i, p in enumerate(ctx.port_list)]
+    extra += [(f'#reg{i}', r) for i, r in enumerate(ctx.reg_list)]
+    extra += [(f'#mem{i}', m) for i, m in enumerate(ctx.mem_list)]
+    extra.reverse()
+
+    while todo or extra:
+        path, obj = todo.pop() if todo else extra.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        yield path, obj
+
+        children = []
+        skip = _skip_attrs(type(obj))
+        for key, val in obj_attrs(obj).items():
+            if key in skip:
+                continue
+            if _is_node(val):
+                children.append((f'{path}.{key}', val))
+            elif isinstance(val, (list, tuple)):
+                children += [(f'{path}.{key}[{i}]', v)
+                             for i, v in enumerate(val) if _is_node(v)]
+            elif isinstance(val, dict):
+                children += [(f'{path}.{key}[{k!r}]', v)
+                             for k, v in val.items() if _is_node(v)]
+        # Visit children in attribute order
+        todo += reversed(children)
+
+
+def _obj_state(path: str, obj) -> dict:
+    state = {}
+    skip = _skip_attrs(type(obj))
+    for key, val in obj_attrs(obj).items():
+        if key in skip:
+            continue
+        if _is_plain(val):
+            state[key] = val
+        elif not _is_hierarchy(val):
+            raise ValueError(
+                f"Cannot checkpoint {path}.{key}: {type(val).__qualname__} "
+                "is not plain data")
+    # The value of a net is stored with its root port
+    if isinstance(obj, Port) and obj._root_driver is obj:
+        val = obj._net.val
+        if not _is_plain(val):
+            raise ValueError(
+                f"Cannot checkpoint the value of {path}: "
+                f"{type(val).__qualname__} is not plain data")
+        state['_val'] = val
+    return state
+
+
+def _lookup(module: str, qualname: str):
+    """Looks up `module.qualname` in an imported module (None if it does
+    not exist)."""
+    obj = sys.modules.get(module)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name, None)
+    return obj
+
+
+def _encode_callable(fn, paths: dict):
+    owner = getattr(fn, '__self__', None)
+    if owner is not None and id(owner) in paths:
+        return ('method', paths[id(owner)], fn.__name__)
+    if isinstance(fn, types.FunctionType) and \
+            _lookup(fn.__module__, fn.__qualname__) is fn:
+        return ('function', fn.__module__, fn.__qualname__)
+    raise ValueError(f"Cannot checkpoint callback {fn!r}: Only methods of "
+                     "the design and module-level functions are supported")
+
+
+def _decode_callable(ref, objs: dict):
+    if ref[0] == 'method':
+        return getattr(objs[ref[1]], ref[2])
+    fn = _lookup(ref[1], ref[2])
+    if not isinstance(fn, types.FunctionType):
+        raise ValueError(f"Checkpoint refers to unknown function "
+                         f"{ref[1]}.{ref[2]}")
+    return fn
+
+
+def capture(top, sim: Simulator) -> dict:
+    """Captures the state of a design and its simulator.
+
+    Args:
+        top: The top module of the design.
+        sim (Simulator): The simulator.
+
+    Returns:
+        dict: The state.
+
+    Raises:
+        ValueError: An attribute, a port value, an event callback or a
+            pending method cannot be stored.
+    """
+    objs = list(_walk(top, sim.ctx))
+    paths = {id(obj): path for path, obj in objs}
+
+    events = [(t, e.period, _encode_callable(e.callback, paths))
+              for t, _, e in sorted(sim._event_queue._queue)
+              if not e.cancelled]
+    pending = [_encode_callable(fn, paths) for fn in sim._change_queue]
+
+    return {
+        'objects': {path: (type(obj).__qualname__, _obj_state(path, obj))
+                    for path, obj in objs},
+        'cycles': sim._cycles,
+        'events': events,
+        'pending': pending,
+    }
+
+
+def restore(top, sim: Simulator, state: dict):
+    """Restores a state captured with `capture()`.
+
+    The design must be elaborated (`_init()`), and must have the same
+    structure as the design the state was captured from.
+
+    Args:
+        top: The top module of the design.
+        sim (Simulator): The simulator.
+        state (dict): The state.
+
+    Raises:
+        ValueError: The state does not match the design.
+    """
+    objs = dict(_walk(top, sim.ctx))
+    saved = state['objects']
+    if objs.keys() != saved.keys():
+        missing = sorted(saved.keys() - objs.keys())
+        unknown = sorted(objs.keys() - saved.keys())
+        raise ValueError("Checkpoint does not match design "
+                         f"(missing: {missing[:5]}, unknown: {unknown[:5]})")
+
+    for path, obj in objs.items():
+        cls, attrs = saved[path]
+        if type(obj).__qualname__ != cls:
+            raise ValueError(f"Checkpoint does not match design: {path} is a "
+                             f"{type(obj).__qualname__}, expected {cls}")
+        for key, val in attrs.items():
+            setattr(obj, key, val)
+        # Let the object drop state derived from the restored attributes
+        on_restore = getattr(obj, '_on_restore', None)
+        if on_restore is not None:
+            on_restore()
+
+    Clock.mark_all_dirty(sim.ctx)
+    sim._cycles = state['cycles']
+    sim._event_queue = _EventQueue()
+    for t, period, ref in state['events']:
+        sim._event_queue.add_event(t, _decode_callable(ref, objs), period)
+    sim._change_queue.clear()
+    for ref in state['pending']:
+        sim._change_queue.add(_decode_callable(ref, objs))
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler that only creates plain data (see `_is_plain()`)."""
+    _BUILTINS = {'bytearray', 'complex'}
+
+    def find_class(self, module, name):
+        if module == 'builtins' and name in self._BUILTINS:
+            return getattr(builtins, name)
+        cls = _lookup(module, name)
+        if isinstance(cls, type) and (dataclasses.is_dataclass(cls)
+                                      or issubclass(cls, enum.Enum)):
+            return cls
+        raise pickle.UnpicklingError(
+            f"Checkpoint refers to unsupported type {module}.{name}")
+
+
+def dumps(state: dict) -> bytes:
+    """Serializes a state to the checkpoint format."""
+    data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    return MAGIC + zlib.compress(data)
+
+
+def loads(data: bytes) -> dict:
+    """Deserializes a state from the checkpoint format.
+
+    Only plain data is unpickled (see the module documentation). Only load
+    checkpoints from trusted sources.
+
+    Raises:
+        ValueError: `data` is not a checkpoint, or refers to unsupported
+            types.
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a Py-V checkpoint (or unsupported version)")
+    buf = io.BytesIO(zlib.decompress(data[len(MAGIC):]))
+    try:
+        return _Unpickler(buf).load()
+    except pickle.UnpicklingError as e:
+        raise ValueError(str(e)) from e
+
+
+def save(path: str, top, sim: Simulator):
+    """Saves a checkpoint of a design and its simulator to a file."""
+    with open(path, 'wb') as f:
+        f.write(dumps(capture(top, sim)))
+
+
+def load(path: str, top, sim: Simulator):
+    """Restores a checkpoint from a file (see `restore()`).
+
+    Only load checkpoints from trusted sources: event callbacks are looked up
+    by name and called when the simulation continues.
+    """
+    with open(path, 'rb') as f:
+        restore(top, sim, loads(f.read()))
@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from functools import partial
+from typing import Callable
+from pyv.context import SimContext, get_context
 
 
 class Clock:
@@ -7,36 +10,63 @@ class Clock:
     For now, clocked elements are:
     - Registers
     - Memories
+
+    Only *dirty* elements, i.e., elements that may change on the next tick,
+    are visited on a tick (see `Clocked._tracks_changes`). The result is the
+    same as ticking every element.
+
+    All methods take an optional simulation context. If omitted, the active
+    context is used (see `pyv.context`).
     """
 
     @staticmethod
-    def tick():
+    def tick(ctx: SimContext = None):
         """Performs a clock tick (rising edge).
 
         First, saves the current inputs (`RegList.prepareNextVal()`,
         `MemList.prepareNextVal()`). Then, applies tick to all registers
         (`RegList.tick()`) and memories (`MemList.tick()`).
         """
-        RegList.prepareNextVal()
-        MemList.prepareNextVal()
-        RegList.tick()
-        MemList.tick()
+        RegList.prepareNextVal(ctx)
+        MemList.prepareNextVal(ctx)
+        RegList.tick(ctx)
+        MemList.tick(ctx)
 
     @staticmethod
-    def reset():
+    def is_idle(ctx: SimContext = None) -> bool:
+        """Whether the next tick would leave all registers and memories
+        unchanged (`RegList.is_idle()`, `MemList.is_idle()`).
+        """
+        return RegList.is_idle(ctx) and MemList.is_idle(ctx)
+
+    @staticmethod
+    def reset(ctx: SimContext = None):
         """Resets registers (`RegList.reset()`) and memories
         (`MemList.reset()`).
         """
-        RegList.reset()
-        MemList.reset()
+        RegList.reset(ctx)
+        MemList.reset(ctx)
+
+    @staticmethod
+    def mark_all_dirty(ctx: SimContext = None):
+        """Marks all registers and memories dirty, so they are visited on the
+        next tick.
+
+        Required after changing the state of clocked elements or port values
+        without going through port writes (e.g., when restoring a
+        checkpoint).
+        """
+        ctx = ctx or get_context()
+        ctx.dirty_regs.update(range(len(ctx.reg_list)))
+        ctx.dirty_mems.update(range(len(ctx.mem_list)))
 
     @staticmethod
-    def clear():
+    def clear(ctx: SimContext = None):
         """Clears list of registers (`RegList.clear()`) and memories
         (`MemList.clear()`).
         """
-        RegList.clear()
-        MemList.clear()
+        RegList.clear(ctx)
+        MemList.clear(ctx)
 
 
 class Clocked(ABC):
@@ -45,6 +75,11 @@ class Clocked(ABC):
     Methods `_prepareNextVal()`, `_tick()`, and `_reset()` must be implemented
     by any class inheriting.
     """
+    __slots__ = ()
+    _tracks_changes = False
+    """Whether the element marks itself dirty whenever it may change on the
+    next tick (see `RegList.add_to_reg_list()`). Elements that do not are
+    visited on every tick."""
     @abstractmethod
     def _prepareNextVal(self):
         """Saves current input(s)"""
@@ -57,84 +92,177 @@ class Clocked(ABC):
     def _reset(self):
         """Reset function of individual clocked element."""
 
+    def _is_idle(self) -> bool:
+        """Whether the next tick would leave this element unchanged, given
+        its current inputs.
+
+        Elements that do not implement this are never considered idle.
+        """
+        return False
+
 
 class RegList():
     """This class keeps track of all instantiated registers.
+
+    The list of registers is owned by the simulation context
+    (`SimContext.reg_list`).
     """
 
-    # The list of instantiated registers
-    _reg_list = []
+    @staticmethod
+    def _regs(ctx: SimContext = None) -> list:
+        return (ctx or get_context()).reg_list
 
     @staticmethod
-    def add_to_reg_list(obj):
-        """Adds a register object to the global list of registers.
+    def add_to_reg_list(obj, ctx: SimContext = None) -> Callable[[], None]:
+        """Adds a register object to the list of registers.
+
+        New registers are dirty. If the register tracks changes
+        (`Clocked._tracks_changes`), it is only visited on a tick after it
+        has been marked dirty again, by calling the returned function.
+        Registers that do not track changes are visited on every tick.
 
         Args:
             obj: The register object
+            ctx (SimContext, optional): The simulation context. Defaults to
+                the active context.
+
+        Returns:
+            Callable: Marks the register dirty.
         """
-        RegList._reg_list.append(obj)
+        ctx = ctx or get_context()
+        return _add_clocked(obj, ctx.reg_list, ctx.dirty_regs,
+                            ctx.untracked_regs)
 
     @staticmethod
-    def prepareNextVal():
-        """Saves inputs of registers"""
-        for r in RegList._reg_list:
+    def prepareNextVal(ctx: SimContext = None):
+        """Saves inputs of (dirty) registers"""
+        ctx = ctx or get_context()
+        ctx.tick_regs = _take_dirty(ctx.reg_list, ctx.dirty_regs,
+                                    ctx.untracked_regs)
+        for r in ctx.tick_regs:
             r._prepareNextVal()
 
     @staticmethod
-    def tick():
-        """Ticks all registers."""
-        for r in RegList._reg_list:
+    def tick(ctx: SimContext = None):
+        """Ticks the registers prepared by `prepareNextVal()`."""
+        for r in (ctx or get_context()).tick_regs:
             r._tick()
 
     @staticmethod
-    def reset():
+    def is_idle(ctx: SimContext = None) -> bool:
+        """Whether the next tick would leave all registers unchanged."""
+        ctx = ctx or get_context()
+        regs = ctx.reg_list
+        for i in ctx.dirty_regs:
+            if not regs[i]._is_idle():
+                return False
+        return True
+
+    @staticmethod
+    def reset(ctx: SimContext = None):
         """Resets all registers."""
-        for r in RegList._reg_list:
+        ctx = ctx or get_context()
+        for r in ctx.reg_list:
             r._reset()
+        ctx.dirty_regs.update(range(len(ctx.reg_list)))
 
     @staticmethod
-    def clear():
+    def clear(ctx: SimContext = None):
         """Clears the list of registers."""
-        RegList._reg_list = []
+        ctx = ctx or get_context()
+        ctx.reg_list = []
+        ctx.dirty_regs = set()
+        ctx.untracked_regs = set()
+        ctx.tick_regs = []
 
 
 class MemList():
     """Base class for all memories.
 
-    This class keeps track of all memories.
+    This class keeps track of all memories. The list of memories is owned by
+    the simulation context (`SimContext.mem_list`).
     """
 
-    # List of instantiated memories
-    _mem_list = []
+    @staticmethod
+    def _mems(ctx: SimContext = None) -> list:
+        return (ctx or get_context()).mem_list
 
     @staticmethod
-    def add_to_mem_list(obj):
-        """Add memory to global list of memories.
+    def add_to_mem_list(obj, ctx: SimContext = None) -> Callable[[], None]:
+        """Add memory to the list of memories.
+
+        See `RegList.add_to_reg_list()` for how dirty memories are tracked.
 
         Args:
             obj: The memory object.
+            ctx (SimContext, optional): The simulation context. Defaults to
+                the active context.
+
+        Returns:
+            Callable: Marks the memory dirty.
         """
-        MemList._mem_list.append(obj)
+        ctx = ctx or get_context()
+        return _add_clocked(obj, ctx.mem_list, ctx.dirty_mems,
+                            ctx.untracked_mems)
 
     @staticmethod
-    def prepareNextVal():
-        """Saves inputs of memories."""
-        for m in MemList._mem_list:
+    def prepareNextVal(ctx: SimContext = None):
+        """Saves inputs of (dirty) memories."""
+        ctx = ctx or get_context()
+        ctx.tick_mems = _take_dirty(ctx.mem_list, ctx.dirty_mems,
+                                    ctx.untracked_mems)
+        for m in ctx.tick_mems:
             m._prepareNextVal()
 
     @staticmethod
-    def tick():
-        """Ticks all memories."""
-        for m in MemList._mem_list:
+    def tick(ctx: SimContext = None):
+        """Ticks the memories prepared by `prepareNextVal()`."""
+        for m in (ctx or get_context()).tick_mems:
             m._tick()
 
     @staticmethod
-    def reset():
+    def is_idle(ctx: SimContext = None) -> bool:
+        """Whether the next tick would leave all memories unchanged."""
+        ctx = ctx or get_context()
+        mems = ctx.mem_list
+        for i in ctx.dirty_mems:
+            if not mems[i]._is_idle():
+                return False
+        return True
+
+    @staticmethod
+    def reset(ctx: SimContext = None):
         """Resets all memories."""
-        for m in MemList._mem_list:
+        ctx = ctx or get_context()
+        for m in ctx.mem_list:
             m._reset()
+        ctx.dirty_mems.update(range(len(ctx.mem_list)))
 
     @staticmethod
-    def clear():
+    def clear(ctx: SimContext = None):
         """Clears list of memories."""
-        MemList._mem_list = []
+        ctx = ctx or get_context()
+        ctx.mem_list = []
+        ctx.dirty_mems = set()
+        ctx.untracked_mems = set()
+        ctx.tick_mems = []
+
+
+def _add_clocked(obj, elems: list, dirty: set, untracked: set):
+    idx = len(elems)
+    elems.append(obj)
+    dirty.add(idx)
+    if not getattr(obj, '_tracks_changes', False):
+        untracked.add(idx)
+    return partial(dirty.add, idx)
+
+
+def _take_dirty(elems: list, dirty: set, untracked: set) -> list:
+    """Returns the dirty elements in list order, and resets the dirty set to
+    the elements that do not track changes."""
+    if not dirty:
+        return []
+    idx = sorted(dirty)
+    dirty.clear()
+    dirty.update(untracked)
+    return [elems[i] for i in idx]
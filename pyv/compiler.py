@@ -0,0 +1,480 @@
+"""Compiled netlist simulation backend.
+
+Generates specialized Python code for an elaborated design and executes it
+with `exec()`:
+
+- Process methods are specialized per instance: every
+  `self.<...>.read()`/`self.<...>.write(val)` on a port that can be resolved
+  when compiling is replaced by a direct access to the value of the port's
+  root driver. Writes set the pending flags of the triggered process methods
+  inline, instead of going through `_propagate()` and the simulator queue.
+  Helper methods called via `self.<method>(...)` are specialized as well.
+  Specialized methods run in the globals of their module, so they see later
+  changes of module-level names.
+- A scheduler function evaluates all pending process methods in levelized
+  order (see `pyv.levelize`) until no method is pending anymore.
+- A tick function latches all plain registers (`Reg`) inline. Other clocked
+  elements are ticked by calling their methods. All elements are visited on
+  every tick (straight-line code is cheaper than tracking dirty elements);
+  the dirty sets are still maintained for the idle check.
+
+Port values are still stored in the port objects, so everything that is not
+compiled (e.g. writes from testbenches, memories, or methods whose source is
+not available) keeps working and stays in sync.
+
+This is a first step towards fully compiled simulation: values are still
+read from and written to the nets (one attribute access each) rather than
+kept in local variables, and memories, the register file and methods that
+cannot be specialized run uncompiled. On the single-cycle core, compiled mode
+is about 1.2x to 3x faster than the interpreted simulation, depending on the
+program.
+
+Compiled mode does not log port changes or queue activity. Port writes with a
+wrong value type are handed to the regular `write()`, so they still raise.
+"""
+import ast
+import copy
+import inspect
+import textwrap
+import types
+from collections import deque
+from pyv.context import SimContext, get_context
+from pyv.levelize import _port_fanout, levelize
+from pyv.port import Port, PortRW
+from pyv.reg import Reg
+from pyv.util import is_immutable_type
+
+
+class _PortAccessRewriter(ast.NodeTransformer):
+    """Rewrites port accesses of a method bound to `obj`."""
+    def __init__(self, netlist: 'CompiledNetlist', obj, self_name: str):
+        self.netlist = netlist
+        self.obj = obj
+        self.self_name = self_name
+        self.changed = False
+
+    def _resolve(self, node):
+        """Resolves an attribute chain `self.a.b...` to an object."""
+        chain = []
+        while isinstance(node, ast.Attribute):
+            chain.append(node.attr)
+            node = node.value
+        if not (isinstance(node, ast.Name) and node.id == self.self_name):
+            return None
+
+        val = self.obj
+        for attr in reversed(chain):
+            try:
+                val = getattr(val, attr)
+            except AttributeError:
+                return None
+        return val
+
+    def _is_self_method_call(self, func):
+        return (isinstance(func, ast.Attribute)
+                and isinstance(func.value, ast.Name)
+                and func.value.id == self.self_name)
+
+    def visit_Call(self, node: ast.Call):
+        self.generic_visit(node)
+        func = node.func
+
+        # self.<...>.read()
+        if (isinstance(func, ast.Attribute) and func.attr == 'read'
+                and not node.args and not node.keywords):
+            port = self._resolve(func.value)
+            if isinstance(port, Port):
+                self.changed = True
+                name = self.netlist._port_name(port._root_driver)
+                return ast.Attribute(
+                    ast.Name(f'{name}_n', ast.Load()), 'val', ast.Load())
+
+        # self.<method>(...)
+        if self._is_self_method_call(func):
+            meth = getattr(self.obj, func.attr, None)
+            if inspect.ismethod(meth) and meth.__self__ is self.obj:
+                name = self.netlist._specialize(meth)
+                if name is not None:
+                    self.changed = True
+                    return ast.Call(
+                        ast.Name(name, ast.Load()),
+                        [ast.Name(self.self_name, ast.Load())] + node.args,
+                        node.keywords)
+
+        return node
+
+    def visit_Expr(self, node: ast.Expr):
+        call = node.value
+        # Statement self.<...>.write(val)
+        if (isinstance(call, ast.Call)
+                and isinstance(call.func, ast.Attribute)
+                and call.func.attr == 'write'
+                and len(call.args) == 1 and not call.keywords):
+            port = self._resolve(call.func.value)
+            if isinstance(port, PortRW) and port._root_driver is port:
+                self.changed = True
+                val = self.visit(call.args[0])
+                return self.netlist._write_stmts(port, val)
+
+        return self.generic_visit(node)
+
+
+class CompiledNetlist:
+    """Compiled version of the current design.
+
+    Implements the same interface as the simulator's change queues. Pending
+    process methods are kept as flags, which are processed by `run()`.
+    """
+    def __init__(self, methods: list, ctx: SimContext = None):
+        """Compiles the design.
+
+        Args:
+            methods (list): The process methods of the design.
+            ctx (SimContext, optional): The simulation context of the design.
+                Defaults to the active context.
+        """
+        self._ctx = ctx or get_context()
+        order, _ = levelize(methods)
+        self._methods = order
+        self._index = {m: i for i, m in enumerate(order)}
+
+        self._pending = [False] * len(order)
+        # Number of pending flags, as a cell for the generated code. Kept
+        # up to date outside of `run()` (by `add()`, `pop()` and the tick).
+        self._num_pending = [0]
+        # Methods that are not part of the netlist, in FIFO order. Membership
+        # is tracked in a set next to the deque (as in `_ChangeQueue`).
+        self._extra = deque()
+        self._extra_set = set()
+
+        self._inject = {
+            '_pyv_d': self._pending,
+            '_pyv_k': self._num_pending,
+            '_pyv_extra': self._extra,
+            '_pyv_extra_set': self._extra_set,
+            '_pyv_schedule': self.add,
+            '_pyv_deepcopy': copy.deepcopy,
+        }
+        self._port_names = {}
+        self._specialized = {}
+        # Closure cells of the specialized functions, filled in at the end
+        self._cells = []
+        self._globals = {}
+        self._sources = []
+        self._num_specialized = 0
+
+        self._compile_scheduler()
+        self._compile_tick()
+
+        self._globals.update(self._inject)
+        for name, cell in self._cells:
+            cell.cell_contents = self._inject[name]
+
+    # ------------------------------------------------------------------
+    # Code generation helpers
+    # ------------------------------------------------------------------
+    def _port_name(self, port: Port) -> str:
+        name = self._port_names.get(id(port))
+        if name is None:
+            name = f'_pyv_p{len(self._port_names)}'
+            self._port_names[id(port)] = name
+            self._inject[name] = port
+            self._inject[f'{name}_n'] = port._net
+            self._inject[f'{name}_T'] = port._type
+        return name
+
+    def _notify_lines(self, port: PortRW, count: bool = False) -> list[str]:
+        """Returns source lines that schedule the fanout of `port` and call
+        its change hooks. With `count`, newly set flags are counted in the
+        local variable `c`."""
+        flags = []
+        lines = []
+        for m in _port_fanout(port):
+            idx = self._index.get(m)
+            if idx is None:
+                name = f'_pyv_x{len(self._inject)}'
+                self._inject[name] = m
+                lines.append(f'_pyv_schedule({name})')
+            elif idx not in flags:
+                flags.append(idx)
+        if flags and count:
+            set_flags = []
+            for i in flags:
+                set_flags += [f'if not _pyv_d[{i}]:',
+                              f'    _pyv_d[{i}] = True',
+                              '    c += 1']
+            lines[:0] = set_flags
+        elif flags:
+            lines.insert(0, ' = '.join(f'_pyv_d[{i}]' for i in flags)
+                         + ' = True')
+        for hook in port._get_fanout()[0]:
+            name = f'_pyv_h{len(self._inject)}'
+            self._inject[name] = hook
+            lines.append(f'{name}()')
+        return lines
+
+    def _write_lines(self, port: PortRW, val: str, tmp: str,
+                     count: bool = False) -> list[str]:
+        """Returns source lines that write `val` to root port `port`."""
+        p = self._port_name(port)
+        lines = [
+            f'{tmp} = {val}',
+            f'if type({tmp}) is not {p}_T:',
+            f'    {p}.write({tmp})',
+            f'elif {p}_n.val != {tmp}:',
+            f'    {p}_n.val = {tmp}',
+        ]
+        lines += ['    ' + line for line in self._notify_lines(port, count)]
+        return lines
+
+    def _write_stmts(self, port: PortRW, val: ast.expr) -> list[ast.stmt]:
+        lines = self._write_lines(port, '_pyv_val', '_pyv_t')
+        stmts = ast.parse('\n'.join(lines)).body
+        stmts[0].value = val
+        return stmts
+
+    def _exec(self, source: str, label: str) -> dict:
+        self._sources.append(source)
+        ns = self._globals
+        exec(compile(source, f'<pyv-compiled {label}>', 'exec'), ns)
+        return ns
+
+    def _make_function(self, fdef: ast.FunctionDef, func):
+        """Creates the specialized function `fdef` of `func`.
+
+        The function runs in the module globals of `func`, so it sees later
+        changes of them just like `func`. The generated names (`_pyv_...`)
+        are closure variables, which are bound once the design is compiled.
+        """
+        source = ast.unparse(fdef)
+        self._sources.append(source)
+        names = sorted({node.id for node in ast.walk(fdef)
+                        if isinstance(node, ast.Name)
+                        and node.id.startswith('_pyv_')})
+        outer = ['def _pyv_outer():',
+                 '    ' + ' = '.join(names) + ' = None']
+        outer += ['    ' + line for line in source.splitlines()]
+        code = compile('\n'.join(outer),
+                       f'<pyv-compiled {func.__qualname__}>', 'exec')
+        outer_code = next(c for c in code.co_consts
+                          if isinstance(c, types.CodeType))
+        code = next(c for c in outer_code.co_consts
+                    if isinstance(c, types.CodeType)
+                    and c.co_name == fdef.name)
+        cells = tuple(types.CellType() for _ in code.co_freevars)
+        self._cells += zip(code.co_freevars, cells)
+        fn = types.FunctionType(code, func.__globals__, fdef.name,
+                                func.__defaults__, cells)
+        fn.__kwdefaults__ = func.__kwdefaults__
+        return fn
+
+    def _specialize(self, meth):
+        """Specializes a bound method.
+
+        Returns:
+            Name of the specialized function (taking the instance as first
+            argument), or None if the method cannot be specialized.
+        """
+        if meth in self._specialized:
+            return self._specialized[meth]
+        # Guard against recursion
+        self._specialized[meth] = None
+
+        func = meth.__func__
+        if func.__code__.co_freevars:
+            return None
+        try:
+            source = textwrap.dedent(inspect.getsource(func))
+            fdef = ast.parse(source).body[0]
+        except (OSError, TypeError, SyntaxError):
+            return None
+        if (not isinstance(fdef, ast.FunctionDef) or fdef.decorator_list
+                or not fdef.args.args):
+            return None
+
+        rewriter = _PortAccessRewriter(self, meth.__self__,
+                                       fdef.args.args[0].arg)
+        fdef = rewriter.visit(fdef)
+        if not rewriter.changed:
+            return None
+
+        name = f'_pyv_f{self._num_specialized}'
+        self._num_specialized += 1
+        fdef.name = name
+        ast.fix_missing_locations(fdef)
+        self._inject[name] = self._make_function(fdef, func)
+        self._specialized[meth] = name
+        return name
+
+    # ------------------------------------------------------------------
+    # Scheduler and clock
+    # ------------------------------------------------------------------
+    def _compile_scheduler(self):
+        lines = [
+            'def _pyv_run():',
+            '    d = _pyv_d',
+            '    n = 0',
+            '    while True:',
+        ]
+        for i, m in enumerate(self._methods):
+            name = None
+            if inspect.ismethod(m):
+                name = self._specialize(m)
+            if name is not None:
+                obj = f'_pyv_o{i}'
+                self._inject[obj] = m.__self__
+                call = f'{name}({obj})'
+            else:
+                call = f'_pyv_m{i}()'
+                self._inject[f'_pyv_m{i}'] = m
+            lines += [
+                f'        if d[{i}]:',
+                f'            d[{i}] = False',
+                f'            {call}',
+                '            n += 1',
+            ]
+        lines += [
+            '        while _pyv_extra:',
+            '            fn = _pyv_extra.popleft()',
+            '            _pyv_extra_set.remove(fn)',
+            '            fn()',
+            '            n += 1',
+            '        if True not in d:',
+            '            _pyv_k[0] = 0',
+            '            return n',
+        ]
+        ns = self._exec('\n'.join(lines), 'scheduler')
+        # Evaluates pending process methods until the design settles.
+        # Returns the number of evaluations.
+        self.run = ns['_pyv_run']
+
+    def _compile_tick(self):
+        prepare = []
+        tick = []
+        regs = list(self._ctx.reg_list)
+        for i, r in enumerate(regs):
+            if type(r) is not Reg or r.cur._root_driver is not r.cur:
+                self._inject[f'_pyv_c{i}'] = r
+                prepare.append(f'    _pyv_c{i}._prepareNextVal()')
+                tick.append(f'    _pyv_c{i}._tick()')
+                continue
+
+            nxt = self._port_name(r.next._root_driver)
+            rst = self._port_name(r.rst._root_driver)
+            cur = self._port_name(r.cur)
+            rv = f'_pyv_rv{i}'
+            self._inject[rv] = r._resetVal
+            latch = 'v'
+            if not is_immutable_type(r.cur._type):
+                latch = '_pyv_deepcopy(v)'
+            prepare += [
+                f'    rst = {rst}_n.val',
+                '    if rst == 0:',
+                f'        v = {nxt}_n.val',
+                f'        if {cur}_n.val != v:',
+                f'            t{i} = {latch}',
+                f'            k{i} = 1',
+                '        else:',
+                f'            k{i} = 0',
+                '    elif rst == 1:',
+                f'        k{i} = 2',
+                '    else:',
+                '        raise Exception("Error: Invalid rst signal!")',
+            ]
+            tick += [f'    if k{i} == 1:']
+            tick += ['        ' + line
+                     for line in self._write_lines(r.cur, f't{i}', 't', True)]
+            tick += [f'    elif k{i} == 2:']
+            tick += ['        ' + line
+                     for line in self._write_lines(r.cur, rv, 't', True)]
+
+        for i, m in enumerate(self._ctx.mem_list):
+            self._inject[f'_pyv_mem{i}'] = m
+            prepare.append(f'    _pyv_mem{i}._prepareNextVal()')
+            tick.append(f'    _pyv_mem{i}._tick()')
+
+        # Every element is visited below, so only elements that change on
+        # this tick (or do not track changes) remain dirty
+        self._inject['_pyv_dr'] = self._ctx.dirty_regs
+        self._inject['_pyv_dm'] = self._ctx.dirty_mems
+        self._inject['_pyv_ur'] = self._ctx.untracked_regs
+        self._inject['_pyv_um'] = self._ctx.untracked_mems
+        reset = [
+            '    c = 0',
+            '    _pyv_dr.clear()',
+            '    _pyv_dr.update(_pyv_ur)',
+            '    _pyv_dm.clear()',
+            '    _pyv_dm.update(_pyv_um)',
+        ]
+        lines = (['def _pyv_tick():'] + reset + prepare + tick
+                 + ['    _pyv_k[0] += c'])
+        ns = self._exec('\n'.join(lines), 'tick')
+        # Clock tick of all registers and memories
+        self.tick = ns['_pyv_tick']
+
+    @property
+    def source(self) -> str:
+        """The generated source code."""
+        return '\n\n'.join(self._sources)
+
+    def info(self) -> dict:
+        """Returns the number of process methods (`methods`), specialized
+        functions (`specialized`) and inlined ports (`ports`)."""
+        return {
+            'methods': len(self._methods),
+            'specialized': self._num_specialized,
+            'ports': len(self._port_names),
+        }
+
+    # ------------------------------------------------------------------
+    # Change queue interface
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return self._num_pending[0] + len(self._extra)
+
+    def __iter__(self):
+        pending = [m for m, p in zip(self._methods, self._pending) if p]
+        return iter(pending + list(self._extra))
+
+    def __contains__(self, fn):
+        idx = self._index.get(fn)
+        if idx is None:
+            return fn in self._extra_set
+        return self._pending[idx]
+
+    def add(self, fn) -> bool:
+        idx = self._index.get(fn)
+        if idx is None:
+            if fn in self._extra_set:
+                return False
+            self._extra_set.add(fn)
+            self._extra.append(fn)
+            return True
+        if self._pending[idx]:
+            return False
+        self._pending[idx] = True
+        self._num_pending[0] += 1
+        return True
+
+    def add_all(self, fns) -> int:
+        return sum(self.add(fn) for fn in fns)
+
+    def pop(self):
+        if True in self._pending:
+            idx = self._pending.index(True)
+            self._pending[idx] = False
+            self._num_pending[0] -= 1
+            return self._methods[idx]
+        fn = self._extra.popleft()
+        self._extra_set.remove(fn)
+        return fn
+
+    def settled(self):
+        pass
+
+    def clear(self):
+        for i in range(len(self._pending)):
+            self._pending[i] = False
+        self._num_pending[0] = 0
+        self._extra.clear()
+        self._extra_set.clear()
@@ -0,0 +1,91 @@
+"""Simulation contexts.
+
+A simulation context owns everything that belongs to one simulated design:
+its ports, registers, memories, "on stable" callbacks and the simulator
+instance. Py-V objects remember the context that was active when they were
+created, so several designs can coexist in one process and be simulated
+independently (also from different threads).
+
+There is always an active context. Unless another context is activated via
+`with ctx:`, this is the default context, so code that only ever simulates
+one design at a time does not need to care about contexts at all.
+
+Example:
+
+    ctx = SimContext()
+    with ctx:
+        core = SingleCycle()
+        sim = Simulator()
+        core._init()
+"""
+from contextvars import ContextVar
+
+
+class SimContext:
+    """Registries of a single simulation."""
+
+    def __init__(self):
+        self.port_list = []
+        """All ports"""
+        self.port_list_filtered = []
+        """Ports selected for logging (probes)"""
+        self.reg_list = []
+        """All registers"""
+        self.mem_list = []
+        """All memories"""
+        self.dirty_regs = set()
+        """Indices (in `reg_list`) of registers that may change on the next
+        tick"""
+        self.dirty_mems = set()
+        """Indices (in `mem_list`) of memories that may change on the next
+        tick"""
+        self.untracked_regs = set()
+        """Indices of registers that are visited on every tick"""
+        self.untracked_mems = set()
+        """Indices of memories that are visited on every tick"""
+        self.tick_regs = []
+        """Registers visited on the current tick"""
+        self.tick_mems = []
+        """Memories visited on the current tick"""
+        self.stable_callbacks = []
+        """Callbacks to call once signal values have stabilized"""
+        self.sim = None
+        """The simulator of this context"""
+        self._tokens = []
+
+    def clear(self):
+        """Clears the lists of ports, registers, memories and callbacks."""
+        self.port_list = []
+        self.port_list_filtered = []
+        self.reg_list = []
+        self.mem_list = []
+        self.dirty_regs = set()
+        self.dirty_mems = set()
+        self.untracked_regs = set()
+        self.untracked_mems = set()
+        self.tick_regs = []
+        self.tick_mems = []
+        self.stable_callbacks = []
+
+    def __enter__(self):
+        """Activates this context."""
+        self._tokens.append(_active_context.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        """Restores the previously active context."""
+        _active_context.reset(self._tokens.pop())
+
+
+_default_context = SimContext()
+_active_context = ContextVar('pyv_context', default=_default_context)
+
+
+def get_context() -> SimContext:
+    """Returns the active simulation context."""
+    return _active_context.get()
+
+
+def default_context() -> SimContext:
+    """Returns the default simulation context."""
+    return _default_context
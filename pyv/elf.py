@@ -0,0 +1,160 @@
+"""Loader for RISC-V ELF32 executables.
+
+Reads the loadable segments, the entry point, and the symbol table of a
+(statically linked) ELF file, so programs can be loaded without converting
+them to a raw binary first (`objcopy -O binary`):
+
+    elf = ElfFile.read('programs/fibonacci/fibonacci.out')
+    elf.load(model.core.mem)
+    result = elf.symbols['result'].addr
+
+`SingleCycleModel.load_elf()` does the same, and also starts the program at
+its entry point.
+"""
+import struct
+from dataclasses import dataclass, field
+
+_EHDR = struct.Struct('<16sHHIIIIIHHHHHH')
+_PHDR = struct.Struct('<8I')
+_SHDR = struct.Struct('<10I')
+_SYM = struct.Struct('<IIIBBH')
+
+EM_RISCV = 243
+PT_LOAD = 1
+SHT_SYMTAB = 2
+STB_LOCAL = 0
+STT_SECTION = 3
+STT_FILE = 4
+
+
+def is_elf(path: str) -> bool:
+    """Checks whether a file starts with the ELF magic number."""
+    with open(path, 'rb') as f:
+        return f.read(4) == b'\x7fELF'
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A loadable (`PT_LOAD`) segment."""
+    addr: int
+    """Physical start address"""
+    data: memoryview
+    """Contents from the file"""
+    mem_size: int
+    """Size in memory. Bytes beyond `data` (e.g., `.bss`) are zero."""
+
+
+@dataclass(frozen=True)
+class Symbol:
+    """An entry of the symbol table."""
+    name: str
+    addr: int
+    size: int
+
+
+@dataclass
+class ElfFile:
+    """A parsed ELF32 executable."""
+    entry: int
+    """Entry point (address of the first instruction)"""
+    segments: list[Segment] = field(default_factory=list)
+    """Loadable segments"""
+    symbols: dict[str, Symbol] = field(default_factory=dict)
+    """Symbols by name (global symbols take precedence over local ones)"""
+
+    @classmethod
+    def read(cls, path: str) -> 'ElfFile':
+        """Reads an ELF file.
+
+        Args:
+            path (str): Path to the file.
+
+        Raises:
+            ValueError: Not a little-endian RISC-V ELF32 file.
+        """
+        with open(path, 'rb') as f:
+            return cls.parse(f.read())
+
+    @classmethod
+    def parse(cls, data: bytes) -> 'ElfFile':
+        """Parses the contents of an ELF file.
+
+        Segment contents are views of `data`, they are not copied.
+
+        Args:
+            data (bytes): File contents.
+
+        Raises:
+            ValueError: Not a little-endian RISC-V ELF32 file.
+        """
+        buf = memoryview(data)
+        try:
+            (ident, _, machine, _, entry, phoff, shoff, _, _, phentsize,
+             phnum, shentsize, shnum, _) = _EHDR.unpack_from(buf)
+        except struct.error:
+            raise ValueError("Not an ELF file (too short)")
+        if ident[:4] != b'\x7fELF':
+            raise ValueError("Not an ELF file")
+        if ident[4] != 1 or ident[5] != 1:
+            raise ValueError("Only little-endian ELF32 files are supported")
+        if machine != EM_RISCV:
+            raise ValueError(f"Not a RISC-V ELF file (machine {machine})")
+
+        elf = cls(entry)
+        for i in range(phnum):
+            (typ, offset, _, paddr, filesz, memsz, _, _) = \
+                _PHDR.unpack_from(buf, phoff + i * phentsize)
+            if typ == PT_LOAD and memsz > 0:
+                elf.segments.append(
+                    Segment(paddr, buf[offset:offset + filesz], memsz))
+
+        sections = [_SHDR.unpack_from(buf, shoff + i * shentsize)
+                    for i in range(shnum)]
+        for (_, typ, _, _, offset, size, link, _, _, entsize) in sections:
+            if typ == SHT_SYMTAB:
+                str_off, str_size = sections[link][4:6]
+                elf._read_symbols(buf[offset:offset + size],
+                                  entsize or _SYM.size,
+                                  buf[str_off:str_off + str_size])
+        return elf
+
+    def _read_symbols(self, symtab: memoryview, entsize: int,
+                      strtab: memoryview):
+        strings = bytes(strtab)
+        for off in range(0, len(symtab) - entsize + 1, entsize):
+            name, value, size, info, _, _ = _SYM.unpack_from(symtab, off)
+            if name == 0 or (info & 0xf) in (STT_SECTION, STT_FILE):
+                continue
+            name = strings[name:strings.index(b'\0', name)].decode()
+            if info >> 4 == STB_LOCAL and name in self.symbols:
+                continue
+            self.symbols[name] = Symbol(name, value, size)
+
+    def load(self, mem):
+        """Writes the segments into a memory.
+
+        Segments are copied into the memory directly; bytes beyond a
+        segment's file contents (e.g., `.bss`) are zero-filled. In a
+        `SparseMemory`, the zero-fill leaves untouched pages unallocated.
+
+        Args:
+            mem (Memory): Target memory (`Memory` or `SparseMemory`).
+
+        Raises:
+            ValueError: A segment does not fit into the memory.
+        """
+        storage = mem.mem
+        # One zero buffer for the `.bss` parts of all segments
+        zeros = memoryview(bytes(max(
+            (seg.mem_size - len(seg.data) for seg in self.segments),
+            default=0)))
+        for seg in self.segments:
+            end = seg.addr + seg.mem_size
+            if end > len(storage):
+                raise ValueError(
+                    f"Segment at 0x{seg.addr:08X}-0x{end:08X} does not fit "
+                    f"into memory of size 0x{len(storage):X}")
+            filled = seg.addr + len(seg.data)
+            storage[seg.addr:filled] = seg.data
+            if end > filled:
+                storage[filled:end] = zeros[:end - filled]
@@ -0,0 +1,176 @@
+"""Static levelization of process methods.
+
+After elaboration (`_init()`), the port graph tells us which process methods
+are triggered by a change of each root port (`_downstreamInputs` and the
+`_ProcessMethodHandler` of every input). Which root ports a process method
+*writes* is approximated by the root ports reachable from the method's owner
+object, without descending into submodules or clocked elements.
+
+From this we build a method dependency graph and compute a topological
+evaluation order. Methods that are part of a combinational cycle are grouped
+together; the simulator evaluates them dynamically until they settle.
+"""
+from typing import Callable
+from pyv.clocked import Clocked
+from pyv.context import SimContext, get_context
+from pyv.port import Input, PortRW
+from pyv.util import PyVObj, obj_attrs
+
+
+def _attr_values(obj):
+    for val in obj_attrs(obj).values():
+        if isinstance(val, dict):
+            yield from val.values()
+        elif isinstance(val, (list, tuple)):
+            yield from val
+        else:
+            yield val
+
+
+def _owned_root_ports(obj) -> list[PortRW]:
+    """Collects the root ports an object can write to.
+
+    Containers such as `ReadPort`, `VMap` or `VContainer` are searched
+    recursively, submodules and clocked elements (registers, memories) are
+    not.
+    """
+    from pyv.module import Module
+
+    ports = []
+    seen = set()
+    todo = [obj]
+    while todo:
+        cur = todo.pop()
+        for val in _attr_values(cur):
+            if id(val) in seen:
+                continue
+            seen.add(id(val))
+            if isinstance(val, PortRW):
+                if val._root_driver is val:
+                    ports.append(val)
+            elif (isinstance(val, PyVObj)
+                    and not isinstance(val, (Module, Clocked))):
+                todo.append(val)
+    return ports
+
+
+def _port_fanout(port: PortRW) -> list[Callable]:
+    """Returns the process methods triggered by a change of a root port."""
+    return list(port._get_fanout()[1])
+
+
+def collect_methods(ctx: SimContext = None) -> list[Callable]:
+    """Returns all process methods of the design in registration order.
+
+    Args:
+        ctx (SimContext, optional): The simulation context of the design.
+            Defaults to the active context.
+    """
+    methods = {}
+    for port in (ctx or get_context()).port_list:
+        if isinstance(port, Input):
+            for m in port._processMethodHandler._processMethods:
+                methods.setdefault(m, None)
+    return list(methods)
+
+
+def build_graph(methods: list[Callable]) -> dict[Callable, list[Callable]]:
+    """Builds the method dependency graph.
+
+    Args:
+        methods (list[Callable]): Process methods to include.
+
+    Returns:
+        dict: Maps each method to the methods it (possibly) triggers.
+    """
+    owner_ports = {}
+    graph = {}
+    for m in methods:
+        owner = getattr(m, '__self__', None)
+        succ = {}
+        if owner is not None:
+            if id(owner) not in owner_ports:
+                owner_ports[id(owner)] = _owned_root_ports(owner)
+            for port in owner_ports[id(owner)]:
+                for s in _port_fanout(port):
+                    if s != m:
+                        succ.setdefault(s, None)
+        graph[m] = list(succ)
+    return graph
+
+
+def _sccs(graph: dict[Callable, list[Callable]]) -> list[list[Callable]]:
+    """Tarjan's algorithm (iterative).
+
+    Returns:
+        Strongly connected components in reverse topological order.
+    """
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    result = []
+    counter = 0
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, [])))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, it = work[-1]
+            advanced = False
+            for succ in it:
+                if succ not in index:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph.get(succ, []))))
+                    advanced = True
+                    break
+                elif succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                scc = []
+                while True:
+                    w = stack.pop()
+                    on_stack.discard(w)
+                    scc.append(w)
+                    if w == node:
+                        break
+                result.append(scc)
+    return result
+
+
+def levelize(methods: list[Callable]):
+    """Computes a static evaluation order for process methods.
+
+    Args:
+        methods (list[Callable]): Process methods in registration order.
+
+    Returns:
+        tuple: `(order, cyclic)`. `order` is the list of methods in
+        topological order. `cyclic` is the set of methods that are part of a
+        combinational cycle.
+    """
+    graph = build_graph(methods)
+    position = {m: i for i, m in enumerate(graph)}
+
+    order = []
+    cyclic = set()
+    for scc in reversed(_sccs(graph)):
+        if len(scc) > 1:
+            cyclic.update(scc)
+        order.extend(sorted(scc, key=lambda m: position.get(m, 0)))
+
+    return order, cyclic
@@ -1,5 +1,15 @@
+"""Logging.
+
+Logging is disabled by default. Messages in hot paths (e.g., port changes,
+process method evaluations, memory accesses) are guarded by
+`logger.isEnabledFor()`, so that no message is formatted while logging is
+disabled.
+"""
 import logging
 
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+
 
 def getLogger():
     logger = logging.getLogger()
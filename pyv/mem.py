@@ -1,7 +1,9 @@
+import mmap
+import struct
 from pyv.module import Module
 from pyv.port import Input, Output
 from pyv.util import MASK_32, PyVObj
-from pyv.log import logger
+from pyv.log import DEBUG, logger
 from pyv.clocked import Clocked, MemList
 
 
@@ -40,16 +42,27 @@ class WritePort(PyVObj):
         self.wdata_i = wdata_i
         """Write data input"""
 
+
 # TODO: Check if addr is valid
 
+_HALF = struct.Struct('<H')
+_WORD = struct.Struct('<I')
+
 
 class Memory(Module, Clocked):
     """Simple memory module with 2 read ports and 1 write port
 
-    A memory is represented by a simple list of bytes.
+    A memory is represented by a `bytearray`. Multi-byte values are packed
+    and unpacked with `struct` (also at unaligned addresses).
 
     Byte-ordering: Little-endian
+
+    The memory is marked dirty (see `pyv.clocked.Clock`) when its write
+    enable changes, and stays dirty while it is writing.
     """
+    _tracks_changes = True
+    # Write watches are host-side hooks, not state (see `pyv.checkpoint`)
+    _checkpoint_exclude = ('_write_watches',)
 
     def __init__(self, size: int = 32):
         """Memory constructor.
@@ -58,9 +71,11 @@ class Memory(Module, Clocked):
             size: Size of memory in bytes.
         """
         super().__init__(name='UnnamedMemory')
-        MemList.add_to_mem_list(self)
-        self.mem = [0 for i in range(0, size)]
-        """Memory array. List of length `size`."""
+        self._mark_dirty = MemList.add_to_mem_list(self, self._ctx)
+        self._mem = bytearray(size)
+
+        # Write watches: (start address, end address, callback)
+        self._write_watches = []
 
         # Read port 0
         self.read_port0 = ReadPort(
@@ -83,6 +98,21 @@ class Memory(Module, Clocked):
             we_i=Input(bool, [None]),
             wdata_i=Input(int, [None])
         )
+        self.write_port.we_i.add_change_hook(self._mark_dirty)
+
+    @property
+    def mem(self) -> bytearray:
+        """Memory array. Byte array of length `size`.
+
+        Can be read and written like a list of bytes (also by slices).
+        Assigning a sequence of bytes replaces the memory contents (and
+        size).
+        """
+        return self._mem
+
+    @mem.setter
+    def mem(self, val):
+        self._mem = bytearray(val)
 
     def _read(self, addr, w):
         # During the processing of the current cycle, it might occur that
@@ -93,27 +123,40 @@ class Memory(Module, Clocked):
         # Note: An actual illegal address exception caused by a running
         # program should be handled synchronously, i.e. with the next
         # active clock edge (tick).
+        mem = self._mem
         try:
-            if w == 1:  # byte
-                val = MASK_32 & self.mem[addr]
+            if addr < 0:
+                raise IndexError
+            if w == 4:  # word
+                val = _WORD.unpack_from(mem, addr)[0]
+            elif w == 1:  # byte
+                val = mem[addr]
             elif w == 2:  # half word
-                val = MASK_32 & (self.mem[addr + 1] << 8 | self.mem[addr])
-            elif w == 4:  # word
-                val = MASK_32 & (
-                    self.mem[addr + 3] << 24
-                    | self.mem[addr + 2] << 16
-                    | self.mem[addr + 1] << 8
-                    | self.mem[addr])
+                val = mem[addr + 1] << 8 | mem[addr]
             else:
                 raise Exception(
                     f'ERROR (Memory ({self.name}), read): Invalid width {w}')
+        except (IndexError, struct.error):
+            return 0
 
+        if logger.isEnabledFor(DEBUG):
             logger.debug(f"MEM ({self.name}): read value {val:08X} from address {addr:08X}")  # noqa: E501
-        except IndexError:
-            val = 0
 
         return val
 
+    def _write(self, addr, w, wdata):
+        mem = self._mem
+        if addr < 0 or addr + w > len(mem):
+            raise IndexError(
+                f'ERROR (Memory ({self.name}), write): Address {addr:08X} out of range')  # noqa: E501
+
+        if w == 1:  # byte
+            mem[addr] = 0xff & wdata
+        elif w == 2:  # half word
+            _HALF.pack_into(mem, addr, 0xffff & wdata)
+        else:  # word
+            _WORD.pack_into(mem, addr, MASK_32 & wdata)
+
     def _process_read(self, read_port):
         re = read_port.re_i.read()
         addr = read_port.addr_i.read()
@@ -151,19 +194,101 @@ class Memory(Module, Clocked):
             if not (w == 1 or w == 2 or w == 4):
                 raise Exception(
                     f'ERROR (Memory ({self.name}), write): Invalid width {w}')
-            logger.debug(
-                f"MEM {self.name}: write {wdata:08X} to address {addr:08X}")
+            if logger.isEnabledFor(DEBUG):
+                logger.debug(
+                    f"MEM {self.name}: write {wdata:08X} to address {addr:08X}")  # noqa: E501
 
-            if w == 1:  # byte
-                self.mem[addr] = 0xff & wdata
-            elif w == 2:  # half word
-                self.mem[addr] = 0xff & wdata
-                self.mem[addr + 1] = (0xff00 & wdata) >> 8
-            elif w == 4:  # word
-                self.mem[addr] = 0xff & wdata
-                self.mem[addr + 1] = (0xff00 & wdata) >> 8
-                self.mem[addr + 2] = (0xff0000 & wdata) >> 16
-                self.mem[addr + 3] = (0xff000000 & wdata) >> 24
+            self._write(addr, w, wdata)
+
+            for watch in self._write_watches:
+                if addr < watch[1] and addr + w > watch[0]:
+                    watch[2](addr, w, wdata)
+
+            # Write enable may stay set without changing
+            self._mark_dirty()
+
+    def _is_idle(self):
+        return not self.write_port.we_i.read()
+
+    def add_write_watch(self, addr: int, callback, size: int = 1):
+        """Watches writes to a memory range.
+
+        `callback(addr, width, wdata)` is called on every write that touches
+        the range `[addr, addr + size)`, after the write has been applied.
+
+        Args:
+            addr (int): Start address of the range.
+            callback (Callable): The callback.
+            size (int, optional): Size of the range in bytes. Defaults to 1.
+
+        Returns:
+            A handle for `remove_write_watch()`.
+        """
+        watch = (addr, addr + size, callback)
+        self._write_watches.append(watch)
+        return watch
+
+    def remove_write_watch(self, watch):
+        """Removes a write watch.
+
+        Args:
+            watch: Handle returned by `add_write_watch()`.
+        """
+        self._write_watches.remove(watch)
+
+    def _check_range(self, addr: int, n: int):
+        if addr < 0 or n < 0 or addr + n > len(self._mem):
+            raise IndexError(
+                f'ERROR (Memory ({self.name}), read): Range {addr:08X}+{n} out of range')  # noqa: E501
+
+    def view(self, addr: int, n: int) -> memoryview:
+        """Returns a read-only view of `n` bytes from `addr`.
+
+        The view shares the memory's buffer (nothing is copied), so it
+        reflects later writes. It becomes stale when the whole memory is
+        replaced (`mem = ...`).
+
+        Args:
+            addr (int): Start address.
+            n (int): Number of bytes.
+
+        Raises:
+            IndexError: The range exceeds the memory.
+        """
+        self._check_range(addr, n)
+        return memoryview(self._mem)[addr:addr + n].toreadonly()
+
+    def read_bytes(self, addr: int, n: int) -> bytes:
+        """Returns a copy of `n` bytes from `addr`.
+
+        Raises:
+            IndexError: The range exceeds the memory.
+        """
+        return bytes(self.view(addr, n))
+
+    def read_word(self, addr: int, signed: bool = False) -> int:
+        """Reads a (little-endian) word from `addr`.
+
+        Raises:
+            IndexError: The word exceeds the memory.
+        """
+        return int.from_bytes(self.view(addr, 4), 'little', signed=signed)
+
+    def read_half(self, addr: int, signed: bool = False) -> int:
+        """Reads a (little-endian) half word from `addr`.
+
+        Raises:
+            IndexError: The half word exceeds the memory.
+        """
+        return int.from_bytes(self.view(addr, 2), 'little', signed=signed)
+
+    def snapshot(self) -> dict[int, bytes]:
+        """Returns a copy of the memory contents.
+
+        Returns:
+            dict[int, bytes]: Contents by start address.
+        """
+        return {0: bytes(self._mem)}
 
     # TODO: when memory gets loaded with program *before* simulation,
     # simulation start will cause a reset. So for now, we skip the reset here.
@@ -173,5 +298,362 @@ class Memory(Module, Clocked):
 
         All elements are set to 0.
         """
-        for i in range(0, len(self.mem)):
-            self.mem[i] = 0
+        self._mem[:] = bytes(len(self._mem))
+
+
+class _PagedView:
+    """List-like view of the bytes of a `SparseMemory`.
+
+    Supports `len()`, and reading and writing single bytes and slices (with
+    step 1). Slices are read as `bytearray`; slice assignment cannot change
+    the size of the memory. Writing zeros to untouched pages does not
+    allocate them.
+    """
+    __slots__ = ('_memory',)
+
+    def __init__(self, memory: 'SparseMemory'):
+        self._memory = memory
+
+    def __len__(self):
+        return self._memory._size
+
+    def _range(self, key: slice):
+        start, stop, step = key.indices(self._memory._size)
+        if step != 1:
+            raise ValueError("Only slices with step 1 are supported")
+        return start, max(stop - start, 0)
+
+    def _index(self, key: int) -> int:
+        size = self._memory._size
+        if key < 0:
+            key += size
+        if not 0 <= key < size:
+            raise IndexError("Memory index out of range")
+        return key
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._memory._read_bytes(*self._range(key))
+        return self._memory._read_bytes(self._index(key), 1)[0]
+
+    def __setitem__(self, key, val):
+        if isinstance(key, slice):
+            start, n = self._range(key)
+            if isinstance(val, (bytes, bytearray, memoryview)):
+                data = memoryview(val).cast('B')
+            else:
+                data = bytes(val)
+            if len(data) != n:
+                raise ValueError("Cannot change the size of a SparseMemory")
+            self._memory._write_bytes(start, data)
+        else:
+            self._memory._write_bytes(self._index(key), bytes([val]))
+
+
+class SparseMemory(Memory):
+    """Memory with a sparse, paged representation.
+
+    Same ports and behavior as `Memory`, but the memory is split into pages
+    that are only allocated on the first write. Reading an untouched page
+    returns zeros (without allocating it). This allows realistic memory maps
+    (e.g., code at 0x8000_0000 and the stack near the top of a 4 GiB address
+    space).
+
+    The most recently accessed page is cached, so consecutive accesses to
+    the same page skip the page lookup. Read port 1 (the instruction fetch
+    port of the cores) has a cache of its own, so fetches and data accesses
+    to other pages do not evict each other.
+
+    Host files can be mapped into the memory (`map_file()`), e.g., to feed
+    large input data to a simulated program.
+    """
+    # Mapped files and the page caches are not part of checkpoints (see
+    # `pyv.checkpoint`); the caches are reset by `_on_restore()`
+    _checkpoint_exclude = ('_mem', '_regions', '_fetch_cache', '_data_cache')
+
+    def __init__(self, size: int = 1 << 32, page_size: int = 4096):
+        """Create a new sparse memory.
+
+        Args:
+            size (int, optional): Size of memory in bytes. Defaults to 4 GiB.
+            page_size (int, optional): Page size in bytes (a power of two).
+                Defaults to 4 KiB.
+
+        Raises:
+            ValueError: `page_size` is not a power of two.
+        """
+        if page_size <= 0 or page_size & (page_size - 1):
+            raise ValueError(f"Page size {page_size} is not a power of two")
+        super().__init__(0)
+        self._mem = _PagedView(self)
+        self._size = size
+        self._page_size = page_size
+        self._page_bits = page_size.bit_length() - 1
+        self._page_mask = page_size - 1
+        # Allocated pages, by page number
+        self._pages: dict[int, bytearray] = {}
+        # Host files mapped into the memory: (start, end, memoryview)
+        self._regions = []
+        # Page caches: (page number, page) of the last page accessed by
+        # read port 1 (instruction fetches), and by all other accesses
+        self._fetch_cache = (-1, None)
+        self._data_cache = (-1, None)
+
+    @property
+    def mem(self) -> _PagedView:
+        """Memory array. List-like view of `size` bytes (see `_PagedView`).
+
+        Assigning a sequence of bytes discards all pages and writes the
+        sequence from address 0.
+        """
+        return self._mem
+
+    @mem.setter
+    def mem(self, val):
+        self._pages = {}
+        self._clear_caches()
+        self._write_bytes(0, bytes(val))
+
+    def resident_pages(self) -> list[int]:
+        """Returns the start addresses of all allocated pages, in ascending
+        order."""
+        return sorted(no << self._page_bits for no in self._pages)
+
+    def resident_size(self) -> int:
+        """Returns the number of bytes of all allocated pages."""
+        return len(self._pages) * self._page_size
+
+    def view(self, addr: int, n: int) -> memoryview:
+        """Returns a read-only view of `n` bytes from `addr`.
+
+        Ranges within one allocated (or mapped) page are views of the page,
+        which reflect later writes. Other ranges are copied, as the pages of
+        a sparse memory are not contiguous.
+
+        Args:
+            addr (int): Start address.
+            n (int): Number of bytes.
+
+        Raises:
+            IndexError: The range exceeds the memory.
+        """
+        self._check_range(addr, n)
+        off = addr & self._page_mask
+        page = self._page(addr >> self._page_bits, False)
+        if page is not None and off + n <= len(page):
+            return memoryview(page)[off:off + n].toreadonly()
+        return memoryview(self._read_bytes(addr, n)).toreadonly()
+
+    def snapshot(self) -> dict[int, bytes]:
+        """Returns a copy of the allocated pages and mapped files.
+
+        Returns:
+            dict[int, bytes]: Contents by start address (ascending).
+        """
+        contents = {no << self._page_bits: bytes(page)
+                    for no, page in self._pages.items()}
+        contents.update((start, bytes(view))
+                        for start, _, view in self._regions)
+        return dict(sorted(contents.items()))
+
+    def map_file(self, addr: int, path: str, copy_on_write: bool = False,
+                 offset: int = 0, size: int = None) -> tuple[int, int]:
+        """Maps a host file into the memory.
+
+        The memory range is backed by an `mmap` of the file, which the read
+        and write ports access directly: the file is neither read up front
+        nor copied, and parallel simulations mapping the same file share the
+        host's page cache. The range must not overlap with other mapped
+        files or pages that were already written.
+
+        Reads beyond the end of the file (in its last page) return 0.
+        Mapped files are not part of checkpoints.
+
+        Only sparse memories support mapping. `Memory`, which the models use
+        by default, is a single buffer; use a `SparseMemory` to map files.
+
+        Args:
+            addr (int): Start address (a multiple of the page size).
+            path (str): Path of the host file.
+            copy_on_write (bool, optional): If True, the range can be
+                written; writes only change the simulated memory, not the
+                file. If False (default), writes to the range raise an
+                exception.
+            offset (int, optional): Offset into the file (a multiple of
+                `mmap.ALLOCATIONGRANULARITY`). Defaults to 0.
+            size (int, optional): Number of bytes to map. Defaults to the
+                rest of the file.
+
+        Returns:
+            tuple[int, int]: Start and end address of the mapped range.
+
+        Raises:
+            ValueError: Invalid address, range, or file size.
+        """
+        if addr % self._page_size != 0:
+            raise ValueError(
+                f"Address 0x{addr:08X} is not aligned to the page size")
+        access = mmap.ACCESS_COPY if copy_on_write else mmap.ACCESS_READ
+        with open(path, 'rb') as f:
+            if size is None:
+                f.seek(0, 2)
+                size = f.tell() - offset
+            if size <= 0:
+                raise ValueError(f"Nothing to map from {path}")
+
+            # Check the range before mapping, so nothing is left open on
+            # an error
+            end = addr + size
+            if end > self._size:
+                raise ValueError(f"{path} does not fit into the memory at "
+                                 f"0x{addr:08X}")
+            first = addr >> self._page_bits
+            last = (end - 1) >> self._page_bits
+            if any(start < end and addr < e for start, e, _ in self._regions) \
+                    or any(first <= no <= last for no in self._pages):
+                raise ValueError(f"Memory range 0x{addr:08X}-0x{end:08X} is "
+                                 "already in use")
+
+            buf = mmap.mmap(f.fileno(), size, access=access, offset=offset)
+
+        self._regions.append((addr, end, memoryview(buf)))
+        self._clear_caches()
+        return addr, end
+
+    def _clear_caches(self):
+        self._fetch_cache = (-1, None)
+        self._data_cache = (-1, None)
+
+    def _on_restore(self):
+        # Pages were replaced by a checkpoint restore
+        self._clear_caches()
+
+    def _mapped_page(self, no: int):
+        """Returns a view of page `no` if it lies in a mapped file."""
+        addr = no << self._page_bits
+        for start, end, view in self._regions:
+            if start <= addr < end:
+                return view[addr - start:addr - start + self._page_size]
+        return None
+
+    def _page(self, no: int, alloc: bool, fetch: bool = False):
+        cache = self._fetch_cache if fetch else self._data_cache
+        if no == cache[0]:
+            return cache[1]
+        page = self._pages.get(no)
+        if page is None:
+            page = self._mapped_page(no) if self._regions else None
+            if page is None:
+                if not alloc:
+                    return None
+                page = self._pages[no] = bytearray(self._page_size)
+        if fetch:
+            self._fetch_cache = (no, page)
+        else:
+            self._data_cache = (no, page)
+        return page
+
+    def _writable_page(self, no: int, addr: int, n: int):
+        page = self._page(no, True)
+        if type(page) is memoryview:
+            if page.readonly:
+                raise Exception(
+                    f'ERROR (Memory ({self.name}), write): Address {addr:08X} is read-only')  # noqa: E501
+            if (addr & self._page_mask) + n > len(page):
+                raise IndexError(
+                    f'ERROR (Memory ({self.name}), write): Address {addr:08X} is beyond the mapped file')  # noqa: E501
+        return page
+
+    def _chunks(self, addr: int, n: int):
+        """Yields `(page number, page offset, offset, length)` of the parts
+        of `[addr, addr + n)` in each page."""
+        end = addr + n
+        pos = addr
+        while pos < end:
+            off = pos & self._page_mask
+            length = min(end - pos, self._page_size - off)
+            yield pos >> self._page_bits, off, pos - addr, length
+            pos += length
+
+    def _read_bytes(self, addr: int, n: int) -> bytearray:
+        data = bytearray(n)
+        for no, off, pos, length in self._chunks(addr, n):
+            page = self._page(no, False)
+            if page is not None:
+                # (Pages of mapped files may be cut short)
+                src = page[off:off + length]
+                data[pos:pos + len(src)] = src
+        return data
+
+    def _write_bytes(self, addr: int, data: bytes):
+        if addr < 0 or addr + len(data) > self._size:
+            raise IndexError(
+                f'ERROR (Memory ({self.name}), write): Address {addr:08X} out of range')  # noqa: E501
+        data = memoryview(data)
+        for no, off, pos, length in self._chunks(addr, len(data)):
+            chunk = data[pos:pos + length]
+            if self._page(no, False) is None and chunk == bytes(length):
+                # Untouched pages already read as zero
+                continue
+            page = self._writable_page(no, addr + pos, length)
+            page[off:off + length] = chunk
+
+    def process_read1(self):
+        # Same as `Memory.process_read1()`, with the port's own page cache
+        port = self.read_port1
+        if port.re_i.read():
+            val = self._read(port.addr_i.read(), port.width_i.read(), True)
+        else:
+            val = 0
+        port.rdata_o.write(val)
+
+    def _read(self, addr, w, fetch=False):
+        if w != 4 and w != 1 and w != 2:
+            raise Exception(
+                f'ERROR (Memory ({self.name}), read): Invalid width {w}')
+        if addr < 0 or addr + w > self._size:
+            return 0
+
+        off = addr & self._page_mask
+        if off + w > self._page_size:
+            # Crosses a page boundary
+            val = int.from_bytes(self._read_bytes(addr, w), 'little')
+        else:
+            no = addr >> self._page_bits
+            cached_no, page = \
+                self._fetch_cache if fetch else self._data_cache
+            if no != cached_no:
+                page = self._page(no, False, fetch)
+            try:
+                if page is None:
+                    val = 0
+                elif w == 4:  # word
+                    val = _WORD.unpack_from(page, off)[0]
+                elif w == 1:  # byte
+                    val = page[off]
+                else:  # half word
+                    val = page[off + 1] << 8 | page[off]
+            except (IndexError, struct.error):
+                # Beyond the end of a mapped file
+                val = int.from_bytes(self._read_bytes(addr, w), 'little')
+
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f"MEM ({self.name}): read value {val:08X} from address {addr:08X}")  # noqa: E501
+
+        return val
+
+    def _write(self, addr, w, wdata):
+        off = addr & self._page_mask
+        if addr < 0 or addr + w > self._size or off + w > self._page_size:
+            # Out of range (raises), or crosses a page boundary
+            data = (MASK_32 & wdata).to_bytes(4, 'little')[:w]
+            self._write_bytes(addr, data)
+            return
+
+        page = self._writable_page(addr >> self._page_bits, addr, w)
+        if w == 1:  # byte
+            page[off] = 0xff & wdata
+        elif w == 2:  # half word
+            _HALF.pack_into(page, off, 0xffff & wdata)
+        else:  # word
+            _WORD.pack_into(page, off, MASK_32 & wdata)
@@ -1,16 +1,52 @@
+from dataclasses import dataclass
+from pyv import checkpoint
+from pyv.context import SimContext
 from pyv.module import Module
-from pyv.simulator import Simulator
+from pyv.simulator import RunResult, Simulator
 import traceback
 
 
+@dataclass(frozen=True)
+class ArchState:
+    """Snapshot of the architectural state of a core (see `snapshot()`)."""
+    cycles: int
+    """Number of cycles simulated"""
+    pc: int
+    """Program counter"""
+    regs: tuple[int, ...]
+    """Integer registers x0..x31"""
+    csrs: dict[int, int]
+    """CSR values by address"""
+    mem: dict[int, bytes]
+    """Memory contents by start address (see `Memory.snapshot()`)"""
+
+
 class Model:
     """Base class for all core models.
+
+    Each model has its own simulation context (`ctx`), so several models can
+    coexist and be simulated independently. Subclasses create the context and
+    build their design inside it, before calling `Model.__init__()` (which
+    must be called inside the context as well):
+
+        def __init__(self):
+            self.ctx = SimContext()
+            with self.ctx:
+                self.core = MyCore()
+                self.setTop(self.core, 'MyTop')
+                super().__init__()
+
+    If a subclass does not create a context, the active context is used.
     """
+    ctx: SimContext
+    """Simulation context of this model"""
+
     def __init__(self):
         print("Initializing model...")
 
         self.sim = Simulator()
         """Simulator instance"""
+        self.ctx = self.sim.ctx
 
         # Initialize modules
         try:
@@ -45,6 +81,21 @@ class Model:
         """
         self.sim.setProbes(probes)
 
+    def trace_vcd(self, path: str, probes: list[str] = None, **kwargs):
+        """Records value changes of ports to a VCD waveform file.
+
+        See `Simulator.trace_vcd()`.
+
+        Args:
+            path (str): Output file.
+            probes (list[str], optional): Ports to record.
+            **kwargs: Options passed to `VCDWriter`.
+
+        Returns:
+            VCDWriter: The writer. Call `close()` to finish the file.
+        """
+        return self.sim.trace_vcd(path, probes, **kwargs)
+
     def run(self, num_cycles=1):
         """Runs the simulation.
 
@@ -53,6 +104,50 @@ class Model:
         """
         self.sim.run(num_cycles)
 
+    def run_until(self, predicate=None, max_cycles: int = None,
+                  wall_time: float = None) -> RunResult:
+        """Runs the simulation until a stop condition is met.
+
+        See `Simulator.run_until()`.
+
+        Args:
+            predicate (Callable, optional): Stop when this returns True.
+            max_cycles (int, optional): Maximum number of cycles to simulate.
+            wall_time (float, optional): Wall time budget in seconds.
+
+        Returns:
+            RunResult: Why the run stopped, and the number of cycles.
+        """
+        return self.sim.run_until(predicate, max_cycles, wall_time)
+
+    def save_checkpoint(self, path: str):
+        """Saves the complete simulation state to a file.
+
+        See `pyv.checkpoint` for what is saved.
+
+        Args:
+            path (str): The checkpoint file.
+        """
+        checkpoint.save(path, self.top, self.sim)
+
+    def load_checkpoint(self, path: str):
+        """Restores the simulation state from a checkpoint file.
+
+        The model must be of the same type as the one the checkpoint was
+        saved from. To continue the simulation without a reset, use
+        `sim.run(num_cycles, reset_regs=False)`.
+
+        Only load checkpoints from trusted sources (see `pyv.checkpoint`).
+
+        Args:
+            path (str): The checkpoint file.
+
+        Raises:
+            ValueError: The file is not a checkpoint, or does not match this
+                model.
+        """
+        checkpoint.load(path, self.top, self.sim)
+
     def getCycles(self):
         """Get number cycles executed.
 
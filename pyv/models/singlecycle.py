@@ -1,11 +1,19 @@
+from pyv.context import SimContext
 from pyv.csr import CSRUnit
 from pyv.stages import EXMEM_t, IFID_t, IFStage, IDStage, EXStage, MEMStage, \
     WBStage, BranchUnit
+import struct
+from pyv.elf import ElfFile
 from pyv.mem import Memory
 from pyv.reg import Regfile
 from pyv.module import Module
-from pyv.models.model import Model
+from pyv.models.model import ArchState, Model
+from pyv.semihost import Semihost
+from pyv.simulator import RunResult
 from pyv.port import Wire
+from pyv.util import MASK_32, import_numpy
+
+_REGS = struct.Struct('<32I')
 
 
 class SingleCycle(Module):
@@ -73,11 +81,85 @@ class SingleCycleModel(Model):
     """Model wrapper for SingleCycle."""
 
     def __init__(self):
-        self.core = SingleCycle()
-        """Module instance"""
-        self.setTop(self.core, 'SingleCycleTop')
+        self.ctx = SimContext()
+        with self.ctx:
+            self.core = SingleCycle()
+            """Module instance"""
+            self.setTop(self.core, 'SingleCycleTop')
 
-        super().__init__()
+            super().__init__()
+
+        self.symbols = {}
+        """Symbol table of the loaded ELF file (name -> `pyv.elf.Symbol`)"""
+        self.semihost = None
+        """Semihosting interface (see `enable_semihosting()`)"""
+
+    def run_until(self, predicate=None, max_cycles: int = None,
+                  wall_time: float = None, pc: int = None,
+                  mem_write: int = None) -> RunResult:
+        """Runs the simulation until a stop condition is met.
+
+        In addition to the conditions of `Model.run_until()`, the run can
+        stop on a PC breakpoint (reason `'pc'`), or after a write to a
+        memory address (reason `'mem_write'`).
+
+        Args:
+            predicate (Callable, optional): Stop when this returns True.
+            max_cycles (int, optional): Maximum number of cycles to simulate.
+            wall_time (float, optional): Wall time budget in seconds.
+            pc (int, optional): Stop before the instruction at this address
+                is executed.
+            mem_write (int, optional): Stop after the cycle in which this
+                byte address was written.
+
+        Returns:
+            RunResult: Why the run stopped, and the number of cycles.
+        """
+        if pc is not None:
+            pc_port = self.core.if_stg.pc_reg.cur
+            user_predicate = predicate
+
+            def predicate():
+                if pc_port.read() == pc:
+                    return 'pc'
+                return user_predicate is not None and user_predicate()
+
+        watch = None
+        if mem_write is not None:
+            watch = self.core.mem.add_write_watch(
+                mem_write, lambda *_: self.sim.stop('mem_write'))
+        try:
+            return super().run_until(predicate, max_cycles, wall_time)
+        finally:
+            if watch is not None:
+                self.core.mem.remove_write_watch(watch)
+
+    def enable_semihosting(self, tohost='tohost', console='console',
+                           stream=None) -> Semihost:
+        """Let the program exit and print through memory-mapped words.
+
+        See `pyv.semihost`. Once the program exits, `run_until()` stops with
+        reason `'exit'`, and the exit code is in `semihost.exit_code`.
+
+        Args:
+            tohost (int | str, optional): Address or symbol name of the
+                `tohost` word. Defaults to the symbol `tohost`.
+            console (int | str, optional): Address or symbol name of the
+                console word, or None. Defaults to the symbol `console`, if
+                the loaded program has one.
+            stream (TextIO, optional): Host stream for the console output.
+
+        Returns:
+            Semihost: The interface.
+        """
+        if self.semihost is not None:
+            self.semihost.close()
+        if console == 'console' and console not in self.symbols:
+            console = None
+        console = None if console is None else self._addr(console)
+        self.semihost = Semihost(self.sim, self.core.mem, self._addr(tohost),
+                                 console, stream)
+        return self.semihost
 
     def log(self):
         """Custom log function.
@@ -101,13 +183,46 @@ class SingleCycleModel(Model):
         Args:
             file (string): Path to the binary.
         """
-        f = open(file, 'rb')
-        ba = bytearray(f.read())
-        f.close()
-        inst = list(ba)
+        with open(file, 'rb') as f:
+            inst = f.read()
 
         self.core.mem.mem[:len(inst)] = inst
 
+    def load_elf(self, file) -> ElfFile:
+        """Load an ELF executable into the memory.
+
+        The loadable segments are placed at their addresses (`.bss` is
+        zero-filled), the PC starts at the entry point after the next reset,
+        and the symbol table becomes available in `symbols`.
+
+        Args:
+            file (string): Path to the ELF file.
+
+        Returns:
+            ElfFile: The parsed file.
+        """
+        elf = ElfFile.read(file)
+        elf.load(self.core.mem)
+        # The PC register holds the address of the instruction before the
+        # next one to fetch
+        self.core.if_stg.pc_reg._resetVal = elf.entry - 4
+        self.symbols = elf.symbols
+        return elf
+
+    def symbol(self, name: str) -> int:
+        """Look up the address of a symbol of the loaded ELF file.
+
+        Args:
+            name (str): Symbol name.
+
+        Returns:
+            int: Address of the symbol.
+        """
+        try:
+            return self.symbols[name].addr
+        except KeyError:
+            raise KeyError(f"Unknown symbol '{name}'") from None
+
     def readReg(self, reg):
         """Read a register in the register file.
 
@@ -119,6 +234,33 @@ class SingleCycleModel(Model):
         """
         return self.core.regf.read(reg)
 
+    def readRegs(self) -> list[int]:
+        """Read all registers of the register file.
+
+        Returns:
+            list[int]: Values of x0..x31.
+        """
+        return list(self.core.regf.regs)
+
+    def readRegsBytes(self) -> bytes:
+        """Read all registers of the register file as bytes.
+
+        Returns:
+            bytes: x0..x31 as little-endian 32 bit words.
+        """
+        return _REGS.pack(*[r & MASK_32 for r in self.core.regf.regs])
+
+    def readRegsArray(self):
+        """Read all registers of the register file into a NumPy array.
+
+        Requires NumPy.
+
+        Returns:
+            numpy.ndarray: x0..x31 as `uint32`.
+        """
+        np = import_numpy()
+        return np.frombuffer(self.readRegsBytes(), dtype='<u4')
+
     def readPC(self):
         """Read current program counter (PC).
 
@@ -131,13 +273,84 @@ class SingleCycleModel(Model):
         """Read bytes from data memory.
 
         Args:
-            addr (int): Address to read from
+            addr (int | str): Address to read from, or the name of a symbol
+                of the loaded ELF file.
             nbytes (int): How many bytes to read starting from `addr`.
 
         Returns:
             list: List of bytes.
         """
-        return [hex(self.core.mem.mem[addr + i]) for i in range(0, nbytes)]
+        return [hex(b) for b in self.readDataBytes(addr, nbytes)]
+
+    def _addr(self, addr) -> int:
+        return self.symbol(addr) if isinstance(addr, str) else addr
+
+    def readDataBytes(self, addr, nbytes) -> bytes:
+        """Read bytes from data memory.
+
+        Args:
+            addr (int | str): Address to read from, or a symbol name.
+            nbytes (int): How many bytes to read starting from `addr`.
+
+        Returns:
+            bytes: A copy of the bytes.
+        """
+        return self.core.mem.read_bytes(self._addr(addr), nbytes)
+
+    def viewDataMem(self, addr, nbytes) -> memoryview:
+        """Get a read-only view of data memory (see `Memory.view()`).
+
+        Args:
+            addr (int | str): Start address, or a symbol name.
+            nbytes (int): Number of bytes.
+
+        Returns:
+            memoryview: The view. It shares the memory's buffer, so reading
+                it costs no copy.
+        """
+        return self.core.mem.view(self._addr(addr), nbytes)
+
+    def readDataArray(self, addr, nbytes, dtype='u1'):
+        """Get a read-only NumPy array view of data memory.
+
+        Requires NumPy. Like `viewDataMem()`, the array shares the memory's
+        buffer.
+
+        Args:
+            addr (int | str): Start address, or a symbol name.
+            nbytes (int): Number of bytes.
+            dtype (optional): NumPy data type of the elements (e.g., `'<u4'`
+                for words). Defaults to bytes.
+
+        Returns:
+            numpy.ndarray: The array.
+        """
+        np = import_numpy()
+        return np.frombuffer(self.viewDataMem(addr, nbytes), dtype=dtype)
+
+    def readDataWord(self, addr, signed: bool = False) -> int:
+        """Read a word from data memory.
+
+        Args:
+            addr (int | str): Address to read from, or a symbol name.
+            signed (bool, optional): Interpret the word as signed.
+
+        Returns:
+            int: The word.
+        """
+        return self.core.mem.read_word(self._addr(addr), signed)
+
+    def readDataHalf(self, addr, signed: bool = False) -> int:
+        """Read a half word from data memory.
+
+        Args:
+            addr (int | str): Address to read from, or a symbol name.
+            signed (bool, optional): Interpret the half word as signed.
+
+        Returns:
+            int: The half word.
+        """
+        return self.core.mem.read_half(self._addr(addr), signed)
 
     def readInstMem(self, addr, nbytes):
         """Read bytes from instruction memory.
@@ -149,4 +362,16 @@ class SingleCycleModel(Model):
         Returns:
             list: List of bytes.
         """
-        return [hex(self.core.mem.mem[addr + i]) for i in range(0, nbytes)]
+        return [hex(b) for b in self.core.mem.read_bytes(addr, nbytes)]
+
+    def snapshot(self) -> ArchState:
+        """Take a snapshot of the architectural state.
+
+        Returns:
+            ArchState: Copies of the PC, registers, CSRs, and memory.
+        """
+        csrs = {addr: csr.csr_val_o.read()
+                for addr, csr in self.core.csr_unit.csr_bank.csrs.items()}
+        return ArchState(self.getCycles(), self.readPC(),
+                         tuple(self.core.regf.regs), csrs,
+                         self.core.mem.snapshot())
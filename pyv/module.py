@@ -20,7 +20,7 @@ class Module(PyVObj):
 
     def _init_stable_callbacks(self):
         for sb in self._stable_callbacks:
-            Simulator.registerStableCallback(sb)
+            Simulator.registerStableCallback(sb, self._ctx)
 
     def registerStableCallbacks(self, callbacks: list[Callable]):
         """Register methods to be called back once all signal values during the
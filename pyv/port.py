@@ -1,24 +1,46 @@
 from abc import ABC, abstractmethod
 import copy
 import inspect
-from typing import Any, TypeVar, Generic, Type
-from pyv.log import logger
-from pyv.util import PyVObj
+from typing import Any, Callable, TypeVar, Generic, Type
+from pyv.context import SimContext, get_context
+from pyv.log import DEBUG, INFO, logger
+from pyv.util import PyVObj, is_immutable_type
 
 
 T = TypeVar('T')
 
 
+class _Net:
+    """Signal cell shared by all ports connected to the same root driver.
+
+    Holds the current value, and caches the change hooks and process methods
+    of all inputs of the net (`fanout`, see `Port._get_fanout()`). The cache
+    is rebuilt on the next change after the net was modified (`fanout` is
+    None).
+    """
+    __slots__ = ('val', 'hooks', 'fanout')
+
+    def __init__(self, val):
+        self.val = val
+        self.hooks = None
+        self.fanout = None
+
+
 class Port(PyVObj, ABC):
     """Abstract base class for ports."""
-    def __init__(self, type, val) -> None:
+    __slots__ = ('_type', '_net', '_root_driver', '_downstreamInputs',
+                 '_parent', '_children')
+
+    def __init__(self, typ, val) -> None:
         super().__init__(name='UnnamedPort')
-        self._type = type
+        self._type = typ
         if val is not None:
-            self._val = copy.deepcopy(val)
+            if not is_immutable_type(type(val)):
+                val = copy.deepcopy(val)
         else:
             # Take the type's default value
-            self._val = self._type()
+            val = self._type()
+        self._net = _Net(val)
         self._root_driver = self
         self._downstreamInputs: list[Input] = []
 
@@ -27,7 +49,15 @@ class Port(PyVObj, ABC):
         # Which ports does this port drive?
         self._children = []
 
-        PortList.addPort(self)
+        PortList.addPort(self, self._ctx)
+
+    @property
+    def _val(self):
+        return self._net.val
+
+    @_val.setter
+    def _val(self, val):
+        self._net.val = val
 
     @abstractmethod
     def read(self):
@@ -42,48 +72,82 @@ class Port(PyVObj, ABC):
         self._downstreamInputs.append(port)
 
     def _clear_root_attrs(self):
-        del self._val
         self._downstreamInputs = []
 
+    def _get_fanout(self) -> tuple:
+        """Returns the change hooks and the process methods triggered by a
+        change of this (root) port.
+
+        Both are collected from all inputs of the net, without duplicates,
+        and cached in the net until it is modified.
+        """
+        net = self._net
+        if net.fanout is None:
+            inputs = list(self._downstreamInputs)
+            if isinstance(self, Input):
+                inputs.insert(0, self)
+            hooks = {}
+            fanout = {}
+            for inp in inputs:
+                handler = inp._processMethodHandler
+                hooks.update(dict.fromkeys(handler._hooks))
+                fanout.update(dict.fromkeys(handler._processMethods))
+            net.hooks = tuple(hooks)
+            net.fanout = tuple(fanout)
+        return net.hooks, net.fanout
+
 
 class PortList:
-    port_list: list[Port] = []
-    port_list_filtered: list[Port] = []
+    """Keeps track of all ports.
 
+    The lists of ports are owned by the simulation context
+    (`SimContext.port_list`, `SimContext.port_list_filtered`). All methods
+    take an optional context; if omitted, the active context is used.
+    """
     @staticmethod
-    def addPort(port):
-        PortList.port_list.append(port)
+    def addPort(port, ctx: SimContext = None):
+        (ctx or get_context()).port_list.append(port)
 
     @staticmethod
-    def clear():
-        PortList.port_list = []
-        PortList.port_list_filtered = []
+    def clear(ctx: SimContext = None):
+        ctx = ctx or get_context()
+        ctx.port_list = []
+        ctx.port_list_filtered = []
 
     @staticmethod
-    def logPorts():
-        if len(PortList.port_list_filtered) > 0:
-            ports_to_log = PortList.port_list_filtered
+    def logPorts(ctx: SimContext = None):
+        if not logger.isEnabledFor(INFO):
+            return
+        ctx = ctx or get_context()
+        if len(ctx.port_list_filtered) > 0:
+            ports_to_log = ctx.port_list_filtered
         else:
-            ports_to_log = PortList.port_list
+            ports_to_log = ctx.port_list
 
         for p in ports_to_log:
             logger.info(f"{p.name}: {p.read()}")
 
     @staticmethod
-    def filter(patterns: list[str]):
+    def filter(patterns: list[str], ctx: SimContext = None):
+        ctx = ctx or get_context()
         for pat in patterns:
-            for port in PortList.port_list:
+            for port in ctx.port_list:
                 if pat in port.name:
-                    if port not in PortList.port_list_filtered:
-                        PortList.port_list_filtered.append(port)
+                    if port not in ctx.port_list_filtered:
+                        ctx.port_list_filtered.append(port)
 
 
 class _ProcessMethodHandler():
-    def __init__(self, sensitive_methods) -> None:
+    __slots__ = ('_ctx', '_processMethods', '_hooks')
+
+    def __init__(self, sensitive_methods, ctx: SimContext) -> None:
+        self._ctx = ctx
         # Setup sensitivity list
         self._processMethods = []
         for m in sensitive_methods:
             self._addProcessMethod(m)
+        # Called directly on a change (not via the simulator queue)
+        self._hooks = []
 
     def _addProcessMethod(self, func):
         if func not in self._processMethods:
@@ -105,13 +169,17 @@ class _ProcessMethodHandler():
         self.add_methods_to_sim_queue()
 
     def add_methods_to_sim_queue(self):
-        import pyv.simulator as simulator
+        for hook in self._hooks:
+            hook()
+        sim = self._ctx.sim
         for func in self._processMethods:
-            simulator.Simulator.globalSim._addToChangeQueue(func)
+            sim._addToChangeQueue(func)
 
 
 class PortRW(Port, Generic[T]):
     """Base class for read/write ports"""
+    __slots__ = ()
+
     def __init__(self, type: Type[T]):
         """Create a new `PortRW` object.
 
@@ -126,10 +194,7 @@ class PortRW(Port, Generic[T]):
         Returns:
             The current value of the port.
         """
-        if self._root_driver is self:
-            return self._val
-        else:
-            return self._root_driver.read()
+        return self._net.val
 
     def write(self, val: T):
         """Writes a new value to the port.
@@ -146,21 +211,17 @@ class PortRW(Port, Generic[T]):
         """
 
         if self._root_driver is self:
-            def update_val_and_propagate():
-                oldVal = self._val
-                newVal = val
-                self._val = newVal
-                self._propagate(oldVal, newVal)
-
-            # If the value is different from the current value we have to
-            # propagate the change to all children ports.
-
             # Make sure the type is correct
             if type(val) is not self._type:
                 raise TypeError(f"ERROR: Cannot write value of type {type(val)} to Port {self.name} which is of type {self._type}.")  # noqa: E501
 
-            if self._val != val:
-                update_val_and_propagate()
+            # If the value is different from the current value we have to
+            # propagate the change to all children ports.
+            net = self._net
+            if net.val != val:
+                oldVal = net.val
+                net.val = val
+                self._propagate(oldVal, val)
 
         else:
             raise Exception(f"ERROR (Port '{self.name}'): Only root driver port allowed to write!")  # noqa: E501
@@ -168,14 +229,23 @@ class PortRW(Port, Generic[T]):
     def _propagate(self, oldVal: T, newVal: T):
         """Propagate a value change.
         """
-        logger.debug(f"Port {self.name} changed from {oldVal} to {newVal}.")
-
-        for port in self._downstreamInputs:
-            logger.debug(f"Notifying {port.name}")
-            port._notify()
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f"Port {self.name} changed from {oldVal} to {newVal}.")  # noqa: E501
+            profiler = self._ctx.sim._profiler
+            if profiler is not None:
+                profiler.changes += 1
+            for port in self._downstreamInputs:
+                logger.debug(f"Notifying {port.name}")
+                port._notify()
+        else:
+            hooks, fanout = self._get_fanout()
+            for hook in hooks:
+                hook()
+            self._ctx.sim._addAllToChangeQueue(fanout)
 
     def _set_root_driver(self, newRoot: Port):
         self._root_driver = newRoot
+        self._net = newRoot._net
 
     def _update_root_driver(self, driver: Port):
         self._set_root_driver(driver._root_driver)
@@ -220,6 +290,7 @@ class PortRW(Port, Generic[T]):
             driver._children.append(self)
             self._update_root_driver(driver)
             self._clear_root_attrs()
+            self._net.fanout = None
         else:
             raise Exception(
                 f"ERROR (Port): Port {self.name} already has a parent!")
@@ -238,6 +309,8 @@ class PortRW(Port, Generic[T]):
 
 class Input(PortRW[T]):
     """Represents an **Input** port."""
+    __slots__ = ('_processMethodHandler',)
+
     def __init__(self, type: type[T], sensitive_methods=[]):
         """Create a new input port.
 
@@ -255,11 +328,13 @@ class Input(PortRW[T]):
                 well, you have to include it explicitly in the list.
         """
         super().__init__(type)
-        self._processMethodHandler = _ProcessMethodHandler(sensitive_methods)
+        self._processMethodHandler = _ProcessMethodHandler(sensitive_methods,
+                                                           self._ctx)
 
     def _init(self, parent: PyVObj):
         super()._init(parent)
         self._processMethodHandler.init_process_methods(parent)
+        self._net.fanout = None
 
     def _set_root_driver(self, newRoot: Port):
         super()._set_root_driver(newRoot)
@@ -271,15 +346,33 @@ class Input(PortRW[T]):
 
         # logger.debug(f"Port {self.name} changed from {oldVal} to {newVal}.")
 
-        self._processMethodHandler.add_methods_to_sim_queue()
+        # Without debug logging, the net's fanout includes this input
+        if logger.isEnabledFor(DEBUG):
+            self._processMethodHandler.add_methods_to_sim_queue()
         super()._propagate(oldVal, newVal)
 
     def _notify(self):
         self._processMethodHandler.add_methods_to_sim_queue()
 
+    def add_change_hook(self, hook: Callable[[], None]):
+        """Registers a function to call whenever the value of this input
+        changes.
+
+        Unlike sensitive methods, change hooks are called immediately (not via
+        the simulator queue). They must not write to ports. Clocked elements
+        use them to notice that they may change on the next tick.
+
+        Args:
+            hook (Callable): The function to call.
+        """
+        self._processMethodHandler._hooks.append(hook)
+        self._net.fanout = None
+
 
 class Output(PortRW[T]):
     """Represents an **Output** port."""
+    __slots__ = ()
+
     def __init__(self, type: type[T]):
         """Create a new ouput port.
 
@@ -300,6 +393,8 @@ class Wire(Input[T]):
 
     If wire value changes, sensitive methods are triggered.
     """
+    __slots__ = ()
+
     def __init__(self, type: Type[T], sensitive_methods=[]):
         """Create a new wire.
 
@@ -314,6 +409,8 @@ class Constant(Port):
     """Represents a constant signal. Once initialized, its value cannot be
     changed.
     """
+    __slots__ = ()
+
     def __init__(self, constVal: Any):
         """Create a new constant signal.
 
@@ -323,4 +420,4 @@ class Constant(Port):
         super().__init__(type(constVal), constVal)
 
     def read(self):
-        return self._val
+        return self._net.val
@@ -0,0 +1,184 @@
+"""Profiler for process methods.
+
+Records, for every process method, how often it was evaluated (in total and
+at most per cycle), how much time it took, and how often it was evaluated
+without changing any port value. It also records the number of delta
+iterations per cycle: the methods pending at the start of a cycle form the
+first delta iteration, the methods they trigger the second, and so on.
+
+Cycles are counted on the clock tick; idle cycles skipped by the simulator
+(see `Simulator.fast_forward`) are not counted. Port value changes are only
+counted while profiling is enabled.
+Profiling is not available with the compiled netlist backend.
+
+Example:
+
+    prof = sim.enable_profiling()
+    sim.run(1000)
+    print(prof.table())
+    prof.save_json('profile.json')
+"""
+import json
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class MethodStats:
+    """Profile of a single process method."""
+    name: str
+    """Hierarchical name (instance name and method name)"""
+    qualname: str
+    """Qualified name (class name and method name)"""
+    calls: int = 0
+    """Number of evaluations"""
+    max_calls_per_cycle: int = 0
+    """Maximum number of evaluations in a single cycle"""
+    time_ns: int = 0
+    """Cumulative time in nanoseconds"""
+    no_change_calls: int = 0
+    """Number of evaluations that did not change any port value"""
+
+
+def _method_name(fn) -> str:
+    owner = getattr(fn, '__self__', None)
+    name = getattr(owner, 'name', None)
+    if isinstance(name, str):
+        return f'{name}.{fn.__name__}'
+    return fn.__qualname__
+
+
+class Profiler:
+    """Collects process method statistics of a simulator."""
+
+    def __init__(self, ctx):
+        """Create a new profiler.
+
+        Use `Simulator.enable_profiling()` to profile a simulator.
+
+        Args:
+            ctx (SimContext): The simulation context of the simulator.
+        """
+        self._ctx = ctx
+        self._stats = {}
+        self.cycles = 0
+        """Number of profiled cycles (clock ticks while profiling)"""
+        self.changes = 0
+        """Number of port value changes while profiling"""
+        self.deltas = Counter()
+        """Histogram of delta iterations per evaluation of the logic"""
+
+    def _stats_of(self, fn) -> MethodStats:
+        stats = self._stats.get(fn)
+        if stats is None:
+            stats = MethodStats(_method_name(fn), fn.__qualname__)
+            self._stats[fn] = stats
+        return stats
+
+    def process(self, queue) -> int:
+        """Evaluates all pending methods of `queue` and profiles them.
+
+        Args:
+            queue: The change queue of the simulator.
+
+        Returns:
+            int: Number of evaluations.
+        """
+        clock = time.perf_counter_ns
+        calls = Counter()
+        num_evals = 0
+        deltas = 0
+        remaining = 0
+
+        while len(queue) > 0:
+            if remaining == 0:
+                # Everything pending now was triggered by the previous delta
+                deltas += 1
+                remaining = len(queue)
+            remaining -= 1
+
+            fn = queue.pop()
+            changes = self.changes
+            start = clock()
+            fn()
+            elapsed = clock() - start
+
+            stats = self._stats_of(fn)
+            stats.calls += 1
+            stats.time_ns += elapsed
+            if self.changes == changes:
+                stats.no_change_calls += 1
+            calls[fn] += 1
+            num_evals += 1
+        queue.settled()
+
+        for fn, n in calls.items():
+            stats = self._stats[fn]
+            if n > stats.max_calls_per_cycle:
+                stats.max_calls_per_cycle = n
+        self.deltas[deltas] += 1
+        return num_evals
+
+    def reset(self):
+        """Discards all statistics collected so far."""
+        self._stats.clear()
+        self.cycles = 0
+        self.changes = 0
+        self.deltas.clear()
+
+    def stats(self) -> list[MethodStats]:
+        """Returns the method statistics, most time-consuming first."""
+        return sorted(self._stats.values(), key=lambda s: (-s.time_ns, s.name))
+
+    def to_dict(self) -> dict:
+        """Returns all statistics as a JSON-serializable dict."""
+        num_deltas = sum(n * cnt for n, cnt in self.deltas.items())
+        num_evals = sum(self.deltas.values())
+        return {
+            'cycles': self.cycles,
+            'deltas': {
+                'mean': num_deltas / num_evals if num_evals else 0.0,
+                'max': max(self.deltas, default=0),
+                'histogram': {str(n): cnt
+                              for n, cnt in sorted(self.deltas.items())},
+            },
+            'methods': [asdict(s) for s in self.stats()],
+        }
+
+    def save_json(self, path: str):
+        """Writes the statistics to a JSON file (see `to_dict()`)."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def table(self, limit: int = None) -> str:
+        """Returns the method statistics as a text table.
+
+        Args:
+            limit (int, optional): Only include the `limit` most
+                time-consuming methods.
+        """
+        stats = self.stats()[:limit]
+        total_ns = sum(s.time_ns for s in self._stats.values()) or 1
+        cycles = self.cycles or 1
+        rows = [(s.name, f'{s.calls}', f'{s.calls / cycles:.2f}',
+                 f'{s.max_calls_per_cycle}', f'{s.time_ns / 1e6:.3f}',
+                 f'{s.time_ns / s.calls / 1e3:.2f}',
+                 f'{100 * s.time_ns / total_ns:.1f}',
+                 f'{100 * s.no_change_calls / s.calls:.1f}')
+                for s in stats]
+        header = ('Method', 'Calls', 'Calls/cyc', 'Max/cyc', 'Time [ms]',
+                  'Per call [us]', 'Time [%]', 'No change [%]')
+        widths = [max(len(r[i]) for r in rows + [header])
+                  for i in range(len(header))]
+
+        def fmt(row):
+            cells = [c.rjust(w) for c, w in zip(row[1:], widths[1:])]
+            return '  '.join([row[0].ljust(widths[0])] + cells)
+
+        d = self.to_dict()['deltas']
+        lines = [fmt(header), '  '.join('-' * w for w in widths)]
+        lines += [fmt(r) for r in rows]
+        lines.append(f"\n{self.cycles} cycles, delta iterations per cycle: "
+                     f"mean {d['mean']:.2f}, max {d['max']}")
+        return '\n'.join(lines)
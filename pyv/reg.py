@@ -1,15 +1,22 @@
 import copy
-from pyv.util import PyVObj
+from pyv.util import PyVObj, is_immutable_type
 from pyv.port import Input, Wire
 from pyv.clocked import Clocked, RegList
-from pyv.log import logger
+from pyv.log import DEBUG, logger
 from typing import TypeVar, Generic, Type
 
 T = TypeVar('T')
 
 
 class Reg(PyVObj, Clocked, Generic[T]):
-    """Represents a register."""
+    """Represents a register.
+
+    The register is marked dirty (see `pyv.clocked.Clock`) whenever its
+    next, reset or current value changes.
+    """
+    __slots__ = ('_mark_dirty', 'next', 'cur', 'rst', '_nextv', '_resetVal',
+                 '_copy', '_doReset', '_doTick')
+    _tracks_changes = True
 
     def __init__(self, type: Type[T], resetVal: T = 0, sensitive_methods=[]):
         """Create a new register.
@@ -23,7 +30,7 @@ class Reg(PyVObj, Clocked, Generic[T]):
         super().__init__(name='UnnamedRegister')
 
         # Add this register to the global register list
-        RegList.add_to_reg_list(self)
+        self._mark_dirty = RegList.add_to_reg_list(self, self._ctx)
 
         self.next: Input = Input(type, [None])
         """Next value input"""
@@ -31,9 +38,13 @@ class Reg(PyVObj, Clocked, Generic[T]):
         """Current value output"""
         self.rst: Input = Input(int, [None])
         """Synchronous Reset in (active high)"""
+        for port in (self.next, self.cur, self.rst):
+            port.add_change_hook(self._mark_dirty)
 
         self._nextv = 0
         self._resetVal = resetVal
+        # Immutable values are latched by reference
+        self._copy = not is_immutable_type(type)
 
         # Whether to do a reset on the next tick
         self._doReset = False
@@ -51,15 +62,17 @@ class Reg(PyVObj, Clocked, Generic[T]):
         if self.rst.read() == 1:
             self._doReset = True
         elif self.rst.read() == 0:
-            if self.cur.read() != self.next.read():
-                self._nextv = copy.deepcopy(self.next.read())
+            nextv = self.next.read()
+            if self.cur.read() != nextv:
+                self._nextv = copy.deepcopy(nextv) if self._copy else nextv
                 self._doTick = True
         else:
             raise Exception("Error: Invalid rst signal!")
 
     def _tick(self):
         if self._doReset:
-            logger.debug(f"Sync reset on register {self.name}. Reset value: {self._resetVal}.")  # noqa: E501
+            if logger.isEnabledFor(DEBUG):
+                logger.debug(f"Sync reset on register {self.name}. Reset value: {self._resetVal}.")  # noqa: E501
             self._reset()
         elif self._doTick:
             self.cur.write(self._nextv)
@@ -67,12 +80,22 @@ class Reg(PyVObj, Clocked, Generic[T]):
     def _reset(self):
         self.cur.write(self._resetVal)
 
+    def _is_idle(self):
+        rst = self.rst.read()
+        if rst == 0:
+            return self.cur.read() == self.next.read()
+        elif rst == 1:
+            return self.cur.read() == self._resetVal
+        else:
+            return False
+
 
 class Regfile(Clocked):
     """RISC-V: Integer register file."""
+    _tracks_changes = True
 
     def __init__(self):
-        RegList.add_to_reg_list(self)
+        self._mark_dirty = RegList.add_to_reg_list(self)
         self.regs = [0] * 32
         self._nextWIdx = 0
         self._nextWval = 0
@@ -103,7 +126,8 @@ class Regfile(Clocked):
             # because the decoder will only feed-in valid 5 bit indeces.
             try:
                 val = self.regs[reg]
-                logger.debug(f"Regfile READ: x{reg} = {val}")
+                if logger.isEnabledFor(DEBUG):
+                    logger.debug(f"Regfile READ: x{reg} = {val}")
             except IndexError:
                 val = 0
 
@@ -123,6 +147,7 @@ class Regfile(Clocked):
             self._nextWidx = reg
             self._nextWval = val
             self.we = True
+            self._mark_dirty()
 
     def _prepareNextVal(self):
         # Not needed for now, as we don't have Input ports here
@@ -136,13 +161,17 @@ class Regfile(Clocked):
         if not self.we:
             return
 
-        logger.debug(f"Regfile WRITE: x{self._nextWidx} changed from {self.regs[self._nextWidx]} to {self._nextWval}")  # noqa: E501
+        if logger.isEnabledFor(DEBUG):
+            logger.debug(f"Regfile WRITE: x{self._nextWidx} changed from {self.regs[self._nextWidx]} to {self._nextWval}")  # noqa: E501
         self.regs[self._nextWidx] = self._nextWval
 
         # TODO: Technically, it shouldn't be the regfile's responsibility to
         # reset the write enables. But we leave it now for safety.
         self.we = False
 
+    def _is_idle(self):
+        return not self.we
+
     def _reset(self):
         """Resets the register file."""
         self.regs = [0] * 32
@@ -0,0 +1,95 @@
+"""Semihosting: lets simulated programs exit and print to the host.
+
+Programs talk to the host through two memory-mapped words (watched with
+`Memory.add_write_watch()`):
+
+- `tohost`: Writing `(code << 1) | 1` exits the simulation with exit code
+  `code`: `run_until()` stops with reason `'exit'`. This is the encoding of
+  the RISC-V test environment (HTIF). Other values are ignored.
+- `console`: Writing a value appends its low byte to the console output.
+  Output is buffered, and passed to the host stream line by line.
+
+`programs/common/crt.S` defines both symbols and exits with the return
+value of `main`; `programs/common/semihost.h` has helpers for C programs.
+
+Example:
+
+    model.load_elf('programs/fibonacci/fibonacci.out')
+    host = model.enable_semihosting(stream=sys.stdout)
+    res = model.run_until(max_cycles=10000)
+    if res.reason == 'exit':
+        print(host.exit_code)
+"""
+from typing import Optional, TextIO
+from pyv.log import logger
+from pyv.mem import Memory
+from pyv.simulator import Simulator
+
+
+class Semihost:
+    """Host side of the `tohost` and console interface of one memory."""
+
+    def __init__(self, sim: Simulator, mem: Memory, tohost: int,
+                 console: int = None, stream: TextIO = None):
+        """Starts watching the semihosting addresses.
+
+        Args:
+            sim (Simulator): Simulator to stop on exit.
+            mem (Memory): Memory the program writes to.
+            tohost (int): Address of the `tohost` word.
+            console (int, optional): Address of the console word. Defaults
+                to no console.
+            stream (TextIO, optional): Host stream that receives the console
+                output (e.g., `sys.stdout`). Defaults to none (output is only
+                collected in `output`).
+        """
+        self._sim = sim
+        self._mem = mem
+        self._tohost = tohost
+        self._stream = stream
+        self._line = bytearray()
+        self.exit_code: Optional[int] = None
+        """Exit code of the program, once it has exited"""
+        self.output = bytearray()
+        """All console output of the program"""
+
+        self._watches = [mem.add_write_watch(tohost, self._write_tohost, 4)]
+        if console is not None:
+            self._watches.append(
+                mem.add_write_watch(console, self._write_console, 4))
+
+    def _write_tohost(self, addr, w, wdata):
+        val = self._mem.read_word(self._tohost)
+        if val & 1:
+            self.exit_code = val >> 1
+            self.flush()
+            self._sim.stop('exit')
+        elif val != 0:
+            logger.warning(
+                f"Semihost: Ignoring unsupported tohost value 0x{val:08X}")
+
+    def _write_console(self, addr, w, wdata):
+        c = wdata & 0xff
+        self.output.append(c)
+        self._line.append(c)
+        if c == 0x0a:
+            self.flush()
+
+    @property
+    def text(self) -> str:
+        """Console output, decoded as UTF-8."""
+        return self.output.decode(errors='replace')
+
+    def flush(self):
+        """Passes buffered console output to the host stream."""
+        if self._stream is not None and self._line:
+            self._stream.write(self._line.decode(errors='replace'))
+            self._stream.flush()
+        self._line.clear()
+
+    def close(self):
+        """Flushes the console and stops watching the addresses."""
+        self.flush()
+        for watch in self._watches:
+            self._mem.remove_write_watch(watch)
+        self._watches = []
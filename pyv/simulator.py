@@ -1,54 +1,322 @@
 from pyv.port import PortList
 from collections import deque
-from pyv.log import logger
+from pyv.log import DEBUG, INFO, logger
 from pyv.clocked import Clock
-from queue import PriorityQueue
-from typing import TypeAlias, Callable
-import uuid
+from pyv.context import SimContext, get_context
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Callable
 from datetime import datetime
 
-Event: TypeAlias = tuple[int, uuid.UUID, Callable]
+
+class Event:
+    """Handle of a scheduled event.
+
+    Returned when posting an event. Can be used to cancel the event.
+    """
+    def __init__(self, time: int, callback: Callable, period: int = 0):
+        self.time = time
+        """Absolute time (cycle) of the next trigger"""
+        self.callback = callback
+        """Callback function to call on event trigger"""
+        self.period = period
+        """Re-trigger period in cycles. 0 for one-shot events."""
+        self.cancelled = False
+        """Whether the event has been cancelled"""
+        self._queue = None
+
+    def cancel(self):
+        """Cancels the event.
+
+        For periodic events, this cancels all future triggers.
+        """
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self._queue is not None:
+            self._queue._num_cancelled += 1
 
 
 class _EventQueue:
+    """Time-ordered queue of events.
+
+    Events with the same time are triggered in the order they were posted.
+    Cancelled events stay in the heap and are dropped once they reach the
+    front.
+    """
     def __init__(self):
-        self._queue = PriorityQueue()
+        self._queue: list[tuple[int, int, Event]] = []
+        self._seq = itertools.count()
+        self._num_cancelled = 0
 
     def _get_num_events(self):
-        return len(self._queue.queue)
+        return len(self._queue) - self._num_cancelled
 
-    def add_event(self, time_abs, callback):
-        if time_abs < 0:
+    def _push(self, event: Event):
+        if event.time < 0:
             raise Exception("Invalid event time.")
+        event._queue = self
+        heapq.heappush(self._queue, (event.time, next(self._seq), event))
+
+    def add_event(self, time_abs, callback, period=0) -> Event:
+        event = Event(time_abs, callback, period)
+        self._push(event)
+        return event
 
-        event: Event = (time_abs, uuid.uuid4(), callback)
-        self._queue.put(event)
+    def add_events(self, events) -> list[Event]:
+        """Adds multiple events at once.
+
+        Args:
+            events: Iterable of `(time_abs, callback)` tuples.
+
+        Returns:
+            list[Event]: The event handles, in the order given.
+        """
+        handles = [Event(t, cb) for t, cb in events]
+        for e in handles:
+            if e.time < 0:
+                raise Exception("Invalid event time.")
+            e._queue = self
+        self._queue.extend((e.time, next(self._seq), e) for e in handles)
+        heapq.heapify(self._queue)
+        return handles
+
+    def reschedule(self, event: Event, time_abs: int):
+        """Puts an already triggered event back into the queue."""
+        event.time = time_abs
+        self._push(event)
+
+    def _drop_cancelled(self):
+        while self._queue and self._queue[0][2].cancelled:
+            heapq.heappop(self._queue)
+            self._num_cancelled -= 1
 
     def get_next_event(self) -> Event:
-        return self._queue.get(False)
+        self._drop_cancelled()
+        event = heapq.heappop(self._queue)[2]
+        event._queue = None
+        return event
 
     def next_event_time(self) -> int:
-        if self._get_num_events() > 0:
-            return self._queue.queue[0][0]
+        self._drop_cancelled()
+        if self._queue:
+            return self._queue[0][0]
         else:
             return -1
 
 
+class _ChangeQueue:
+    """FIFO queue of process methods waiting to be evaluated.
+
+    A method is held at most once. Membership is tracked in a set next to the
+    deque, so scheduling a method costs O(1) regardless of queue length.
+    """
+    def __init__(self):
+        self._queue = deque()
+        self._pending = set()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+    def __contains__(self, fn):
+        return fn in self._pending
+
+    def add(self, fn) -> bool:
+        """Appends `fn` unless it is already queued.
+
+        Returns:
+            bool: True if `fn` was added, False if it was already queued.
+        """
+        if fn in self._pending:
+            return False
+        self._pending.add(fn)
+        self._queue.append(fn)
+        return True
+
+    def add_all(self, fns) -> int:
+        """Appends all methods of `fns` that are not queued yet.
+
+        Args:
+            fns: Methods to queue, without duplicates.
+
+        Returns:
+            int: Number of methods added.
+        """
+        pending = self._pending
+        new = [fn for fn in fns if fn not in pending]
+        pending.update(new)
+        self._queue.extend(new)
+        return len(new)
+
+    def pop(self):
+        """Removes and returns the oldest queued method."""
+        fn = self._queue.popleft()
+        self._pending.discard(fn)
+        return fn
+
+    def settled(self):
+        """Called once the queue ran empty."""
+
+    def clear(self):
+        self._queue.clear()
+        self._pending.clear()
+
+
+class _LevelizedChangeQueue:
+    """Queue of process methods ordered by a static rank.
+
+    Methods are popped in ascending rank order instead of FIFO order. With
+    ranks from a topological sort of the design, every method is evaluated
+    after all methods it depends on, so in acyclic logic each method runs at
+    most once per cycle.
+
+    Methods without a rank (e.g. registered after levelization) are ranked
+    behind all known methods. If a method is triggered after it already ran
+    (combinational cycle or unknown dependency), it is simply evaluated again,
+    just like in the dynamic FIFO queue.
+    """
+    def __init__(self, order: list):
+        self._ranks = {}
+        self._methods = []
+        for fn in order:
+            self._rank(fn)
+        self._heap = []
+        self._pending = set()
+        self._last = -1
+        self.fallbacks = 0
+        """Number of evaluations that went against the static order."""
+
+    def _rank(self, fn) -> int:
+        rank = self._ranks.get(fn)
+        if rank is None:
+            rank = len(self._methods)
+            self._ranks[fn] = rank
+            self._methods.append(fn)
+        return rank
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        return iter([self._methods[r] for r in sorted(self._heap)])
+
+    def __contains__(self, fn):
+        return fn in self._pending
+
+    def add(self, fn) -> bool:
+        """Queues `fn` unless it is already queued.
+
+        Returns:
+            bool: True if `fn` was added, False if it was already queued.
+        """
+        if fn in self._pending:
+            return False
+        self._pending.add(fn)
+        heapq.heappush(self._heap, self._rank(fn))
+        return True
+
+    def add_all(self, fns) -> int:
+        """Queues all methods of `fns` that are not queued yet.
+
+        Returns:
+            int: Number of methods added.
+        """
+        return sum(self.add(fn) for fn in fns)
+
+    def pop(self):
+        """Removes and returns the queued method with the lowest rank."""
+        rank = heapq.heappop(self._heap)
+        fn = self._methods[rank]
+        self._pending.discard(fn)
+        if rank <= self._last:
+            self.fallbacks += 1
+        self._last = rank
+        return fn
+
+    def settled(self):
+        """Called once the queue ran empty. Starts a new pass through the
+        static order."""
+        self._last = -1
+
+    def clear(self):
+        self._heap.clear()
+        self._pending.clear()
+        self._last = -1
+
+
+@dataclass
+class RunResult:
+    """Result of `Simulator.run_until()`."""
+    reason: str
+    """Why the run stopped:
+
+    - `'predicate'`: The predicate returned True (a predicate can also return
+      a string, which is then used as the reason)
+    - `'stop'`: `Simulator.stop()` was called (unless it was given another
+      reason)
+    - `'max_cycles'`: The cycle budget was used up
+    - `'wall_time'`: The wall time budget was used up
+    - `'idle'`: The design is idle and no event is pending, so its state can't
+      change anymore
+    """
+    cycles: int
+    """Number of cycles simulated"""
+    wall_time: float
+    """Wall time of the run in seconds"""
+
+
 class Simulator:
     globalSim = None
-    """This is a static pointer to the currently instantiated
-    simulator. It can be accessed from anywhere without
-    the need to know about the specific simulator instance.
+    """This is a static pointer to the most recently instantiated
+    simulator. Py-V itself does not use it: every object reaches the
+    simulator through its simulation context (see `pyv.context`).
     """
 
-    _stable_callbacks: list[Callable] = []
+    def __init__(self, ctx: SimContext = None):
+        """Create a new simulator.
 
-    def __init__(self):
+        Args:
+            ctx (SimContext, optional): The simulation context to simulate.
+                Defaults to the active context.
+        """
         Simulator.globalSim = self
+        self._ctx = ctx or get_context()
+        self._ctx.sim = self
 
-        self._change_queue = deque()
+        self._change_queue = _ChangeQueue()
         self._event_queue = _EventQueue()
         self._cycles = 0
+        self._num_evals = 0
+        self._num_coalesced = 0
+        self._levelized = False
+        self._compiled = False
+        self._cyclic_methods = 0
+        self._num_skipped = 0
+        self._stop_reason = None
+        self._profiler = None
+        # Whether debug logging is enabled. Sampled in `_process_changes()`.
+        self._debug = logger.isEnabledFor(DEBUG)
+
+        self.fast_forward = True
+        """Whether `run()` skips idle cycles.
+
+        A cycle is idle if no process method is pending, no register or memory
+        would change on the next tick, and no event is due. Such cycles are
+        skipped up to the next event or the end of the run. "On stable"
+        callbacks are still called in every skipped cycle, so they see the
+        same cycles as in a full run; skipping ends as soon as a callback
+        wakes the design up.
+        """
+
+    @property
+    def ctx(self) -> SimContext:
+        """The simulation context of this simulator."""
+        return self._ctx
 
     def setProbes(self, probes: list[str] = []):
         """Setup probes for ports.
@@ -60,17 +328,92 @@ class Simulator:
         Args:
             probes (list[str]): List of strings to match ports to probe
         """
-        PortList.filter(probes)
+        PortList.filter(probes, self._ctx)
+
+    def trace_vcd(self, path: str, probes: list[str] = None, **kwargs):
+        """Records value changes of ports to a VCD waveform file.
+
+        Ports are sampled once per cycle, after signal values have
+        stabilized. The design must be initialized (`_init()`). Call
+        `close()` on the returned writer to finish the file.
+
+        Args:
+            path (str): Output file (gzip-compressed if it ends with `.gz`).
+            probes (list[str], optional): Record only ports whose full name
+                contains one of these strings. Defaults to the probes set
+                with `setProbes()`, or all ports if none are set.
+            **kwargs: Options passed to `VCDWriter`.
+
+        Returns:
+            VCDWriter: The writer.
+        """
+        from pyv.vcd import VCDWriter
+
+        ctx = self._ctx
+        if probes is not None:
+            ports = [p for p in ctx.port_list
+                     if any(pat in p.name for pat in probes)]
+        else:
+            ports = ctx.port_list_filtered or ctx.port_list
+
+        writer = VCDWriter(path, ports, **kwargs)
+
+        def sample():
+            writer.sample(self._cycles)
+
+        ctx.stable_callbacks.append(sample)
+        writer.on_close = lambda: ctx.stable_callbacks.remove(sample)
+        return writer
+
+    def enable_profiling(self):
+        """Starts profiling process methods.
+
+        From now on, every evaluation of a process method is timed and
+        counted (see `pyv.profiler`). This slows down the simulation. Not
+        available with the compiled netlist backend (`compile()`).
+
+        Returns:
+            Profiler: The profiler, which holds the statistics. If profiling
+            is already enabled, the existing profiler is returned.
+
+        Raises:
+            Exception: The netlist has been compiled.
+        """
+        from pyv.profiler import Profiler
+
+        if self._compiled:
+            raise Exception("Error: Profiling is not available for compiled netlists!")  # noqa: E501
+        if self._profiler is None:
+            profiler = self._profiler = Profiler(self._ctx)
+            schedule = Simulator._addAllToChangeQueue.__get__(self)
+
+            # Every port value change schedules its fanout in one call (see
+            # `PortRW._propagate()`), so count the changes there. This keeps
+            # the counting off the port write path while not profiling.
+            def schedule_counted(fns):
+                profiler.changes += 1
+                schedule(fns)
+
+            self._addAllToChangeQueue = schedule_counted
+        return self._profiler
+
+    def disable_profiling(self):
+        """Stops profiling. The statistics remain in the profiler returned by
+        `enable_profiling()`."""
+        if self._profiler is not None:
+            del self._addAllToChangeQueue
+        self._profiler = None
 
     def _log_cycle(self):
         logger.info(f"\n**** Cycle {self._cycles} ****")
 
     def _log_ports(self):
-        PortList.logPorts()
+        PortList.logPorts(self._ctx)
 
     def _log(self):
-        self._log_cycle()
-        self._log_ports()
+        if logger.isEnabledFor(INFO):
+            self._log_cycle()
+            self._log_ports()
 
     def tick(self):
         """Advance simulation to next cycle. Applies clock tick to registers
@@ -78,8 +421,13 @@ class Simulator:
         """
         self._log()
         logger.debug("** Clock tick **")
-        Clock.tick()
+        if self._compiled:
+            self._change_queue.tick()
+        else:
+            Clock.tick(self._ctx)
         self._cycles += 1
+        if self._profiler is not None:
+            self._profiler.cycles += 1
         return self
 
     def run_comb_logic(self):
@@ -114,7 +462,7 @@ class Simulator:
     def reset(self):
         """Applies global reset (registers, memories).
         """
-        Clock.reset()
+        Clock.reset(self._ctx)
 
     def run(self, num_cycles=1, reset_regs: bool = True):
         """Runs the simulation.
@@ -125,28 +473,232 @@ class Simulator:
             reset_regs (bool, optional): Whether to reset registers before the
                 simulation. Defaults to True.
         """
-        current_time = datetime.now().strftime("%A, %b %d, %Y at %H:%M:%S")
-        logger.info(f"**** Simulation started on {current_time} ****\n")
+        self._log_start()
 
         if reset_regs:
             self.reset()
 
-        for i in range(0, num_cycles):
-            self._cycle()
+        end = self._cycles + num_cycles
+        if logger.isEnabledFor(INFO):
+            while self._cycles < end:
+                self._cycle()
+                if self.fast_forward and self._is_idle():
+                    self._skip_idle_cycles(end)
+        else:
+            self._run_quiet(end)
         self._process_remaining()
 
+    def _run_quiet(self, end):
+        """Run loop without logging (no probes).
+
+        Same as calling `_cycle()` until `end`, without the per-cycle logging
+        and method call overhead.
+        """
+        ctx = self._ctx
+        events = self._event_queue
+        fast_forward = self.fast_forward
+        process_changes = self._process_changes
+        profiler = self._profiler
+        if self._compiled:
+            tick = self._change_queue.tick
+        elif profiler is not None:
+            def tick():
+                Clock.tick(ctx)
+                profiler.cycles += 1
+        else:
+            def tick():
+                Clock.tick(ctx)
+
+        while self._cycles < end:
+            if self._cycles == events.next_event_time():
+                self._process_events()
+            process_changes()
+            for cb in ctx.stable_callbacks:
+                cb()
+            tick()
+            self._cycles += 1
+            if fast_forward and self._is_idle():
+                self._skip_idle_cycles(end)
+
+    def _log_start(self):
+        if logger.isEnabledFor(INFO):
+            current_time = datetime.now().strftime("%A, %b %d, %Y at %H:%M:%S")  # noqa: E501
+            logger.info(f"**** Simulation started on {current_time} ****\n")
+
+    def run_until(self,
+                  predicate: Callable[[], bool] = None,
+                  max_cycles: int = None,
+                  wall_time: float = None,
+                  reset_regs: bool = True) -> RunResult:
+        """Runs the simulation until a stop condition is met.
+
+        Stop conditions are checked in every cycle once the signal values
+        have stabilized, before the clock tick, in this order: a call of
+        `stop()` (e.g., from an event or a memory write watch), the
+        predicate, the wall time budget. The run stops *without* applying the
+        tick, so the design's state is the one the predicate has seen. The
+        cycle budget is checked before every cycle.
+
+        If the design becomes idle (see `fast_forward`), idle cycles are
+        skipped. If, in addition, there is neither a pending event nor a
+        cycle budget, the run stops with reason `'idle'`. Predicates should
+        therefore only depend on the state of the design.
+
+        Args:
+            predicate (Callable, optional): Called in every cycle. The run
+                stops when it returns True or a non-empty string (used as the
+                reason).
+            max_cycles (int, optional): Maximum number of cycles to execute.
+            wall_time (float, optional): Wall time budget in seconds.
+            reset_regs (bool, optional): Whether to reset registers before the
+                simulation. Defaults to True.
+
+        Returns:
+            RunResult: Why the run stopped, and the number of cycles.
+        """
+        start_time = time.perf_counter()
+        self._log_start()
+
+        if reset_regs:
+            self.reset()
+
+        start = self._cycles
+        end = None if max_cycles is None else start + max_cycles
+        deadline = None if wall_time is None else start_time + wall_time
+        self._stop_reason = None
+        reason = None
+
+        while True:
+            if end is not None and self._cycles >= end:
+                reason = 'max_cycles'
+                break
+            self._process_events()
+            self.run_comb_logic()
+
+            if self._stop_reason is not None:
+                reason = self._stop_reason
+                break
+            if predicate is not None:
+                res = predicate()
+                if res:
+                    reason = res if isinstance(res, str) else 'predicate'
+                    break
+            if deadline is not None and time.perf_counter() >= deadline:
+                reason = 'wall_time'
+                break
+
+            self.tick()
+            if self._stop_reason is not None:
+                # Stopped during the tick (e.g., by a memory write watch):
+                # stop once the new cycle has settled, without skipping idle
+                # cycles or checking the cycle budget
+                self._process_events()
+                self.run_comb_logic()
+                reason = self._stop_reason
+                break
+            if self.fast_forward and self._is_idle():
+                next_event = self._event_queue.next_event_time()
+                if end is not None:
+                    self._skip_idle_cycles(end, True)
+                elif next_event >= 0:
+                    self._skip_idle_cycles(next_event, True)
+                else:
+                    reason = 'idle'
+                    break
+                if self._stop_reason is not None:
+                    # Stopped by an "on stable" callback of a skipped cycle
+                    reason = self._stop_reason
+                    break
+
+        self._stop_reason = None
+        if reason in ('max_cycles', 'idle'):
+            self._process_remaining()
+        else:
+            self._log()
+        logger.info(f"**** Simulation stopped: {reason} ****")
+        return RunResult(reason, self._cycles - start,
+                         time.perf_counter() - start_time)
+
+    def stop(self, reason: str = 'stop'):
+        """Requests `run_until()` to stop.
+
+        If called during a clock tick or from an event, the run stops once
+        the signal values of the (new) current cycle have stabilized.
+
+        Args:
+            reason (str, optional): The reason reported in the `RunResult`.
+        """
+        self._stop_reason = reason
+
+    def _is_idle(self):
+        return len(self._change_queue) == 0 and Clock.is_idle(self._ctx)
+
+    def _skip_idle_cycles(self, end, check_stop: bool = False):
+        """Advances the cycle count to the next event time, or `end`.
+
+        The "on stable" callbacks are called in every skipped cycle. If they
+        wake the design up, skipping ends in that cycle, and its clock tick
+        is applied, as in a full run. With `check_stop`, skipping also ends
+        (without the tick) if they call `stop()`.
+        """
+        target = end
+        next_event = self._event_queue.next_event_time()
+        if next_event == self._cycles:
+            return
+        elif next_event > self._cycles:
+            target = min(next_event, end)
+        if target <= self._cycles:
+            return
+
+        first = self._cycles
+        callbacks = self._ctx.stable_callbacks
+        woken = False
+        if callbacks:
+            while self._cycles < target:
+                for cb in callbacks:
+                    cb()
+                if check_stop and self._stop_reason is not None:
+                    break
+                if not self._is_idle():
+                    woken = True
+                    break
+                self._cycles += 1
+        else:
+            self._cycles = target
+
+        if self._cycles > first:
+            logger.info(f"**** Skipping idle cycles {first} to {self._cycles - 1} ****")  # noqa: E501
+            self._num_skipped += self._cycles - first
+        if woken:
+            self.tick()
+
     @staticmethod
-    def clear():
-        """Clear list of registers, memories and ports"""
-        Clock.clear()
-        PortList.clear()
-        Simulator._stable_callbacks = []
+    def clear(ctx: SimContext = None):
+        """Clear list of registers, memories and ports
+
+        Args:
+            ctx (SimContext, optional): The simulation context to clear.
+                Defaults to the active context.
+        """
+        (ctx or get_context()).clear()
 
     def _process_changes(self):
-        while len(self._change_queue) > 0:
-            nextFn = self._change_queue.popleft()
-            logger.debug(f"Running {nextFn.__qualname__}")
+        queue = self._change_queue
+        if self._compiled:
+            self._num_evals += queue.run()
+            return
+        if self._profiler is not None:
+            self._num_evals += self._profiler.process(queue)
+            return
+
+        self._debug = debug = logger.isEnabledFor(DEBUG)
+        while len(queue) > 0:
+            nextFn = queue.pop()
+            if debug:
+                logger.debug(f"Running {nextFn.__qualname__}")
+            self._num_evals += 1
             nextFn()
+        queue.settled()
 
     def _events_pending(self):
         return self._cycles == self._event_queue.next_event_time()
@@ -154,12 +706,15 @@ class Simulator:
     def _process_events(self):
         while self._events_pending():
             event: Event = self._event_queue.get_next_event()
-            callback = event[2]
-            logger.info(f"Triggering event -> {callback.__qualname__}()")
+            callback = event.callback
+            if logger.isEnabledFor(INFO):
+                logger.info(f"Triggering event -> {callback.__qualname__}()")
             callback()
+            if event.period > 0 and not event.cancelled:
+                self._event_queue.reschedule(event, event.time + event.period)
 
     def _process_onstable_callbacks(self):
-        for cb in Simulator._stable_callbacks:
+        for cb in self._ctx.stable_callbacks:
             cb()
 
     def _addToChangeQueue(self, fn):
@@ -168,11 +723,117 @@ class Simulator:
         Args:
             fn (function): The function we want to add to the queue.
         """
-        if fn not in self._change_queue:
-            logger.debug(f"Adding {fn.__qualname__} to queue.")
-            self._change_queue.append(fn)
+        if self._change_queue.add(fn):
+            if self._debug:
+                logger.debug(f"Adding {fn.__qualname__} to queue.")
         else:
-            logger.debug(f"{fn.__qualname__} already in queue.")
+            self._num_coalesced += 1
+            if self._debug:
+                logger.debug(f"{fn.__qualname__} already in queue.")
+
+    def _addAllToChangeQueue(self, fns):
+        """Add several functions to the simulation queue at once.
+
+        Args:
+            fns: The functions (without duplicates) we want to add to the
+                queue.
+        """
+        self._num_coalesced += len(fns) - self._change_queue.add_all(fns)
+
+    def levelize(self):
+        """Switches to static levelized scheduling.
+
+        Must be called after the design has been initialized (`_init()`).
+        The dependency graph of all process methods is derived from the port
+        graph, and the methods are ranked in topological order. From then on,
+        pending methods are evaluated in that order, so in acyclic logic each
+        method runs at most once per cycle. Methods that form a combinational
+        cycle keep being re-evaluated until their outputs settle, just as with
+        the default dynamic scheduling.
+
+        Returns:
+            dict: Number of levelized methods (`methods`) and how many of them
+            are part of a combinational cycle (`cyclic`).
+        """
+        from pyv.levelize import collect_methods, levelize
+
+        pending = list(self._change_queue)
+        order, cyclic = levelize(collect_methods(self._ctx) + pending)
+
+        self._change_queue = _LevelizedChangeQueue(order)
+        for fn in pending:
+            self._change_queue.add(fn)
+        self._levelized = True
+        self._cyclic_methods = len(cyclic)
+
+        logger.info(f"Levelized {len(order)} process methods ({len(cyclic)} in combinational cycles).")  # noqa: E501
+        return {'methods': len(order), 'cyclic': len(cyclic)}
+
+    def compile(self):
+        """Switches to the compiled netlist backend (see `pyv.compiler`).
+
+        Must be called after the design has been initialized (`_init()`), and
+        after all registers and memories have been created. Generates and
+        executes specialized code for all process methods, the scheduler, and
+        the clock tick. Results are the same as with the regular (interpreted)
+        simulation, which stays the reference.
+
+        Returns:
+            dict: Number of process methods, specialized functions and inlined
+            ports.
+
+        Raises:
+            Exception: Profiling is enabled.
+        """
+        from pyv.compiler import CompiledNetlist
+        from pyv.levelize import collect_methods
+
+        if self._profiler is not None:
+            raise Exception("Error: Compiled netlists cannot be profiled, call disable_profiling() first!")  # noqa: E501
+        pending = list(self._change_queue)
+        netlist = CompiledNetlist(collect_methods(self._ctx) + pending,
+                                  self._ctx)
+        for fn in pending:
+            netlist.add(fn)
+        self._change_queue = netlist
+        self._compiled = True
+        self._levelized = False
+
+        info = netlist.info()
+        logger.info(f"Compiled {info['methods']} process methods ({info['specialized']} specialized functions, {info['ports']} ports).")  # noqa: E501
+        return info
+
+    def getStats(self) -> dict:
+        """Returns scheduling statistics.
+
+        - `cycles`: Number of simulated cycles
+        - `evals`: Number of process method evaluations
+        - `coalesced`: Notifications of methods that were already queued. Each
+          of them is a re-evaluation that did not have to happen. In levelized
+          mode, this is the number of re-evaluations saved by waiting for all
+          inputs of a method to settle.
+        - `levelized`: Whether levelized scheduling is enabled
+        - `cyclic_methods`: Methods that are part of a combinational cycle
+          (levelized mode only)
+        - `fallbacks`: Evaluations that had to go against the static order,
+          i.e., dynamic re-evaluations (levelized mode only)
+        - `skipped_cycles`: Idle cycles skipped by `run()` (see
+          `fast_forward`)
+
+        Returns:
+            dict: The statistics.
+        """
+        stats = {
+            'cycles': self._cycles,
+            'evals': self._num_evals,
+            'coalesced': self._num_coalesced,
+            'levelized': self._levelized,
+            'skipped_cycles': self._num_skipped,
+        }
+        if self._levelized:
+            stats['cyclic_methods'] = self._cyclic_methods
+            stats['fallbacks'] = self._change_queue.fallbacks
+        return stats
 
     def getCycles(self):
         """Returns the current number of cycles.
@@ -182,41 +843,112 @@ class Simulator:
         """
         return self._cycles
 
-    def postEventAbs(self, time_abs, callback):
+    def postEventAbs(self, time_abs, callback) -> Event:
         """Post an event into the future with *absolute* time.
 
         Args:
             time_abs (int): Absolute time of event
             callback (function): Callback function to call on event trigger
 
+        Returns:
+            Event: Handle of the event. Can be used to cancel it.
+
         Raises:
             Exception: Event time is less then or equal to current cycle.
         """
         if time_abs <= self._cycles:
             raise Exception("Error: Event must lie in the future!")
 
-        self._event_queue.add_event(time_abs, callback)
+        return self._event_queue.add_event(time_abs, callback)
 
-    def postEventRel(self, time_rel, callback):
+    def postEventRel(self, time_rel, callback) -> Event:
         """Post an event into the future with *relative* time.
 
         Args:
             time_rel (int): Relative time of event (wrt current cycle)
             callback (function): Callback function to call on event trigger
 
+        Returns:
+            Event: Handle of the event. Can be used to cancel it.
+
         Raises:
             Exception: Resulting event time is less then or equal to current
                 cycle.
         """
-        self.postEventAbs(self._cycles + time_rel, callback)
+        return self.postEventAbs(self._cycles + time_rel, callback)
+
+    def postEventsAbs(self, events) -> list[Event]:
+        """Post multiple events with *absolute* times at once.
+
+        This is faster than posting the events one by one.
+
+        Args:
+            events: Iterable of `(time_abs, callback)` tuples
+
+        Returns:
+            list[Event]: Handles of the events, in the order given.
+
+        Raises:
+            Exception: An event time is less then or equal to current cycle.
+        """
+        events = list(events)
+        for time_abs, _ in events:
+            if time_abs <= self._cycles:
+                raise Exception("Error: Event must lie in the future!")
+
+        return self._event_queue.add_events(events)
+
+    def postEventsRel(self, events) -> list[Event]:
+        """Post multiple events with *relative* times at once.
+
+        Args:
+            events: Iterable of `(time_rel, callback)` tuples
+
+        Returns:
+            list[Event]: Handles of the events, in the order given.
+
+        Raises:
+            Exception: A resulting event time is less then or equal to
+                current cycle.
+        """
+        return self.postEventsAbs(
+            (self._cycles + t, cb) for t, cb in events)
+
+    def postEventPeriodic(self, period, callback, start=None) -> Event:
+        """Post an event that triggers every `period` cycles.
+
+        Args:
+            period (int): Period in cycles
+            callback (function): Callback function to call on event trigger
+            start (int, optional): Absolute time of the first trigger.
+                Defaults to one period from the current cycle.
+
+        Returns:
+            Event: Handle of the event. Cancelling it stops all future
+            triggers.
+
+        Raises:
+            Exception: Invalid period, or start time is less then or equal to
+                current cycle.
+        """
+        if period <= 0:
+            raise Exception("Error: Event period must be positive!")
+        if start is None:
+            start = self._cycles + period
+        if start <= self._cycles:
+            raise Exception("Error: Event must lie in the future!")
+
+        return self._event_queue.add_event(start, callback, period)
 
     @staticmethod
-    def registerStableCallback(callback: Callable):
+    def registerStableCallback(callback: Callable, ctx: SimContext = None):
         """Register a callback method to be called once signal values have
         stabilized during the current cycle, and before the next clock tick
         happens.
 
         Args:
             callback (Callable): The callback method
+            ctx (SimContext, optional): The simulation context. Defaults to
+                the active context.
         """
-        Simulator._stable_callbacks.append(callback)
+        (ctx or get_context()).stable_callbacks.append(callback)
@@ -4,18 +4,43 @@ from pyv.port import Input, Output, Wire, Constant
 from pyv.reg import Reg, Regfile
 from pyv.mem import ReadPort, WritePort
 import pyv.isa as isa
-from pyv.util import getBit, getBits, MASK_32, XLEN, msb_32, signext
+from pyv.util import getBit, getBits, immutable, MASK_32, XLEN, msb_32, \
+    signext
 from pyv.log import logger
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 
-@dataclass
+def _record(cls):
+    """Declares a pipeline record: a slotted dataclass declared `@immutable`.
+
+    Stages write a new record for every change. Ports compare records to
+    detect a change, so equality is generated to stop at the first
+    differing field (the dataclass `__eq__` builds two tuples of all fields).
+    """
+    cls = immutable(dataclass(slots=True, eq=False)(cls))
+    cmp = ' and '.join(f'self.{f.name} == other.{f.name}'
+                       for f in fields(cls))
+    src = ('def __eq__(self, other):\n'
+           '    if self is other:\n'
+           '        return True\n'
+           '    if other.__class__ is not self.__class__:\n'
+           '        return NotImplemented\n'
+           f'    return {cmp}\n')
+    ns = {}
+    exec(src, ns)
+    cls.__eq__ = ns['__eq__']
+    cls.__eq__.__qualname__ = f'{cls.__qualname__}.__eq__'
+    cls.__hash__ = None
+    return cls
+
+
+@_record
 class IFID_t:
     inst: int = 0
     pc: int = 0
 
 
-@dataclass
+@_record
 class IDEX_t:
     rs1: int = 0
     rs2: int = 0
@@ -33,7 +58,7 @@ class IDEX_t:
     csr_write_en: bool = False
 
 
-@dataclass
+@_record
 class EXMEM_t:
     rd: int = 0
     we: int = 0
@@ -50,7 +75,7 @@ class EXMEM_t:
     csr_write_val: int = 0
 
 
-@dataclass
+@_record
 class MEMWB_t:
     rd: int = 0
     we: int = 0
@@ -121,8 +146,21 @@ class IDStage(Module):
     Outputs:
         IDEX_o: Interface to EXStage
     """
+    # Decoded fields only depend on the instruction word, so the cache stays
+    # valid across checkpoint restores (see `pyv.checkpoint`)
+    _checkpoint_exclude = ('_decode_cache',)
 
-    def __init__(self, regf: Regfile, csr: CSRUnit):
+    def __init__(self, regf: Regfile, csr: CSRUnit,
+                 decode_cache_size: int = 4096):
+        """Instruction decode stage.
+
+        Args:
+            regf (Regfile): Register file.
+            csr (CSRUnit): CSR unit.
+            decode_cache_size (int, optional): Maximum number of decoded
+                instruction words to cache (0 disables the cache). Defaults
+                to 4096.
+        """
         super().__init__()
         self.regfile = regf
         self.csr = csr
@@ -135,12 +173,63 @@ class IDStage(Module):
         # Outputs
         self.IDEX_o = Output(IDEX_t)
 
+        # Decode cache: instruction word -> static fields (see `_decode()`)
+        self._decode_cache = {}
+        self._decode_cache_size = decode_cache_size
+        self._num_hits = 0
+        self._num_misses = 0
+
     def process(self):
         # Read inputs
         val: IFID_t = self.IFID_i.read()
         inst = val.inst
         self.pc = val.pc
 
+        # Look up the static fields of the instruction word
+        dec = self._decode_cache.get(inst)
+        if dec is None:
+            self._num_misses += 1
+            dec = self._decode(inst)
+        else:
+            self._num_hits += 1
+        (self.check_exception_inputs, rs1_idx, rs2_idx, rd_idx, imm, we,
+         wb_sel, opcode, funct3, funct7, mem, csr) = dec
+
+        # Read regfile
+        rs1 = self.regfile.read(rs1_idx)
+        rs2 = self.regfile.read(rs2_idx)
+
+        # CSR
+        if csr is None:
+            csr_addr = 0
+            csr_read_val = 0
+            csr_write_en = False
+        else:
+            csr_addr, csr_write_en, csr_isImm, csr_no_read = csr
+            # Note that we do a CSR read regardless of which CSR instruction.
+            # The spec says for example that, for CSRRW, if rd=x0, no read
+            # should happen to the CSR. -> But our CSR implementation has no
+            # side effects on a read, so it's safe to always read.
+            csr_read_val = self.csr.read(csr_addr)
+            if csr_no_read:
+                csr_read_val = 0
+            if csr_isImm:
+                rs1 = rs1_idx
+
+        # Outputs
+        self.IDEX_o.write(IDEX_t(
+            rs1, rs2, imm, self.pc, rd_idx, we, wb_sel,
+            opcode, funct3, funct7, mem, csr_addr, csr_read_val, csr_write_en))
+
+    def _decode(self, inst) -> tuple:
+        """Decodes the static fields of an instruction word, and caches
+        them.
+
+        Returns:
+            Tuple of the inputs of `check_exception()`, rs1/rs2/rd indices,
+            immediate, we, wb_sel, opcode, funct3, funct7, mem, and the CSR
+            fields (see `dec_csr()`).
+        """
         # Determine opcode (inst[6:2])
         opcode = getBits(inst, 6, 2)
 
@@ -148,39 +237,56 @@ class IDStage(Module):
         funct3 = getBits(inst, 14, 12)
         funct7 = getBits(inst, 31, 25)
 
-        self.check_exception_inputs = (inst, opcode, funct3, funct7)
-
         # Determine register indeces
         rs1_idx = getBits(inst, 19, 15)
         rs2_idx = getBits(inst, 24, 20)
         rd_idx = getBits(inst, 11, 7)
 
-        # Read regfile
-        rs1 = self.regfile.read(rs1_idx)
-        rs2 = self.regfile.read(rs2_idx)
-
-        # Decode immediate
-        imm = self.decImm(opcode, inst)
-
-        # Determine register file write enable
-        we = self.we(opcode, funct3)
-
-        # Determine what to write-back into regfile
-        wb_sel = self.wb_sel(opcode, funct3)
-
-        # Determine none/load/store
-        mem = self.mem_sel(opcode)
-
-        # CSR
-        csr_addr, csr_read_val, csr_write_en, csr_isImm, csr_uimm = \
-            self.dec_csr(inst, opcode, funct3, rd_idx, rs1_idx)
-        if csr_isImm:
-            rs1 = csr_uimm
+        dec = (
+            (inst, opcode, funct3, funct7),
+            rs1_idx, rs2_idx, rd_idx,
+            # Decode immediate
+            self.decImm(opcode, inst),
+            # Determine register file write enable
+            self.we(opcode, funct3),
+            # Determine what to write-back into regfile
+            self.wb_sel(opcode, funct3),
+            opcode, funct3, funct7,
+            # Determine none/load/store
+            self.mem_sel(opcode),
+            self.dec_csr(inst, opcode, funct3, rd_idx, rs1_idx))
+
+        cache = self._decode_cache
+        if self._decode_cache_size > 0:
+            if len(cache) >= self._decode_cache_size:
+                # Evict the oldest entry
+                del cache[next(iter(cache))]
+            cache[inst] = dec
+        return dec
+
+    def getDecodeStats(self) -> dict:
+        """Returns statistics of the decode cache.
+
+        - `hits`: Decoded instructions found in the cache
+        - `misses`: Decoded instructions not found in the cache
+        - `size`: Number of cached instruction words
+        - `max_size`: Maximum number of cached instruction words
 
-        # Outputs
-        self.IDEX_o.write(IDEX_t(
-            rs1, rs2, imm, self.pc, rd_idx, we, wb_sel,
-            opcode, funct3, funct7, mem, csr_addr, csr_read_val, csr_write_en))
+        Returns:
+            dict: The statistics.
+        """
+        return {
+            'hits': self._num_hits,
+            'misses': self._num_misses,
+            'size': len(self._decode_cache),
+            'max_size': self._decode_cache_size,
+        }
+
+    def clearDecodeCache(self):
+        """Empties the decode cache and resets its statistics."""
+        self._decode_cache.clear()
+        self._num_hits = 0
+        self._num_misses = 0
 
     def is_csr(self, opcode, f3):
         return opcode == isa.OPCODES["SYSTEM"] and f3 in isa.CSR_F3.values()
@@ -299,32 +405,32 @@ class IDStage(Module):
         return (sign_ext | imm)
 
     def dec_csr(self, inst, opcode, f3, rd_idx, rs1_idx):
-        csr_addr = 0
-        csr_read_val = 0
-        csr_write_en = False
-        csr_isImm = False
-        csr_uimm = rs1_idx
-
-        if self.is_csr(opcode, f3):
-            csr_addr = getBits(inst, 31, 20)
-            csr_isImm = self.is_csr_imm(f3)
-            # Note that we do a CSR read regardless of which CSR instruction.
-            # The spec says for example that, for CSRRW, if rd=x0, no read
-            # should happen to the CSR. -> But our CSR implementation has no
-            # side effects on a read, so it's safe to always read.
-            csr_read_val = self.csr.read(csr_addr)
-            csr_write_en = True
-            if f3 in [isa.CSR_F3['CSRRW'], isa.CSR_F3['CSRRWI']]:
-                if rd_idx == isa.I_REGS['x0']:
-                    csr_read_val = 0
-            elif f3 in [isa.CSR_F3['CSRRS'], isa.CSR_F3['CSRRC'],
-                        isa.CSR_F3['CSRRSI'], isa.CSR_F3['CSRRCI']]:
-                if rs1_idx == 0:
-                    csr_write_en = False
+        """Decodes the static CSR fields of an instruction.
+
+        Returns:
+            None if the instruction is no CSR instruction. Otherwise, a
+            tuple of the CSR address, write enable, whether the source is an
+            immediate (the rs1 index), and whether the read value is
+            discarded (CSRRW(I) with rd=x0).
+        """
+        if not self.is_csr(opcode, f3):
+            return None
+
+        csr_addr = getBits(inst, 31, 20)
+        csr_isImm = self.is_csr_imm(f3)
+        csr_write_en = True
+        csr_no_read = False
+        if f3 in [isa.CSR_F3['CSRRW'], isa.CSR_F3['CSRRWI']]:
+            if rd_idx == isa.I_REGS['x0']:
+                csr_no_read = True
+        elif f3 in [isa.CSR_F3['CSRRS'], isa.CSR_F3['CSRRC'],
+                    isa.CSR_F3['CSRRSI'], isa.CSR_F3['CSRRCI']]:
+            if rs1_idx == 0:
+                csr_write_en = False
 
         # TODO: Check for illegal instruction (e.g. write to RO CSR)
 
-        return csr_addr, csr_read_val, csr_write_en, csr_isImm, csr_uimm
+        return csr_addr, csr_write_en, csr_isImm, csr_no_read
 
     def check_exception(self):
         inst, opcode, f3, f7 = self.check_exception_inputs
@@ -390,44 +496,11 @@ class EXStage(Module):
     """
     def __init__(self):
         super().__init__()
-        self.IDEX_i = Input(
-            IDEX_t, sensitive_methods=[self.process, self.passThrough])
+        self.IDEX_i = Input(IDEX_t)
 
         self.registerStableCallbacks([self.check_exception])
 
         self.EXMEM_o = Output(EXMEM_t)
-        self.exmem_val = EXMEM_t()
-
-    def writeOutput(self):
-        self.EXMEM_o.write(EXMEM_t(
-            self.exmem_val.rd,
-            self.exmem_val.we,
-            self.exmem_val.wb_sel,
-            self.exmem_val.take_branch,
-            self.exmem_val.alu_res,
-            self.exmem_val.pc4,
-            self.exmem_val.rs2,
-            self.exmem_val.mem,
-            self.exmem_val.funct3,
-            self.exmem_val.csr_addr,
-            self.exmem_val.csr_read_val,
-            self.exmem_val.csr_write_en,
-            self.exmem_val.csr_write_val
-        ))
-
-    def passThrough(self):
-        val = self.IDEX_i.read()
-        self.exmem_val.rd = val.rd
-        self.exmem_val.we = val.we
-        self.exmem_val.wb_sel = val.wb_sel
-        self.exmem_val.rs2 = val.rs2
-        self.exmem_val.mem = val.mem
-        self.exmem_val.funct3 = val.funct3
-        self.exmem_val.csr_addr = val.csr_addr
-        self.exmem_val.csr_write_en = val.csr_write_en
-        self.exmem_val.csr_read_val = val.csr_read_val
-
-        self.writeOutput()
 
     def process(self):
         # Read inputs
@@ -462,12 +535,12 @@ class EXStage(Module):
         if csr_write_en:
             csr_write_val = self.csr(f3, csr_read_val, rs1)
 
-        # Outputs
-        self.exmem_val.take_branch = take_branch
-        self.exmem_val.pc4 = pc4
-        self.exmem_val.alu_res = alu_res
-        self.exmem_val.csr_write_val = csr_write_val
-        self.writeOutput()
+        # Outputs (the other fields are passed through). Records are latched
+        # by reference (`@immutable`), so every write needs a new record.
+        self.EXMEM_o.write(EXMEM_t(
+            val.rd, val.we, val.wb_sel, take_branch, alu_res, pc4, val.rs2,
+            val.mem, f3, val.csr_addr, csr_read_val, csr_write_en,
+            csr_write_val))
 
     def alu(self, opcode, rs1, rs2, imm, pc, f3, f7):
         """Implements arithmetic-logic unit (ALU)
@@ -742,28 +815,22 @@ class MEMStage(Module):
         self.w = 1  # data width
         self.signext_w = 0  # signext width
 
-        self.out_val = MEMWB_t()
+        self.mem_rdata = 0  # last load value
 
     def write_output(self):
+        # Pass through all other fields
+        in_val = self.EXMEM_i.read()
         self.MEMWB_o.write(MEMWB_t(
-            rd=self.out_val.rd,
-            we=self.out_val.we,
-            alu_res=self.out_val.alu_res,
-            pc4=self.out_val.pc4,
-            mem_rdata=self.out_val.mem_rdata,
-            wb_sel=self.out_val.wb_sel,
-            csr_addr=self.out_val.csr_addr,
-            csr_read_val=self.out_val.csr_read_val,
-            csr_write_en=self.out_val.csr_write_en,
-            csr_write_val=self.out_val.csr_write_val
-        ))
+            in_val.rd, in_val.we, in_val.alu_res, in_val.pc4, self.mem_rdata,
+            in_val.wb_sel, in_val.csr_addr, in_val.csr_read_val,
+            in_val.csr_write_en, in_val.csr_write_val))
 
     def process_load(self):
         load_val = self.load_val.read()
         if self.signext_w != 0:
             load_val = signext(load_val, self.signext_w)
 
-        self.out_val.mem_rdata = load_val
+        self.mem_rdata = load_val
         self.write_output()
 
     def process(self):
@@ -820,15 +887,6 @@ class MEMStage(Module):
         self.write_port.we_i.write(we)
 
         # Outputs
-        self.out_val.rd = in_val.rd
-        self.out_val.we = in_val.we
-        self.out_val.alu_res = in_val.alu_res
-        self.out_val.pc4 = in_val.pc4
-        self.out_val.wb_sel = in_val.wb_sel
-        self.out_val.csr_addr = in_val.csr_addr
-        self.out_val.csr_read_val = in_val.csr_read_val
-        self.out_val.csr_write_en = in_val.csr_write_en
-        self.out_val.csr_write_val = in_val.csr_write_val
         self.write_output()
 
     def check_exception(self):
@@ -1,7 +1,42 @@
 """Utility stuff."""
 
+from enum import Enum
 from typing import Any, Dict, List
 import warnings
+from pyv.context import get_context
+
+
+_slot_names: Dict[type, tuple] = {}
+
+
+def obj_attrs(obj) -> Dict[str, Any]:
+    """Returns the attributes of an object, like `vars()`, but including
+    attributes stored in `__slots__`.
+
+    Slotted attributes come first (base classes first), followed by the
+    entries of `__dict__`. Unset slots are omitted.
+    """
+    cls = type(obj)
+    names = _slot_names.get(cls)
+    if names is None:
+        names = []
+        for c in reversed(cls.__mro__):
+            slots = c.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names += [n for n in slots
+                      if n not in ('__dict__', '__weakref__')]
+        names = tuple(names)
+        _slot_names[cls] = names
+
+    attrs = {}
+    for name in names:
+        try:
+            attrs[name] = getattr(obj, name)
+        except AttributeError:
+            pass
+    attrs.update(getattr(obj, '__dict__', {}))
+    return attrs
 
 
 # TODO: Move this class to its own module
@@ -9,11 +44,17 @@ class PyVObj:
     """This class represent all Py-V objects (such as modules, ports,
     registers). Currently, this is used for initializing the names of every
     object in the design.
+
+    Subclasses with many instances (ports, registers) are slotted; others
+    (e.g., modules) keep a `__dict__`.
     """
+    __slots__ = ('name', '_visited', '_ctx')
+
     def __init__(self, name="noName") -> None:
         self.name = name
         """Name of this object"""
         self._visited = False
+        self._ctx = get_context()
 
     def _init(self, parent=None):
         """Initializes the object.
@@ -26,7 +67,7 @@ class PyVObj:
             return
         self._visited = True
 
-        for key, obj in self.__dict__.items():
+        for key, obj in obj_attrs(self).items():
             if isinstance(obj, (PyVObj)):
                 obj.name = self.name + "." + key
                 obj._init(self)
@@ -158,6 +199,44 @@ class VArray(PyVObj):
         return self._elems[idx]
 
 
+# Built-in types whose values cannot be modified
+_IMMUTABLE_TYPES = {int, float, bool, complex, str, bytes, frozenset, range,
+                    type(None)}
+
+
+def immutable(cls):
+    """Class decorator: declares values of `cls` as immutable port payloads.
+
+    Registers latch immutable values by reference, and ports take their
+    initial value without copying it. Values of other (user-defined) types
+    are deep-copied instead.
+
+    This is a contract, it is not enforced: once a value has been written to
+    a port, neither the writer nor any reader may modify it. Write a new
+    value instead. (Frozen dataclasses enforce this, but are much slower to
+    construct.)
+
+    The declaration only applies to `cls` itself, not to its subclasses.
+    """
+    cls.__pyv_immutable__ = True
+    return cls
+
+
+def is_immutable_type(typ: type) -> bool:
+    """Whether values of type `typ` are immutable (and need not be copied).
+
+    True for built-in immutable types, enums, frozen dataclasses, and classes
+    declared with `@immutable` (but not their subclasses).
+    """
+    if typ in _IMMUTABLE_TYPES or \
+            getattr(typ, '__dict__', {}).get('__pyv_immutable__', False):
+        return True
+    params = getattr(typ, '__dataclass_params__', None)
+    if params is not None and params.frozen:
+        return True
+    return isinstance(typ, type) and issubclass(typ, Enum)
+
+
 # XLEN
 XLEN = 32
 
@@ -165,6 +244,20 @@ XLEN = 32
 MASK_32 = 0xffffffff
 
 
+def import_numpy():
+    """Imports NumPy, which is an optional dependency.
+
+    Raises:
+        ImportError: NumPy is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "NumPy is required for array views (pip install numpy)") from None
+    return numpy
+
+
 def msb_32(val) -> int:
     """Returns the MSB of a 32 bit value."""
 
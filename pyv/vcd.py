@@ -0,0 +1,281 @@
+"""Streaming VCD waveform writer.
+
+Records the values of ports to a Value Change Dump (VCD) file, which can be
+viewed with any waveform viewer (e.g. GTKWave). Ports are sampled once per
+cycle, once all signal values have stabilized (as an "on stable" callback),
+and only changes are written. Time is measured in cycles.
+
+Ports that are connected to each other share their value, so they share one
+identifier code in the VCD file. Supported value types:
+
+- `bool`: 1-bit signal
+- `int`: bit vector (`int_width` bits, default: 32)
+- `float`: real
+- `str`: string (GTKWave extension)
+- dataclasses: one signal per field, in a scope named like the port
+
+Ports of other types are not recorded.
+
+Output is collected in memory and written in large chunks. Optionally, the
+chunks are written by a background thread. If the file name ends with `.gz`,
+the output is gzip-compressed.
+
+Example:
+
+    vcd = sim.trace_vcd('wave.vcd', ['if_stg', 'regf'])
+    sim.run(1000)
+    vcd.close()
+"""
+import dataclasses
+import gzip
+import queue
+import threading
+from datetime import datetime
+from pyv.log import logger
+from pyv.port import Port
+
+
+def _id_code(n: int) -> str:
+    """Returns the `n`-th identifier code (printable ASCII characters)."""
+    code = chr(33 + n % 94)
+    n //= 94
+    while n:
+        code += chr(33 + n % 94)
+        n //= 94
+    return code
+
+
+def _fields(val, prefix=()):
+    """Yields `(field path, type)` for every leaf field of a dataclass."""
+    for f in dataclasses.fields(val):
+        sub = getattr(val, f.name)
+        if dataclasses.is_dataclass(sub):
+            yield from _fields(sub, prefix + (f.name,))
+        else:
+            yield prefix + (f.name,), type(sub)
+
+
+class _Signal:
+    """A recorded value: a port value, or a field of it."""
+    __slots__ = ('root', 'fields', 'code', 'fmt', 'last')
+
+    def __init__(self, root: Port, fields: tuple, code: str, fmt):
+        self.root = root
+        self.fields = fields
+        self.code = code
+        self.fmt = fmt
+        self.last = None
+
+    def value(self):
+        val = self.root._net.val
+        for f in self.fields:
+            val = getattr(val, f)
+        return val
+
+
+class VCDWriter:
+    """Writes value changes of ports to a VCD file."""
+
+    def __init__(self, path: str, ports: list[Port], timescale: str = '1 ns',
+                 int_width: int = 32, buffer_size: int = 1 << 20,
+                 threaded: bool = False):
+        """Create a new VCD writer.
+
+        The header is written immediately. Values are recorded by calling
+        `sample()` (see `Simulator.trace_vcd()`).
+
+        Args:
+            path (str): Output file. Compressed with gzip if it ends with
+                `.gz`.
+            ports (list[Port]): Ports to record.
+            timescale (str, optional): Duration of one cycle. Defaults to
+                '1 ns'.
+            int_width (int, optional): Width of integer signals in bits.
+                Values are truncated to this width. Defaults to 32.
+            buffer_size (int, optional): Number of characters collected
+                before they are written. Defaults to 1M.
+            threaded (bool, optional): Whether to write in a background
+                thread. Defaults to False.
+        """
+        if path.endswith('.gz'):
+            self._file = gzip.open(path, 'wt')
+        else:
+            self._file = open(path, 'w')
+        self._int_mask = (1 << int_width) - 1
+        self._int_width = int_width
+        self._buffer = []
+        self._buffered = 0
+        self._buffer_size = buffer_size
+        self._time = None
+        self._closed = False
+        self.on_close = None
+        """Called by `close()` (used to unregister the writer)."""
+
+        self._queue = None
+        self._thread = None
+        if threaded:
+            self._queue = queue.Queue(maxsize=8)
+            self._thread = threading.Thread(target=self._write_loop,
+                                            daemon=True)
+            self._thread.start()
+
+        self._signals = []
+        scopes = {}
+        self._declare(ports, scopes)
+        self._write_header(scopes, timescale)
+
+    # ------------------------------------------------------------------
+    # Header
+    # ------------------------------------------------------------------
+    def _format(self, typ):
+        if typ is bool:
+            return 'wire', 1, lambda v, c: f'{v:d}{c}\n'
+        if typ is int:
+            mask = self._int_mask
+            return 'wire', self._int_width, \
+                lambda v, c: f'b{v & mask:b} {c}\n'
+        if typ is float:
+            return 'real', 1, lambda v, c: f'r{v!r} {c}\n'
+        if typ is str:
+            return 'string', 1, \
+                lambda v, c: f's{v.replace(" ", "_") or "_"} {c}\n'
+        return None
+
+    def _declare(self, ports: list[Port], scopes: dict):
+        codes = {}
+        names = set()
+        for port in ports:
+            root = port._root_driver
+            val = root._net.val
+            if dataclasses.is_dataclass(val):
+                leaves = list(_fields(val))
+            else:
+                leaves = [((), type(val))]
+
+            name = port.name
+            i = 1
+            while name in names:
+                name = f'{port.name}_{i}'
+                i += 1
+            names.add(name)
+            path = name.split('.')
+
+            for fields, typ in leaves:
+                fmt = self._format(typ)
+                if fmt is None:
+                    logger.warning(f"VCD: Not recording {name}{''.join('.' + f for f in fields)} of type {typ}.")  # noqa: E501
+                    continue
+                kind, width, func = fmt
+
+                key = (id(root), fields)
+                code = codes.get(key)
+                if code is None:
+                    code = _id_code(len(codes))
+                    codes[key] = code
+                    self._signals.append(_Signal(root, fields, code, func))
+
+                scope = scopes
+                for p in path[:-1] + list(fields[:-1] if fields else []):
+                    scope = scope.setdefault(p, {})
+                if fields:
+                    scope = scope.setdefault(path[-1], {})
+                    var = fields[-1]
+                else:
+                    var = path[-1]
+                scope.setdefault(None, []).append((kind, width, code, var))
+
+    def _write_scope(self, scope: dict, out: list):
+        for kind, width, code, var in scope.get(None, []):
+            out.append(f'$var {kind} {width} {code} {var} $end\n')
+        for name, sub in scope.items():
+            if name is None:
+                continue
+            out.append(f'$scope module {name} $end\n')
+            self._write_scope(sub, out)
+            out.append('$upscope $end\n')
+
+    def _write_header(self, scopes: dict, timescale: str):
+        out = [
+            f'$date {datetime.now().strftime("%Y-%m-%d %H:%M:%S")} $end\n',
+            '$version Py-V $end\n',
+            f'$timescale {timescale} $end\n',
+        ]
+        self._write_scope(scopes, out)
+        out.append('$enddefinitions $end\n')
+        self._emit(''.join(out))
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def sample(self, time: int):
+        """Records all values that changed since the last sample.
+
+        Args:
+            time (int): The current time (cycle).
+        """
+        out = []
+        for sig in self._signals:
+            val = sig.value()
+            if val != sig.last or sig.last is None:
+                sig.last = val
+                out.append(sig.fmt(val, sig.code))
+        if not out:
+            return
+
+        if self._time is None:
+            out.insert(0, f'#{time}\n$dumpvars\n')
+            out.append('$end\n')
+        elif time != self._time:
+            out.insert(0, f'#{time}\n')
+        self._time = time
+        self._emit(''.join(out))
+
+    def _emit(self, text: str):
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Writes all buffered output."""
+        if not self._buffer:
+            return
+        chunk = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        if self._queue is not None:
+            self._queue.put(chunk)
+        else:
+            self._file.write(chunk)
+
+    def _write_loop(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            self._file.write(chunk)
+
+    def close(self, time: int = None):
+        """Flushes all output and closes the file.
+
+        Args:
+            time (int, optional): End time to record.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self.on_close is not None:
+            self.on_close()
+        if time is not None and (self._time is None or time > self._time):
+            self._emit(f'#{time}\n')
+        self.flush()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,59 @@
+"""Test programs and model factories shared by the tests."""
+import struct
+
+from pyv.models.singlecycle import SingleCycle, SingleCycleModel
+
+
+def loop_prog(n: int = 20) -> list[int]:
+    """Counts x1 from 0 to `n`, then stores it to 0x1000."""
+    return [
+        0x00001137,  # lui x2, 1
+        0x0040006f,  # jal x0, main
+        0x000012b7,  # main: lui x5, 1
+        (n << 20) | 0x113,  # addi x2, x0, n
+        0x00000093,  # addi x1, x0, 0
+        0x00108093,  # loop: addi x1, x1, 1
+        0xfe209ee3,  # bne x1, x2, loop
+        0x0012a023,  # sw x1, 0(x5)
+        0x0000006f,  # end: jal x0, end
+    ]
+
+
+# Fibonacci through memory, a function call, loads/stores of all widths,
+# ALU operations, branches and CSR accesses.
+MIXED_PROG = [
+    0x00001137, 0x0040006f, 0x00a00513, 0x000015b7, 0x80058593, 0x00000293,
+    0x00100313, 0x0055a023, 0x0065a223, 0x00200393, 0x0005a283, 0x0045a303,
+    0x00628433, 0x0065a023, 0x0085a223, 0x00138393, 0xfea3c4e3, 0x0085a023,
+    0x098000ef, 0xffb00a13, 0x01458823, 0x01058a83, 0x0105cb03, 0x01459a23,
+    0x01459b83, 0x0145dc03, 0x003a2c93, 0x003a3d13, 0x406a5db3, 0x006a5e33,
+    0x41400eb3, 0x014ecf33, 0x014f7fb3, 0x014f61b3, 0x000a2233, 0x000a34b3,
+    0x007a1633, 0x402a5693, 0x002a5713, 0x004a1793, 0x07fa4813, 0x05506893,
+    0x0f0a7913, 0x00001997, 0x301619f3, 0x30102973, 0x3013d8f3, 0x000a5463,
+    0x001a0a13, 0x01406463, 0x002a0a13, 0x01407463, 0x004a0a13, 0x00000463,
+    0x008a0a13, 0x0000006f, 0x00008093, 0x0015a423, 0x00008067,
+]
+
+
+def prog_bytes(prog: list[int]) -> bytes:
+    """Encodes a program as little-endian words."""
+    return struct.pack(f'<{len(prog)}I', *prog)
+
+
+def make_model(prog: list[int]) -> SingleCycleModel:
+    """Creates a single-cycle model with `prog` loaded at address 0."""
+    model = SingleCycleModel()
+    data = prog_bytes(prog)
+    model.core.mem.mem[:len(data)] = data
+    return model
+
+
+def make_core(prog: list[int]) -> SingleCycle:
+    """Creates a single-cycle core in the active context with `prog` loaded
+    at address 0."""
+    core = SingleCycle()
+    core.name = "core"
+    core._init()
+    data = prog_bytes(prog)
+    core.mem.mem[:len(data)] = data
+    return core
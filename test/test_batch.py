@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from pyv.batch import Job, JobResult, main, run_batch, run_job
+from test.programs import loop_prog, prog_bytes
+
+
+def loop_bin(path, n: int) -> str:
+    """Writes a binary of `loop_prog(n)`."""
+    path.write_bytes(prog_bytes(loop_prog(n)))
+    return str(path)
+
+
+def test_job_defaults():
+    job = Job('foo/bar.bin', mem=[[0x1000, 4]])
+    assert job.name == 'bar.bin'
+    assert job.model == 'single'
+    assert job.mem == [(0x1000, 4)]
+
+
+def test_run_job(tmp_path):
+    binary = loop_bin(tmp_path / 'loop.bin', 10)
+    res = run_job(Job(binary, cycles=40, regs=[1, 2], mem=[(0x1000, 4)]))
+    assert res.ok
+    assert res.name == 'loop.bin'
+    assert res.cycles == 40
+    assert res.pc == 0x20
+    assert res.regs == {1: 10, 2: 10}
+    assert res.mem == {0x1000: bytes([10, 0, 0, 0])}
+    assert res.wall_time > 0
+
+
+def test_run_job_error(tmp_path):
+    res = run_job(Job(str(tmp_path / 'missing.bin')))
+    assert not res.ok
+    assert 'FileNotFoundError' in res.error
+
+    res = run_job(Job(str(tmp_path / 'missing.bin'), model='foo'))
+    assert "Unknown model type 'foo'" in res.error
+
+
+def test_run_batch(tmp_path):
+    jobs = [
+        Job(loop_bin(tmp_path / f'loop{n}.bin', n), cycles=2 * n + 20,
+            regs=[1], mem=[(0x1000, 4)])
+        for n in (5, 10, 15, 20)
+    ]
+    results = run_batch(jobs, max_workers=2)
+    assert [r.name for r in results] == [j.name for j in jobs]
+    for n, res in zip((5, 10, 15, 20), results):
+        assert res.ok
+        assert res.cycles == 2 * n + 20
+        assert res.regs == {1: n}
+        assert res.mem[0x1000] == bytes([n, 0, 0, 0])
+
+
+def test_to_dict():
+    res = JobResult('foo', 10, 0.5, 0x20, {1: 2}, {0x1000: b'\x01\x02'})
+    assert res.to_dict() == {
+        'name': 'foo', 'cycles': 10, 'wall_time': 0.5, 'pc': 0x20,
+        'regs': {1: 2}, 'mem': {0x1000: '0102'}, 'exit_code': None,
+        'output': '', 'error': None}
+
+
+def test_cli(tmp_path, capsys):
+    b1 = loop_bin(tmp_path / 'a.bin', 3)
+    b2 = loop_bin(tmp_path / 'b.bin', 4)
+    jobs_file = tmp_path / 'jobs.json'
+    jobs_file.write_text(json.dumps([
+        {'binary': b2, 'cycles': 30, 'regs': [1], 'name': 'b'},
+    ]))
+    out = tmp_path / 'out.jsonl'
+
+    ret = main([b1, '--cycles', '20', '--regs', '1', '2',
+                '--mem', '0x1000', '--jobs-file', str(jobs_file),
+                '-j', '2', '-o', str(out)])
+    assert ret == 0
+
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]['name'] == 'a.bin'
+    assert lines[0]['cycles'] == 20
+    assert lines[0]['regs'] == {'1': 3, '2': 3}
+    assert lines[0]['mem'] == {'4096': '03000000'}
+    assert lines[1]['name'] == 'b'
+    assert lines[1]['regs'] == {'1': 4}
+
+
+def test_cli_failure(tmp_path, capsys):
+    ret = main([str(tmp_path / 'missing.bin'), '-j', '1'])
+    assert ret == 1
+    res = json.loads(capsys.readouterr().out)
+    assert res['error'] is not None
+
+
+def test_cli_no_jobs():
+    with pytest.raises(SystemExit):
+        main([])
@@ -0,0 +1,197 @@
+import os
+import pickle
+import zlib
+
+import pytest
+
+from pyv import checkpoint
+from pyv.context import SimContext
+from pyv.mem import SparseMemory
+from pyv.models.singlecycle import SingleCycleModel
+from pyv.module import Module
+from pyv.port import Input, Output
+from pyv.reg import Reg
+from pyv.simulator import Simulator
+from test.programs import MIXED_PROG, make_model
+
+
+def state(model: SingleCycleModel):
+    core = model.core
+    return (model.getCycles(), core.if_stg.pc_reg.cur.read(),
+            core.if_stg.ir_reg.cur.read(), list(core.regf.regs),
+            list(core.mem.mem), core.csr_unit.read(0x301))
+
+
+class Acc(Module):
+    def __init__(self):
+        super().__init__()
+        self.val_i = Input(int)
+        self.sum_o = Output(int)
+        self.reg = Reg(int)
+        self.sum_o << self.reg.cur
+        self.count = 0
+
+    def process(self):
+        self.reg.next.write(self.reg.cur.read() + self.val_i.read())
+
+    def inc(self):
+        self.count += 1
+        self.val_i.write(self.val_i.read() + 1)
+
+
+def make_acc():
+    ctx = SimContext()
+    with ctx:
+        acc = Acc()
+        acc.name = 'acc'
+        sim = Simulator()
+        acc._init()
+    return acc, sim
+
+
+@pytest.mark.parametrize("mode", ['interpreted', 'levelized', 'compiled'])
+def test_continuation(tmp_path, mode):
+    a = make_model(MIXED_PROG)
+    b = make_model(MIXED_PROG)
+    for m in (a, b):
+        if mode == 'levelized':
+            m.sim.levelize()
+        elif mode == 'compiled':
+            m.sim.compile()
+
+    a.run(100)
+    path = str(tmp_path / 'ckpt')
+    a.save_checkpoint(path)
+    b.load_checkpoint(path)
+    assert state(a) == state(b)
+
+    for _ in range(150):
+        a.sim._cycle()
+        b.sim._cycle()
+        assert state(a) == state(b)
+
+
+def test_events_and_pending_methods(tmp_path):
+    a, sim_a = make_acc()
+    sim_a.postEventPeriodic(3, a.inc, start=2)
+    sim_a.postEventAbs(5, a.inc).cancel()
+    sim_a.run(4)
+    a.val_i.write(10)
+
+    state = checkpoint.capture(a, sim_a)
+    assert state['cycles'] == 4
+    assert state['events'] == [(5, 3, ('method', 'acc', 'inc'))]
+    assert state['pending'] == [('method', 'acc', 'process')]
+
+    b, sim_b = make_acc()
+    checkpoint.restore(b, sim_b, checkpoint.loads(checkpoint.dumps(state)))
+    assert b.count == a.count == 1
+    assert b.val_i.read() == 10
+    assert b.sum_o.read() == a.sum_o.read()
+    assert list(sim_b._change_queue) == [b.process]
+
+    sim_a.run(10, False)
+    sim_b.run(10, False)
+    assert b.count == a.count == 5
+    assert b.sum_o.read() == a.sum_o.read()
+    assert sim_b.getCycles() == sim_a.getCycles() == 14
+
+
+def test_unsupported_attribute():
+    a, sim = make_acc()
+    a.helper = object()
+    with pytest.raises(ValueError, match=r'acc\.helper: object'):
+        checkpoint.capture(a, sim)
+
+
+def test_unsupported_port_value():
+    a, sim = make_acc()
+    with a._ctx:
+        a.set_o = Output(set)
+    with pytest.raises(ValueError, match=r'acc\.set_o: set'):
+        checkpoint.capture(a, sim)
+
+
+def test_excluded_attributes():
+    model = make_model(MIXED_PROG)
+    model.enable_semihosting(0x1ff8, 0x1ffc)
+    model.run(20)
+    assert model.core.id_stg._decode_cache
+    state = checkpoint.capture(model.top, model.sim)
+    attrs = {key for _, obj_state in state['objects'].values()
+             for key in obj_state}
+    assert '_decode_cache' not in attrs
+    assert '_write_watches' not in attrs
+
+
+def nop():
+    pass
+
+
+def test_function_callback():
+    a, sim = make_acc()
+    sim.postEventAbs(5, nop)
+    state = checkpoint.loads(checkpoint.dumps(checkpoint.capture(a, sim)))
+    assert state['events'] == [(5, 0, ('function', __name__, 'nop'))]
+    b, sim_b = make_acc()
+    checkpoint.restore(b, sim_b, state)
+    assert sim_b._event_queue.get_next_event().callback is nop
+
+
+def test_unsupported_callback():
+    a, sim = make_acc()
+    sim.postEventAbs(5, lambda: None)
+    with pytest.raises(ValueError):
+        checkpoint.capture(a, sim)
+
+
+class Exploit:
+    def __reduce__(self):
+        return (os.getcwd, ())
+
+
+def test_restricted_unpickling():
+    data = checkpoint.MAGIC + zlib.compress(pickle.dumps({'x': Exploit()}))
+    with pytest.raises(ValueError, match='unsupported type'):
+        checkpoint.loads(data)
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'ckpt'
+    path.write_bytes(b'foo')
+    model = make_model(MIXED_PROG)
+    with pytest.raises(ValueError):
+        model.load_checkpoint(str(path))
+
+
+def test_design_mismatch(tmp_path):
+    a, sim = make_acc()
+    path = str(tmp_path / 'ckpt')
+    checkpoint.save(path, a, sim)
+    model = make_model(MIXED_PROG)
+    with pytest.raises(ValueError):
+        model.load_checkpoint(path)
+
+
+def test_sparse_memory_restore(tmp_path, sim: Simulator):
+    data = tmp_path / 'data.bin'
+    data.write_bytes(bytes(range(16)))
+    mem = SparseMemory(page_size=256)
+    mem._init()
+    mem.map_file(0x1000, data, copy_on_write=True)
+    mem.mem[0] = 1
+    assert mem.read_word(0x1004) == 0x07060504
+
+    path = str(tmp_path / 'ckpt')
+    checkpoint.save(path, mem, sim)
+    mem.mem[0] = 2
+    assert mem.mem[0] == 2
+    checkpoint.load(path, mem, sim)
+
+    # Reads and writes go to the restored page, not a cached old one
+    assert mem.mem[0] == 1
+    mem.mem[1] = 3
+    assert mem.snapshot()[0][:2] == b'\x01\x03'
+    # The mapped file is still mapped
+    assert mem.read_word(0x1004) == 0x07060504
+    assert mem.mem[0x1000] == 0
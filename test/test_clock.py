@@ -1,7 +1,8 @@
 import pytest
 from pyv.mem import Memory
 from pyv.reg import Reg
-from pyv.clocked import Clock, Clocked, MemList, RegList
+from pyv.clocked import Clock, Clocked, MemList
+from pyv.context import get_context
 
 
 # A dummy memory
@@ -26,8 +27,8 @@ def test_init():
     reg2 = Reg(int)
     mem1 = Mem()
     mem2 = Mem()
-    assert RegList._reg_list == [reg1, reg2]
-    assert MemList._mem_list == [mem1, mem2]
+    assert get_context().reg_list == [reg1, reg2]
+    assert get_context().mem_list == [mem1, mem2]
 
 
 def test_abstractMethods():
@@ -63,8 +64,8 @@ def test_clear():
     _ = Mem()
 
     Clock.clear()
-    assert RegList._reg_list == []
-    assert MemList._mem_list == []
+    assert get_context().reg_list == []
+    assert get_context().mem_list == []
 
 
 def test_reg_mem_chain(sim):
@@ -85,3 +86,87 @@ def test_reg_mem_chain(sim):
 
     Clock.tick()
     assert mem.mem[0] == 42
+
+
+def test_is_idle():
+    reg = Reg(int)
+    reg._init()
+    Clock.reset()
+    assert Clock.is_idle() == True
+
+    reg.next.write(1)
+    assert Clock.is_idle() == False
+    Clock.tick()
+    assert Clock.is_idle() == True
+
+    # Elements without idle detection are never idle
+    Mem()
+    assert Clock.is_idle() == False
+
+
+def test_dirty_regs():
+    regs = [Reg(int) for _ in range(4)]
+    for r in regs:
+        r._init()
+    ctx = get_context()
+    # New registers are dirty
+    assert ctx.dirty_regs == {0, 1, 2, 3}
+    Clock.tick()
+    assert ctx.tick_regs == regs
+    assert ctx.dirty_regs == set()
+
+    # Only registers with a changed input are visited
+    regs[2].next.write(5)
+    regs[0].rst.write(1)
+    assert ctx.dirty_regs == {0, 2}
+    Clock.tick()
+    assert ctx.tick_regs == [regs[0], regs[2]]
+    assert regs[2].cur.read() == 5
+    # Current value of regs[2] changed, so it is visited once more
+    assert ctx.dirty_regs == {2}
+    Clock.tick()
+    assert regs[2].cur.read() == 5
+    assert ctx.dirty_regs == set()
+
+    Clock.mark_all_dirty()
+    assert ctx.dirty_regs == {0, 1, 2, 3}
+
+
+def test_untracked_always_ticked():
+    reg = Reg(int)
+    reg._init()
+    mem = Mem()
+    ctx = get_context()
+    Clock.tick()
+    assert ctx.tick_regs == [reg]
+    assert ctx.tick_mems == [mem]
+    mem.val = 0
+
+    Clock.tick()
+    assert ctx.tick_regs == []
+    assert ctx.tick_mems == [mem]
+    assert mem.val == 12
+
+
+def test_dirty_mem(sim):
+    mem = Memory()
+    mem._init()
+    Clock.tick()
+    ctx = get_context()
+    assert ctx.dirty_mems == set()
+
+    mem.read_port0.width_i.write(1)
+    mem.write_port.wdata_i.write(7)
+    mem.write_port.we_i.write(True)
+    assert ctx.dirty_mems == {0}
+    Clock.tick()
+    assert mem.mem[0] == 7
+
+    # Stays dirty while writing
+    mem.write_port.wdata_i.write(8)
+    Clock.tick()
+    assert mem.mem[0] == 8
+    mem.write_port.we_i.write(False)
+    Clock.tick()
+    assert ctx.dirty_mems == set()
+    assert Clock.is_idle()
@@ -0,0 +1,210 @@
+import pytest
+
+from pyv.compiler import CompiledNetlist
+from pyv.levelize import collect_methods
+from pyv.models.singlecycle import SingleCycle
+from pyv.module import Module
+from pyv.port import Constant, Input, Output
+from pyv.reg import Reg
+from pyv.simulator import Simulator
+from test.programs import MIXED_PROG, loop_prog, make_core
+
+
+def core_state(core: SingleCycle):
+    return (
+        core.if_stg.pc_reg.cur.read(),
+        core.if_stg.ir_reg.cur.read(),
+        list(core.regf.regs),
+        list(core.mem.mem[:0x1100]),
+        core.csr_unit.read(0x301),
+    )
+
+
+def trace(prog: list[int], cycles: int, compiled: bool):
+    Simulator.clear()
+    sim = Simulator()
+    core = make_core(prog)
+    if compiled:
+        sim.compile()
+    sim.reset()
+
+    states = []
+    for _ in range(cycles):
+        sim._cycle()
+        states.append(core_state(core))
+    return states
+
+
+class Adder(Module):
+    def __init__(self):
+        super().__init__()
+        self.A_i = Input(int)
+        self.B_i = Input(int)
+        self.Y_o = Output(int)
+
+    def process(self):
+        self.Y_o.write(self._add(self.A_i.read(), self.B_i.read()))
+
+    def _add(self, a, b):
+        return a + b
+
+
+class Counter(Module):
+    def __init__(self):
+        super().__init__()
+        self.val_o = Output(int)
+        self.reg = Reg(int)
+        self.add = Adder()
+
+        self.add.A_i << self.reg.cur
+        self.add.B_i << Constant(1)
+        self.reg.next << self.add.Y_o
+        self.val_o << self.reg.cur
+
+
+@pytest.mark.parametrize("prog, cycles", [
+    (loop_prog(), 60),
+    (MIXED_PROG, 250),
+])
+def test_singlecycle_equivalence(prog, cycles):
+    ref = trace(prog, cycles, False)
+    res = trace(prog, cycles, True)
+    assert len(ref) == len(res)
+    for i, (a, b) in enumerate(zip(ref, res)):
+        assert a == b, f"Mismatch in cycle {i}"
+
+
+def test_compile_info(sim: Simulator):
+    c = Counter()
+    c._init()
+    info = sim.compile()
+    assert info == {'methods': 1, 'specialized': 1, 'ports': 4}
+
+
+def test_counter(sim: Simulator):
+    c = Counter()
+    c._init()
+    sim.compile()
+    sim.reset()
+    sim.run(5)
+    assert c.val_o.read() == 5
+    assert c.add.Y_o.read() == 6
+    assert sim.getStats()['cycles'] == 5
+
+
+def test_dirty_regs(sim: Simulator):
+    """Compiled writes mark registers dirty, so idle detection still
+    works."""
+    c = Counter()
+    c._init()
+    sim.compile()
+    sim.reset()
+    sim.run_comb_logic()
+    assert sim.ctx.dirty_regs == {0}
+    assert not sim._is_idle()
+    sim.tick()
+    # The tick changed the register's output, which scheduled the adder
+    assert len(sim._change_queue) == 1
+    # ... and changed the register's input (-> dirty)
+    sim.run_comb_logic()
+    assert len(sim._change_queue) == 0
+    assert sim.ctx.dirty_regs == {0}
+    assert not sim._is_idle()
+
+
+def test_specialized_source(sim: Simulator):
+    c = Counter()
+    c._init()
+    netlist = CompiledNetlist(collect_methods())
+    src = netlist.source
+    # Port accesses are inlined
+    assert '.read()' not in src
+    assert 'def _pyv_f0(self):' in src
+    # The helper method does not access ports, so it is called as is
+    assert 'self._add(' in src
+
+
+def test_external_write(sim: Simulator):
+    """Writes from outside of compiled code still trigger compiled methods."""
+    a = Adder()
+    a._init()
+    sim.compile()
+    a.A_i.write(3)
+    a.B_i.write(4)
+    sim.run_comb_logic()
+    assert a.Y_o.read() == 7
+
+
+SCALE = 1
+
+
+class Scaler(Module):
+    def __init__(self):
+        super().__init__()
+        self.A_i = Input(int)
+        self.Y_o = Output(int)
+
+    def process(self):
+        self.Y_o.write(self.A_i.read() * SCALE)
+
+
+def test_module_globals(sim: Simulator, monkeypatch):
+    """Compiled methods see changes of their module's globals."""
+    s = Scaler()
+    s._init()
+    assert sim.compile()['specialized'] == 1
+    s.A_i.write(3)
+    sim.run_comb_logic()
+    assert s.Y_o.read() == 3
+    monkeypatch.setitem(globals(), 'SCALE', 2)
+    s.A_i.write(4)
+    sim.run_comb_logic()
+    assert s.Y_o.read() == 8
+
+
+def test_type_check(sim: Simulator):
+    class Bad(Module):
+        def __init__(self):
+            super().__init__()
+            self.A_i = Input(int)
+            self.Y_o = Output(int)
+
+        def process(self):
+            self.Y_o.write("foo")
+
+    b = Bad()
+    b._init()
+    sim.compile()
+    b.A_i.write(1)
+    with pytest.raises(TypeError):
+        sim.run_comb_logic()
+
+
+def test_queue_interface(sim: Simulator):
+    a = Adder()
+    a._init()
+    netlist = CompiledNetlist(collect_methods())
+    assert len(netlist) == 0
+    assert netlist.add(a.process)
+    assert not netlist.add(a.process)
+    assert a.process in netlist
+    assert list(netlist) == [a.process]
+
+    extra = Adder()
+    assert netlist.add(extra.process)
+    assert not netlist.add(extra.process)
+    assert extra.process in netlist
+    assert len(netlist) == 2
+    assert netlist.pop() == a.process
+    assert netlist.pop() == extra.process
+    assert extra.process not in netlist
+    assert len(netlist) == 0
+
+    netlist.add(a.process)
+    netlist.add(extra.process)
+    netlist.clear()
+    assert len(netlist) == 0
+    assert extra.process not in netlist
+    assert netlist.add(extra.process)
+    assert netlist.run() == 1
+    assert extra.process not in netlist
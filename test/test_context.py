@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pyv.context import SimContext, default_context, get_context
+from pyv.models.singlecycle import SingleCycleModel
+from pyv.port import Input
+from pyv.reg import Reg
+from pyv.simulator import Simulator
+from test.programs import loop_prog, make_model
+
+
+def state(model: SingleCycleModel):
+    core = model.core
+    return (core.if_stg.pc_reg.cur.read(), list(core.regf.regs),
+            list(core.mem.mem[0x1000:0x1004]))
+
+
+def run_model(n: int, cycles: int):
+    model = make_model(loop_prog(n))
+    model.run(cycles)
+    return state(model)
+
+
+def test_default_context():
+    assert get_context() is default_context()
+    port = Input(int)
+    assert port._ctx is default_context()
+    assert get_context().port_list == [port]
+
+
+def test_activate():
+    ctx1 = SimContext()
+    ctx2 = SimContext()
+    with ctx1:
+        assert get_context() is ctx1
+        reg1 = Reg(int)
+        with ctx2:
+            assert get_context() is ctx2
+            reg2 = Reg(int)
+        assert get_context() is ctx1
+    assert get_context() is default_context()
+
+    assert reg1._ctx is ctx1
+    assert reg2._ctx is ctx2
+    assert ctx1.reg_list == [reg1]
+    assert ctx2.reg_list == [reg2]
+    assert default_context().reg_list == []
+
+
+def test_simulator_context(sim: Simulator):
+    assert sim.ctx is default_context()
+    ctx = SimContext()
+    other = Simulator(ctx)
+    assert other.ctx is ctx
+    assert ctx.sim is other
+    assert default_context().sim is sim
+
+
+def test_clear():
+    ctx = SimContext()
+    with ctx:
+        Reg(int)
+    Reg(int)
+    Simulator.clear(ctx)
+    assert ctx.reg_list == []
+    assert ctx.port_list == []
+    assert len(default_context().reg_list) == 1
+
+
+def test_models_coexist():
+    ref1 = run_model(10, 40)
+    ref2 = run_model(20, 60)
+
+    m1 = make_model(loop_prog(10))
+    m2 = make_model(loop_prog(20))
+    assert m1.ctx is not m2.ctx
+    assert m1.sim is not m2.sim
+    assert get_context() is default_context()
+
+    # Step both models interleaved
+    m1.sim.reset()
+    m2.sim.reset()
+    for i in range(60):
+        if i < 40:
+            m1.sim._cycle()
+        m2.sim._cycle()
+    m1.sim._process_remaining()
+    m2.sim._process_remaining()
+
+    assert state(m1) == ref1
+    assert state(m2) == ref2
+    assert ref1[2] == [10, 0, 0, 0]
+    assert ref2[2] == [20, 0, 0, 0]
+
+
+def test_models_in_threads():
+    jobs = [(10 + i, 40 + 2 * i) for i in range(4)]
+    ref = [run_model(n, c) for n, c in jobs]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        res = list(pool.map(lambda job: run_model(*job), jobs))
+
+    assert res == ref
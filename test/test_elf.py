@@ -0,0 +1,144 @@
+import struct
+
+import pytest
+
+from pyv.elf import EM_RISCV, ElfFile, Symbol, is_elf
+from pyv.mem import Memory, SparseMemory
+from pyv.models.singlecycle import SingleCycleModel
+from test.programs import loop_prog, prog_bytes
+
+
+def make_elf(entry: int, segments: list[tuple[int, bytes, int]],
+             symbols: list[tuple[str, int, int, int]] = [],
+             machine: int = EM_RISCV) -> bytes:
+    """Builds a minimal ELF32 file.
+
+    Args:
+        entry: Entry point.
+        segments: `(address, contents, size in memory)` of PT_LOAD segments.
+        symbols: `(name, value, size, st_info)` of the symbol table entries.
+        machine: `e_machine`.
+    """
+    ehsize, phentsize, shentsize = 52, 32, 40
+    phoff = ehsize
+    data_off = phoff + phentsize * len(segments)
+
+    body = b''
+    phdrs = b''
+    for addr, contents, memsz in segments:
+        phdrs += struct.pack('<8I', 1, data_off + len(body), addr, addr,
+                             len(contents), memsz, 5, 4)
+        body += contents
+
+    strtab = b'\0'
+    symtab = bytes(16)
+    for name, value, size, info in symbols:
+        symtab += struct.pack('<IIIBBH', len(strtab), value, size, info, 0, 1)
+        strtab += name.encode() + b'\0'
+    symtab_off = data_off + len(body)
+    strtab_off = symtab_off + len(symtab)
+    shoff = strtab_off + len(strtab)
+    shdrs = bytes(shentsize)
+    shdrs += struct.pack('<10I', 0, 2, 0, 0, symtab_off, len(symtab), 2, 1,
+                         4, 16)
+    shdrs += struct.pack('<10I', 0, 3, 0, 0, strtab_off, len(strtab), 0, 0,
+                         1, 0)
+
+    ident = b'\x7fELF\x01\x01\x01' + bytes(9)
+    ehdr = struct.pack('<16sHHIIIIIHHHHHH', ident, 2, machine, 1, entry,
+                       phoff, shoff, 0, ehsize, phentsize, len(segments),
+                       shentsize, 3, 0)
+    return ehdr + phdrs + body + symtab + strtab + shdrs
+
+
+def test_parse():
+    elf = ElfFile.parse(make_elf(
+        0x100, [(0x100, b'\x13\x00\x00\x00', 4), (0x800, b'\x01\x02', 8)],
+        [('_start', 0x100, 0, 0x10), ('result', 0x800, 4, 0x11),
+         ('loop', 0x104, 0, 0x00), ('crt.S', 0, 0, 0x04)]))
+    assert elf.entry == 0x100
+    assert [(s.addr, bytes(s.data), s.mem_size) for s in elf.segments] == \
+        [(0x100, b'\x13\x00\x00\x00', 4), (0x800, b'\x01\x02', 8)]
+    assert elf.symbols == {
+        '_start': Symbol('_start', 0x100, 0),
+        'result': Symbol('result', 0x800, 4),
+        'loop': Symbol('loop', 0x104, 0),
+    }
+
+
+def test_global_symbols_take_precedence():
+    elf = ElfFile.parse(make_elf(0, [], [('foo', 0x10, 0, 0x12),
+                                         ('foo', 0x20, 0, 0x02)]))
+    assert elf.symbols['foo'].addr == 0x10
+
+
+def test_invalid():
+    with pytest.raises(ValueError, match='too short'):
+        ElfFile.parse(b'\x7fELF')
+    with pytest.raises(ValueError, match='Not an ELF'):
+        ElfFile.parse(bytes(64))
+    with pytest.raises(ValueError, match='RISC-V'):
+        ElfFile.parse(make_elf(0, [], machine=62))
+
+
+@pytest.mark.parametrize('mem_type', [Memory, SparseMemory])
+def test_load(mem_type):
+    mem = mem_type(0x1000)
+    mem.mem[0x800:0x808] = b'\xff' * 8
+    elf = ElfFile.parse(make_elf(
+        0, [(0x100, b'\x13\x00\x00\x00', 4), (0x800, b'\x01\x02', 6)]))
+    elf.load(mem)
+    assert bytes(mem.mem[0x100:0x104]) == b'\x13\x00\x00\x00'
+    # .bss is zero-filled, the rest is untouched
+    assert bytes(mem.mem[0x800:0x808]) == b'\x01\x02\0\0\0\0\xff\xff'
+
+
+def test_load_sparse_bss():
+    mem = SparseMemory()
+    mem.mem[0x10_0800] = 0xff
+    elf = ElfFile.parse(make_elf(
+        0, [(0x100, b'\x13\x00\x00\x00', 0x100), (0x1000, b'', 1 << 24)]))
+    elf.load(mem)
+    # Written pages are zero-filled, untouched ones stay unallocated
+    assert mem.resident_pages() == [0, 0x10_0000]
+    assert mem.mem[0x10_0800] == 0
+
+
+def test_load_out_of_range():
+    mem = Memory(0x100)
+    elf = ElfFile.parse(make_elf(0, [(0xfc, b'', 8)]))
+    with pytest.raises(ValueError, match='does not fit'):
+        elf.load(mem)
+    assert len(mem.mem) == 0x100
+
+
+def test_is_elf(tmp_path):
+    path = tmp_path / 'prog.out'
+    path.write_bytes(make_elf(0, []))
+    assert is_elf(path)
+    path.write_bytes(b'\x13\x00\x00\x00')
+    assert not is_elf(path)
+
+
+def test_model_load_elf(tmp_path):
+    # Count x1 from 0 to 20, then store it to `result` (0x1000).
+    prog = prog_bytes(loop_prog())
+    path = tmp_path / 'loop.out'
+    path.write_bytes(make_elf(
+        0x200, [(0x200, prog, len(prog)),
+                (0x1000, b'', 4)],
+        [('_start', 0x200, 0, 0x10), ('result', 0x1000, 4, 0x11)]))
+
+    model = SingleCycleModel()
+    model.core.mem.mem[0x1000] = 0xff
+    elf = model.load_elf(path)
+    assert elf.entry == 0x200
+    assert model.core.mem.mem[0x1000] == 0
+    assert model.symbol('result') == 0x1000
+    with pytest.raises(KeyError, match='foo'):
+        model.symbol('foo')
+
+    res = model.run_until(mem_write=model.symbol('result'))
+    assert res.reason == 'mem_write'
+    assert model.readPC() == 0x220
+    assert model.readDataMem('result', 4) == ['0x14', '0x0', '0x0', '0x0']
@@ -0,0 +1,118 @@
+from pyv.levelize import build_graph, collect_methods, levelize
+from pyv.mem import Memory
+from pyv.module import Module
+from pyv.port import Input, Output, Wire
+from pyv.reg import Reg
+
+
+class Pass(Module):
+    def __init__(self):
+        super().__init__()
+        self.A_i = Input(int)
+        self.A_o = Output(int)
+
+    def process(self):
+        self.A_o.write(self.A_i.read())
+
+
+class Chain(Module):
+    def __init__(self):
+        super().__init__()
+        self.A_i = Input(int)
+        self.A_o = Output(int)
+
+        self.p1 = Pass()
+        self.p2 = Pass()
+        self.p3 = Pass()
+
+        # Connect in reverse order, so registration order != topological order
+        self.A_o << self.p1.A_o
+        self.p1.A_i << self.p2.A_o
+        self.p2.A_i << self.p3.A_o
+        self.p3.A_i << self.A_i
+
+
+class Loop(Module):
+    def __init__(self):
+        super().__init__()
+        self.a = Pass()
+        self.b = Pass()
+        self.a.A_i << self.b.A_o
+        self.b.A_i << self.a.A_o
+
+
+def test_collect_methods():
+    dut = Chain()
+    dut._init()
+    assert collect_methods() == [dut.p1.process, dut.p2.process, dut.p3.process]
+
+
+def test_build_graph():
+    dut = Chain()
+    dut._init()
+    graph = build_graph(collect_methods())
+    assert graph[dut.p3.process] == [dut.p2.process]
+    assert graph[dut.p2.process] == [dut.p1.process]
+    assert graph[dut.p1.process] == []
+
+
+def test_order():
+    dut = Chain()
+    dut._init()
+    order, cyclic = levelize(collect_methods())
+    assert order == [dut.p3.process, dut.p2.process, dut.p1.process]
+    assert cyclic == set()
+
+
+def test_cycle():
+    dut = Loop()
+    dut._init()
+    order, cyclic = levelize(collect_methods())
+    assert order == [dut.a.process, dut.b.process]
+    assert cyclic == {dut.a.process, dut.b.process}
+
+
+def test_registers_break_paths():
+    class Foo(Module):
+        def __init__(self):
+            super().__init__()
+            self.reg = Reg(int)
+            self.A_i = Wire(int, [self.comb])
+            self.A_i << self.reg.cur
+            self.A_o = Output(int)
+
+        def comb(self):
+            self.A_o.write(self.A_i.read())
+
+        def process(self):
+            pass
+
+    foo = Foo()
+    foo._init()
+    bar = Pass()
+    bar._init()
+    bar.A_i << foo.A_o
+    foo.reg.next << bar.A_o
+
+    order, cyclic = levelize(collect_methods())
+    assert cyclic == set()
+    assert order.index(foo.comb) < order.index(bar.process)
+
+
+def test_containers_are_searched():
+    class Foo(Module):
+        def __init__(self, mem: Memory):
+            super().__init__()
+            self.A_i = Input(int)
+            self.read_port = mem.read_port0
+
+        def process(self):
+            self.read_port.addr_i.write(self.A_i.read())
+
+    mem = Memory()
+    foo = Foo(mem)
+    mem._init()
+    foo._init()
+
+    graph = build_graph(collect_methods())
+    assert mem.process_read0 in graph[foo.process]
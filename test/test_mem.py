@@ -1,7 +1,10 @@
+import mmap
+from unittest.mock import patch
+
 import pytest
-from pyv.clocked import MemList
+from pyv.context import get_context
 from pyv.port import Input, Output
-from pyv.mem import Memory
+from pyv.mem import Memory, SparseMemory
 from pyv.simulator import Simulator
 
 
@@ -16,12 +19,13 @@ def mem() -> Memory:
 
 def test_MemList():
     mem = Memory()
-    assert MemList._mem_list == [mem]
+    assert get_context().mem_list == [mem]
 
 
 class TestInit():
     def test_init(self, mem: Memory):
-        assert isinstance(mem.mem, list)
+        assert isinstance(mem.mem, bytearray)
+        assert list(mem.mem) == [0xef, 0xbe, 0xad, 0xde]
 
     def test_read_port_0(self, mem: Memory):
         rp0 = mem.read_port0
@@ -170,6 +174,14 @@ class TestLoad:
         with pytest.raises(Exception):
             sim.step()
 
+    def test_read_beyond_end(self, sim: Simulator, mem: Memory):
+        # A word crossing the end of the memory is out of range, too
+        mem.read_port0.re_i.write(True)
+        mem.read_port0.addr_i.write(2)
+        mem.read_port0.width_i.write(4)
+        sim.step()
+        assert mem.read_port0.rdata_o.read() == 0
+
     def test_read_invalid_idx(self, sim: Simulator, mem: Memory):
         # Read port 0
         mem.read_port0.re_i.write(True)
@@ -244,3 +256,260 @@ class TestStore:
 
         with pytest.raises(Exception):
             sim.step()
+
+    def test_store_unaligned(self, sim: Simulator, mem: Memory):
+        mem.write_port.we_i.write(True)
+        mem.read_port0.addr_i.write(1)
+        mem.write_port.wdata_i.write(0x1234)
+        mem.read_port0.width_i.write(2)
+        sim.step()
+        assert list(mem.mem) == [0xef, 0x34, 0x12, 0xde]
+
+    def test_store_out_of_range(self, sim: Simulator, mem: Memory):
+        mem.write_port.we_i.write(True)
+        mem.read_port0.addr_i.write(2)
+        mem.write_port.wdata_i.write(0)
+        mem.read_port0.width_i.write(4)
+        with pytest.raises(IndexError):
+            sim.step()
+
+    def test_is_idle(self, mem: Memory):
+        assert mem._is_idle() == True
+        mem.write_port.we_i.write(True)
+        assert mem._is_idle() == False
+
+    def test_write_watch(self, sim: Simulator, mem: Memory):
+        seen = []
+        watch = mem.add_write_watch(2, lambda *args: seen.append(args), 2)
+
+        mem.write_port.we_i.write(True)
+        mem.read_port0.addr_i.write(0)
+        mem.write_port.wdata_i.write(0xaf)
+        mem.read_port0.width_i.write(1)
+        sim.step()
+        assert seen == []
+
+        mem.read_port0.width_i.write(4)
+        sim.step()
+        assert seen == [(0, 4, 0xaf)]
+
+        mem.read_port0.addr_i.write(3)
+        mem.read_port0.width_i.write(1)
+        sim.step()
+        assert seen == [(0, 4, 0xaf), (3, 1, 0xaf)]
+
+        mem.remove_write_watch(watch)
+        sim.step()
+        assert len(seen) == 2
+
+
+class TestInspect:
+    def test_view(self, sim: Simulator, mem: Memory):
+        view = mem.view(1, 2)
+        assert view.readonly
+        assert bytes(view) == b'\xbe\xad'
+        # The view shares the memory's buffer
+        store(sim, mem, 1, 1, 0x42)
+        assert bytes(view) == b'\x42\xad'
+        with pytest.raises(IndexError):
+            mem.view(2, 4)
+        with pytest.raises(IndexError):
+            mem.view(-1, 1)
+
+    def test_read_bytes(self, mem: Memory):
+        data = mem.read_bytes(0, 4)
+        assert data == b'\xef\xbe\xad\xde'
+        mem.mem[0] = 0
+        assert data[0] == 0xef
+
+    def test_read_word_half(self, mem: Memory):
+        assert mem.read_word(0) == 0xdeadbeef
+        assert mem.read_word(0, signed=True) == 0xdeadbeef - (1 << 32)
+        assert mem.read_half(1) == 0xadbe
+        assert mem.read_half(0, signed=True) == 0xbeef - (1 << 16)
+        with pytest.raises(IndexError):
+            mem.read_word(1)
+
+    def test_snapshot(self, mem: Memory):
+        snap = mem.snapshot()
+        assert snap == {0: b'\xef\xbe\xad\xde'}
+        mem.mem[0] = 0
+        assert snap[0][0] == 0xef
+
+
+def store(sim: Simulator, mem: Memory, addr: int, w: int, wdata: int):
+    mem.write_port.we_i.write(True)
+    mem.read_port0.addr_i.write(addr)
+    mem.read_port0.width_i.write(w)
+    mem.write_port.wdata_i.write(wdata)
+    sim.step()
+    mem.write_port.we_i.write(False)
+
+
+def load(sim: Simulator, mem: Memory, addr: int, w: int) -> int:
+    mem.read_port1.re_i.write(True)
+    mem.read_port1.addr_i.write(addr)
+    mem.read_port1.width_i.write(w)
+    sim.step()
+    return mem.read_port1.rdata_o.read()
+
+
+class TestSparseMemory:
+    @pytest.fixture
+    def smem(self) -> SparseMemory:
+        mem = SparseMemory(page_size=256)
+        mem._init()
+        return mem
+
+    def test_init(self):
+        mem = SparseMemory()
+        assert len(mem.mem) == 1 << 32
+        assert mem.resident_pages() == []
+        with pytest.raises(ValueError):
+            SparseMemory(page_size=1000)
+
+    def test_store_load(self, sim: Simulator, smem: SparseMemory):
+        store(sim, smem, 0x8000_0000, 4, 0xdeadbeef)
+        assert smem.resident_pages() == [0x8000_0000]
+        assert load(sim, smem, 0x8000_0000, 4) == 0xdeadbeef
+        assert load(sim, smem, 0x8000_0002, 2) == 0xdead
+        assert load(sim, smem, 0x8000_0001, 1) == 0xbe
+
+        store(sim, smem, 0xffff_fffe, 2, 0x1234)
+        assert load(sim, smem, 0xffff_fffe, 2) == 0x1234
+        assert smem.resident_pages() == [0x8000_0000, 0xffff_ff00]
+        assert smem.resident_size() == 512
+
+    def test_untouched_pages(self, sim: Simulator, smem: SparseMemory):
+        assert load(sim, smem, 0x1000, 4) == 0
+        assert smem.mem[0x2000] == 0
+        assert smem.mem[0x2000:0x2004] == bytes(4)
+        assert smem.resident_pages() == []
+
+    def test_page_boundary(self, sim: Simulator, smem: SparseMemory):
+        store(sim, smem, 0x1fe, 4, 0xaabbccdd)
+        assert smem.resident_pages() == [0x100, 0x200]
+        assert load(sim, smem, 0x1fe, 4) == 0xaabbccdd
+        assert list(smem.mem[0x1fe:0x202]) == [0xdd, 0xcc, 0xbb, 0xaa]
+
+    def test_fetch_cache(self, sim: Simulator, smem: SparseMemory):
+        # Code and data on different pages
+        smem.mem[0x100:0x104] = b'\x13\x00\x00\x00'
+        store(sim, smem, 0x800, 4, 0x42)
+        assert load(sim, smem, 0x100, 4) == 0x13
+
+        class Pages(dict):
+            lookups = 0
+
+            def get(self, *args):
+                Pages.lookups += 1
+                return super().get(*args)
+
+        smem._pages = Pages(smem._pages)
+        for _ in range(3):
+            # Fetch (port 1) and data access (port 0) in one cycle
+            smem.read_port0.addr_i.write(0x800)
+            smem.read_port0.width_i.write(4)
+            smem.read_port0.re_i.write(True)
+            smem.read_port1.addr_i.write(0x100)
+            sim.step()
+            assert smem.read_port0.rdata_o.read() == 0x42
+            assert smem.read_port1.rdata_o.read() == 0x13
+            store(sim, smem, 0x804, 4, 0x43)
+        # Both pages stay cached, no page lookups
+        assert Pages.lookups == 0
+
+    def test_out_of_range(self, sim: Simulator):
+        mem = SparseMemory(size=0x100, page_size=256)
+        mem._init()
+        assert load(sim, mem, 0xfe, 4) == 0
+        with pytest.raises(IndexError):
+            store(sim, mem, 0xfe, 4, 0)
+        with pytest.raises(IndexError):
+            mem.mem[0x100]
+
+    def test_mem_access(self, smem: SparseMemory):
+        smem.mem[0x300:0x304] = [1, 2, 3, 4]
+        smem.mem[0x305] = 5
+        assert list(smem.mem[0x300:0x306]) == [1, 2, 3, 4, 0, 5]
+        assert smem.mem[-1] == 0
+        with pytest.raises(ValueError):
+            smem.mem[0:2] = [1]
+
+        smem.mem = [7, 8]
+        assert smem.resident_pages() == [0]
+        assert smem.mem[1] == 8
+
+    @pytest.fixture
+    def data_file(self, tmp_path):
+        path = tmp_path / 'data.bin'
+        path.write_bytes(bytes(range(256)) + b'\x11\x22\x33')
+        return path
+
+    def test_map_file(self, sim: Simulator, smem: SparseMemory, data_file):
+        assert smem.map_file(0x1000, data_file) == (0x1000, 0x1103)
+        assert load(sim, smem, 0x1000, 4) == 0x03020100
+        assert load(sim, smem, 0x10fe, 4) == 0x2211fffe
+        assert load(sim, smem, 0x1102, 2) == 0x0033
+        assert load(sim, smem, 0x1104, 4) == 0
+        assert smem.mem[0x1101] == 0x22
+        assert smem.resident_pages() == []
+
+        with pytest.raises(Exception, match='read-only'):
+            store(sim, smem, 0x1000, 4, 0)
+        with pytest.raises(Exception, match='read-only'):
+            smem.mem[0x1000:0x1002] = [1, 2]
+
+        with pytest.raises(ValueError):
+            smem.map_file(0x1100, data_file)
+        with pytest.raises(ValueError):
+            smem.map_file(0x1080, data_file)
+
+    def test_map_file_copy_on_write(self, sim: Simulator, smem: SparseMemory,
+                                    data_file):
+        smem.map_file(0x1000, data_file, copy_on_write=True)
+        store(sim, smem, 0x10fe, 4, 0xdeadbeef)
+        assert load(sim, smem, 0x10fe, 4) == 0xdeadbeef
+        with pytest.raises(IndexError):
+            store(sim, smem, 0x1102, 2, 0)
+        assert data_file.read_bytes()[0xfe:0x102] == b'\xfe\xff\x11\x22'
+        assert smem.resident_pages() == []
+
+    def test_map_file_in_use(self, sim: Simulator, smem: SparseMemory,
+                             data_file):
+        store(sim, smem, 0x1100, 4, 0)
+        with pytest.raises(ValueError):
+            smem.map_file(0x1000, data_file)
+
+    def test_map_file_invalid_range(self, sim: Simulator, data_file):
+        mem = SparseMemory(size=0x1100, page_size=256)
+        mem._init()
+        # Nothing is mapped (and left open) if the range is invalid
+        with patch('mmap.mmap', wraps=mmap.mmap) as mapper:
+            with pytest.raises(ValueError, match='does not fit'):
+                mem.map_file(0x1000, data_file)
+            mem.map_file(0x1000, data_file, size=0x100)
+            with pytest.raises(ValueError, match='in use'):
+                mem.map_file(0x1000, data_file, size=0x100)
+        assert mapper.call_count == 1
+
+    def test_inspect(self, smem: SparseMemory, data_file):
+        smem.map_file(0x1000, data_file)
+        smem.mem[0x1fe:0x202] = [1, 2, 3, 4]
+        assert smem.read_word(0x1fe) == 0x04030201
+        assert smem.read_half(0x1002) == 0x0302
+        assert bytes(smem.view(0x5000, 2)) == bytes(2)
+        assert smem.resident_pages() == [0x100, 0x200]
+
+        # Views within a page share the page
+        view = smem.view(0x200, 2)
+        smem.mem[0x200] = 5
+        assert bytes(view) == b'\x05\x04'
+        assert smem.view(0x1100, 3) == b'\x11\x22\x33'
+        with pytest.raises(IndexError):
+            smem.view(0xffff_ffff, 2)
+
+        snap = smem.snapshot()
+        assert list(snap) == [0x100, 0x200, 0x1000]
+        assert snap[0x100][-2:] == b'\x01\x02'
+        assert snap[0x1000] == data_file.read_bytes()
@@ -71,5 +71,5 @@ class TestOnStable:
     def test_stable_callbacks_are_added_to_sim_on_init(self, sim: Simulator):
         dut = self.DummyModule()
         dut._init()
-        assert dut.stable_callback_1 in sim._stable_callbacks
-        assert dut.stable_callback_2 in sim._stable_callbacks
+        assert dut.stable_callback_1 in sim.ctx.stable_callbacks
+        assert dut.stable_callback_2 in sim.ctx.stable_callbacks
@@ -1,9 +1,12 @@
 from collections import deque
-from unittest.mock import MagicMock
+from dataclasses import dataclass
+from unittest.mock import MagicMock, patch
 import pytest
-from pyv.port import Constant, Input, Output, PortList, Wire
+from pyv.port import Constant, Input, Output, PortList, PortRW, Wire
+from pyv.context import get_context
 from pyv.module import Module
 from pyv.simulator import Simulator
+from pyv.util import immutable
 
 
 class TestPort:
@@ -98,6 +101,53 @@ class TestPort:
         assert D._downstreamInputs == []
         assert A._downstreamInputs == [B, E, G]
 
+    def test_net(self):
+        A = Input(int)
+        B = Output(int)
+        C = Input(int)
+        C.connect(B)
+        assert C._net is B._net
+        assert A._net is not B._net
+
+        # B's subtree joins A's net
+        B.connect(A)
+        assert A._net is B._net is C._net
+        A.write(7)
+        assert C.read() == 7
+        assert C._val == 7
+
+    def test_slots(self):
+        for port in (Input(int), Output(int), Wire(int), Constant(1)):
+            assert not hasattr(port, '__dict__')
+            with pytest.raises(AttributeError):
+                port.foo = 1
+
+    def test_net_fanout(self, sim: Simulator):
+        def foo(): pass
+        def bar(): pass
+        A = Input(int, [foo])
+        B = Input(int, [bar, foo])
+        hook = MagicMock()
+        B.add_change_hook(hook)
+        A.write(1)
+        assert A._get_fanout() == ((), (foo,))
+
+        # Connecting invalidates the cached fanout
+        B.connect(A)
+        assert A._net.fanout is None
+        sim._change_queue.clear()
+        A.write(2)
+        # Without duplicates
+        assert A._net.fanout == (foo, bar)
+        assert A._net.hooks == (hook,)
+        hook.assert_called_once()
+        assert deque(sim._change_queue) == deque([foo, bar])
+
+        # Methods already queued are coalesced
+        A.write(3)
+        assert deque(sim._change_queue) == deque([foo, bar])
+        assert sim.getStats()['coalesced'] == 2
+
     def test_connect(self):
         A = Input(int)
         B = Input(int)
@@ -146,8 +196,8 @@ class TestPort:
     def test_connect_shortcut(self):
         A = Input(int)
         B = Input(int)
-        connect = A.connect = MagicMock()
-        A << B
+        with patch.object(Input, 'connect') as connect:
+            A << B
         connect.assert_called_once_with(B)
 
     def test_wire(self):
@@ -263,7 +313,7 @@ class TestPort:
 
         p = Input(int, sensitive_methods=[foo, bar])
         p._init(parent=None)
-        assert sim._change_queue == deque([foo, bar])
+        assert deque(sim._change_queue) == deque([foo, bar])
 
     def test_basic_change(self, sim):
         def foo():
@@ -275,7 +325,7 @@ class TestPort:
         p = Input(int, sensitive_methods=[foo, bar])
 
         p.write(42)
-        assert sim._change_queue == deque([foo, bar])
+        assert deque(sim._change_queue) == deque([foo, bar])
 
     def test_downstream_change(self, sim: Simulator):
         def fooA(): pass
@@ -305,7 +355,32 @@ class TestPort:
         D.connect(B)
 
         A.write(42)
-        assert sim._change_queue == deque([fooA, fooB, fooE, fooG])
+        assert deque(sim._change_queue) == deque([fooA, fooB, fooE, fooG])
+
+    def test_constant_values(self):
+        @immutable
+        @dataclass
+        class Rec:
+            a: int = 0
+            b: int = 0
+
+        @dataclass
+        class MutRec:
+            a: int = 0
+            b: int = 0
+
+        rec = Rec(1, 2)
+        c = Constant(rec)
+        assert c._type is Rec
+        assert c.read() is rec
+
+        mut = MutRec(1, 2)
+        c = Constant(mut)
+        assert c.read() == mut
+        assert c.read() is not mut
+
+        obj = object()
+        assert Constant(obj).read() is not obj
 
     def test_constant(self):
         c = Constant(42)
@@ -342,10 +417,10 @@ class TestPortList:
         D = Wire(int)
         E = Constant(5)
 
-        assert PortList.port_list == [A, B, C, D, E]
+        assert get_context().port_list == [A, B, C, D, E]
 
         PortList.clear()
-        assert PortList.port_list == []
+        assert get_context().port_list == []
 
     def test_filter(self):
         PortList.clear()
@@ -363,67 +438,60 @@ class TestPortList:
         PortList.filter([
             'top.mod1'
         ])
-        assert PortList.port_list_filtered == [A, B]
+        assert get_context().port_list_filtered == [A, B]
 
-        PortList.port_list_filtered = []
+        get_context().port_list_filtered = []
         PortList.filter([
             'mod2'
         ])
-        assert PortList.port_list_filtered == [C, D, E]
+        assert get_context().port_list_filtered == [C, D, E]
 
-        PortList.port_list_filtered = []
+        get_context().port_list_filtered = []
         PortList.filter([
             'mod1.A', 'sub1'
         ])
-        assert PortList.port_list_filtered == [A, E]
+        assert get_context().port_list_filtered == [A, E]
 
-        PortList.port_list_filtered = []
+        get_context().port_list_filtered = []
         PortList.filter([
             'mod1.A', 'mod1.A', 'sub1'
         ])
-        assert PortList.port_list_filtered == [A, E]
+        assert get_context().port_list_filtered == [A, E]
 
         PortList.clear()
-        assert PortList.port_list_filtered == []
+        assert get_context().port_list_filtered == []
 
     def test_logPorts(self):
         PortList.clear()
         A = Input(int)
         A.name = 'top.mod1.A'
-        A.read = MagicMock()
 
         B = Input(int)
         B.name = 'top.mod1.B'
-        B.read = MagicMock()
 
         C = Output(int)
         C.name = 'top.mod2.C'
-        C.read = MagicMock()
 
         D = Wire(int)
         D.name = 'top.mod2.D'
-        D.read = MagicMock()
 
         E = Constant(5)
         E.name = 'top.mod2.sub1.E'
-        E.read = MagicMock()
-
-        # First, test logging all ports
-        PortList.logPorts()
-        assert A.read.call_count == 1
-        assert B.read.call_count == 1
-        assert C.read.call_count == 1
-        assert D.read.call_count == 1
-        assert E.read.call_count == 1
-
-        # Now, filter some ports
-        PortList.port_list_filtered = []
-        PortList.filter([
-            'mod2'
-        ])
-        PortList.logPorts()
-        assert A.read.call_count == 1
-        assert B.read.call_count == 1
-        assert C.read.call_count == 2
-        assert D.read.call_count == 2
-        assert E.read.call_count == 2
+
+        with patch.object(PortRW, 'read', autospec=True) as read, \
+                patch.object(Constant, 'read', autospec=True) as const_read:
+            def reads():
+                return [c.args[0] for c in
+                        read.call_args_list + const_read.call_args_list]
+
+            # First, test logging all ports
+            PortList.logPorts()
+            assert reads() == [A, B, C, D, E]
+
+            # Now, filter some ports
+            get_context().port_list_filtered = []
+            PortList.filter([
+                'mod2'
+            ])
+            PortList.logPorts()
+            assert reads() == [A, B, C, D, C, D, E, E]
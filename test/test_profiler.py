@@ -0,0 +1,140 @@
+import json
+import logging
+
+import pytest
+
+from pyv.module import Module
+from pyv.port import Input, Output, Wire
+from pyv.reg import Reg
+from pyv.simulator import Simulator
+
+
+class Stage(Module):
+    """Passes its input through, and counts how often it was evaluated."""
+    def __init__(self):
+        super().__init__()
+        self.in_i = Input(int)
+        self.out_o = Output(int)
+
+    def process(self):
+        self.out_o.write(self.in_i.read() // 2)
+
+
+class Chain(Module):
+    """Counter feeding two stages in a row."""
+    def __init__(self):
+        super().__init__()
+        self.cnt = Reg(int, 0)
+        self.cnt_w = Wire(int, [self.count])
+        self.cnt_w << self.cnt.cur
+        self.s1 = Stage()
+        self.s2 = Stage()
+        self.s1.in_i << self.cnt.cur
+        self.s2.in_i << self.s1.out_o
+
+    def count(self):
+        self.cnt.next.write(self.cnt_w.read() + 1)
+
+
+@pytest.fixture
+def dut() -> Chain:
+    dut = Chain()
+    dut.name = 'top'
+    dut._init()
+    return dut
+
+
+def test_profile(sim: Simulator, dut: Chain):
+    prof = sim.enable_profiling()
+    assert sim.enable_profiling() is prof
+    sim.run(8)
+
+    stats = {s.name: s for s in prof.stats()}
+    assert set(stats) == {'top.count', 'top.s1.process', 'top.s2.process'}
+    assert stats['top.count'].qualname == 'Chain.count'
+    assert stats['top.s1.process'].qualname == 'Stage.process'
+
+    # 8 cycles. The logic is evaluated once more at the end (no tick).
+    assert prof.cycles == 8
+    assert stats['top.count'].calls == 9
+    assert stats['top.count'].max_calls_per_cycle == 1
+    assert stats['top.count'].no_change_calls == 0
+    # s1 changes its output every other cycle (not for 0 -> 0), so s2 only
+    # runs then (and once initially)
+    assert stats['top.s1.process'].calls == 9
+    assert stats['top.s1.process'].no_change_calls == 5
+    assert stats['top.s2.process'].calls == 5
+    assert stats['top.s2.process'].no_change_calls == 3
+    assert all(s.time_ns > 0 for s in stats.values())
+    assert prof.stats()[0].time_ns >= prof.stats()[-1].time_ns
+
+    # count and s1 run in the first delta iteration, s2 in the second
+    assert prof.deltas == {1: 5, 2: 4}
+    assert sim.getStats()['evals'] >= 23
+    assert prof.changes > 0
+
+
+def test_profile_debug_logging(sim: Simulator, dut: Chain, caplog):
+    """Port changes are also counted when they are propagated port by port
+    (with debug logging)."""
+    prof = sim.enable_profiling()
+    with caplog.at_level(logging.DEBUG):
+        sim.run(8)
+    stats = {s.name: s for s in prof.stats()}
+    assert stats['top.s1.process'].no_change_calls == 5
+    assert stats['top.s2.process'].no_change_calls == 3
+
+
+def test_disable(sim: Simulator, dut: Chain):
+    prof = sim.enable_profiling()
+    sim.run(4)
+    sim.disable_profiling()
+    calls = prof.stats()[0].calls
+    changes = prof.changes
+    sim.run(4)
+    assert prof.stats()[0].calls == calls
+    assert prof.changes == changes
+    assert prof.cycles == 4
+
+    prof.reset()
+    assert prof.stats() == []
+    assert prof.cycles == 0
+
+
+def test_export(sim: Simulator, dut: Chain, tmp_path):
+    prof = sim.enable_profiling()
+    sim.run(8)
+
+    table = prof.table()
+    lines = table.splitlines()
+    assert lines[0].split()[:3] == ['Method', 'Calls', 'Calls/cyc']
+    assert {line.split()[0] for line in lines[2:5]} == \
+        {'top.count', 'top.s1.process', 'top.s2.process'}
+    assert '8 cycles' in table
+    assert len(prof.table(limit=1).splitlines()) == 5
+
+    path = tmp_path / 'profile.json'
+    prof.save_json(str(path))
+    data = json.loads(path.read_text())
+    assert data['cycles'] == 8
+    assert data['deltas'] == {'mean': 13 / 9, 'max': 2,
+                              'histogram': {'1': 5, '2': 4}}
+    assert [m['name'] for m in data['methods']] == \
+        [s.name for s in prof.stats()]
+    assert data['methods'][0].keys() == {
+        'name', 'qualname', 'calls', 'max_calls_per_cycle', 'time_ns',
+        'no_change_calls'}
+
+
+def test_compiled(sim: Simulator, dut: Chain):
+    sim.compile()
+    with pytest.raises(Exception):
+        sim.enable_profiling()
+
+
+def test_compile_while_profiling(sim: Simulator, dut: Chain):
+    prof = sim.enable_profiling()
+    with pytest.raises(Exception, match='disable_profiling'):
+        sim.compile()
+    sim.run(2)
+    assert prof.stats()
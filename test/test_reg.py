@@ -1,7 +1,11 @@
-from unittest.mock import MagicMock
+from unittest.mock import patch
 import pytest
+from dataclasses import dataclass
+from pyv.port import Wire
 from pyv.reg import Reg, Regfile
+from pyv.util import immutable
 from pyv.clocked import RegList
+from pyv.context import get_context
 
 
 @pytest.fixture
@@ -59,15 +63,40 @@ def test_reg_tick(reg):
     assert reg.cur._val == 42
 
     # Tick again, but as port value is unchanged, register should skip _tick
-    reg.cur.write = MagicMock()
+    with patch.object(Wire, 'write') as write:
+        RegList.prepareNextVal()
+        RegList.tick()
+    assert reg._doTick == False
+    write.assert_not_called()
+
+
+def test_latch_by_reference():
+    @immutable
+    @dataclass
+    class Rec:
+        a: int = 0
+
+    @dataclass
+    class MutRec:
+        a: int = 0
+
+    reg = Reg(Rec, Rec())
+    mut = Reg(MutRec, MutRec())
+    reg._init()
+    mut._init()
+    val = Rec(1)
+    mut_val = MutRec(1)
+    reg.next.write(val)
+    mut.next.write(mut_val)
     RegList.prepareNextVal()
     RegList.tick()
-    assert reg._doTick == False
-    reg.cur.write.assert_not_called()
+    assert reg.cur.read() is val
+    assert mut.cur.read() == mut_val
+    assert mut.cur.read() is not mut_val
 
 
 def test_RegList(reg):
-    assert RegList._reg_list == [reg]
+    assert get_context().reg_list == [reg]
 
 
 def test_regfile():
@@ -198,3 +227,39 @@ def test_sync_reset(reg):
     with pytest.raises(Exception, match="Error: Invalid rst signal!"):
         RegList.prepareNextVal()
         RegList.tick()
+
+
+def test_is_idle(reg):
+    RegList.reset()
+    assert reg._is_idle() == True
+
+    reg.next.write(42)
+    assert reg._is_idle() == False
+    RegList.prepareNextVal()
+    RegList.tick()
+    assert reg._is_idle() == True
+
+    # Reset asserted, but register already holds reset value
+    reg.next.write(0)
+    reg.rst.write(1)
+    assert reg._is_idle() == False
+    RegList.prepareNextVal()
+    RegList.tick()
+    assert reg._is_idle() == True
+
+    reg.rst.write(2)
+    assert reg._is_idle() == False
+
+
+def test_regfile_is_idle():
+    rf = Regfile()
+    assert rf._is_idle() == True
+    rf.writeRequest(1, 42)
+    assert rf._is_idle() == False
+    rf._tick()
+    assert rf._is_idle() == True
+
+
+def test_slots():
+    reg = Reg(int)
+    assert not hasattr(reg, '__dict__')
@@ -0,0 +1,97 @@
+import io
+import struct
+
+import pytest
+
+from pyv.batch import Job, run_job
+from pyv.mem import Memory
+from pyv.models.singlecycle import SingleCycleModel
+from pyv.semihost import Semihost
+from pyv.simulator import Simulator
+from test.programs import make_model, prog_bytes
+from test.test_elf import make_elf
+
+TOHOST = 0x1ff8
+CONSOLE = 0x1ffc
+
+# Print "h\n", then exit with code 3.
+PROG = [
+    0x000022b7,  # lui x5, 2
+    0x06800313,  # addi x6, x0, 'h'
+    0xfe62ae23,  # sw x6, -4(x5)      (console)
+    0x00a00313,  # addi x6, x0, '\n'
+    0xfe62ae23,  # sw x6, -4(x5)      (console)
+    0x00700393,  # addi x7, x0, 7     ((3 << 1) | 1)
+    0xfe72ac23,  # sw x7, -8(x5)      (tohost)
+    0x0000006f,  # end: jal x0, end
+]
+PROG_BYTES = prog_bytes(PROG)
+
+
+@pytest.fixture
+def model() -> SingleCycleModel:
+    return make_model(PROG)
+
+
+def test_exit(model: SingleCycleModel):
+    stream = io.StringIO()
+    host = model.enable_semihosting(TOHOST, CONSOLE, stream)
+    res = model.run_until(max_cycles=1000)
+    assert res.reason == 'exit'
+    assert res.cycles < 20
+    assert host.exit_code == 3
+    assert host.output == b'h\n'
+    assert host.text == 'h\n'
+    assert stream.getvalue() == 'h\n'
+
+
+def test_no_console(model: SingleCycleModel):
+    host = model.enable_semihosting(TOHOST, None)
+    assert model.run_until(max_cycles=1000).reason == 'exit'
+    assert host.output == b''
+
+
+def test_symbols(model: SingleCycleModel):
+    with pytest.raises(KeyError, match='tohost'):
+        model.enable_semihosting()
+
+
+def test_reenable(model: SingleCycleModel):
+    model.enable_semihosting(TOHOST, CONSOLE)
+    host = model.enable_semihosting(TOHOST, CONSOLE)
+    assert len(model.core.mem._write_watches) == 2
+    host.close()
+    assert model.core.mem._write_watches == []
+
+
+def test_ignore_unsupported(sim: Simulator):
+    mem = Memory(16)
+    host = Semihost(sim, mem, 8)
+    mem.mem[8:12] = struct.pack('<I', 0x100)
+    host._write_tohost(8, 4, 0x100)
+    assert host.exit_code is None
+    assert sim._stop_reason is None
+
+
+def test_line_buffering(sim: Simulator):
+    mem = Memory(16)
+    stream = io.StringIO()
+    host = Semihost(sim, mem, 8, 12, stream)
+    for c in b'ab':
+        host._write_console(12, 1, c)
+    assert stream.getvalue() == ''
+    host.close()
+    assert stream.getvalue() == 'ab'
+    assert mem._write_watches == []
+
+
+def test_batch(tmp_path):
+    path = tmp_path / 'prog.out'
+    path.write_bytes(make_elf(0, [(0, PROG_BYTES, len(PROG_BYTES))],
+                              [('tohost', TOHOST, 4, 0x11),
+                               ('console', CONSOLE, 4, 0x11)]))
+    res = run_job(Job(str(path), cycles=1000))
+    assert res.ok
+    assert res.cycles < 20
+    assert res.exit_code == 3
+    assert res.output == 'h\n'
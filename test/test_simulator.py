@@ -1,12 +1,13 @@
+import logging
 import pytest
 from pyv.module import Module
 from pyv.port import Input, Output, PortList, Wire
-from pyv.simulator import Simulator, _EventQueue
+from pyv.simulator import Event, Simulator, _ChangeQueue, _EventQueue, \
+    _LevelizedChangeQueue
 from pyv.reg import Reg
-from pyv.clocked import Clock
+from pyv.clocked import Clock, Clocked, MemList, RegList
 from collections import deque
-from queue import PriorityQueue
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 
 @pytest.fixture
@@ -124,49 +125,51 @@ class ExampleTop2(Module):
 
 class TestSimulator:
     def test_init(self, sim: Simulator):
-        assert sim._change_queue == deque([])
+        assert deque(sim._change_queue) == deque([])
         assert sim._cycles == 0
         assert Simulator.globalSim == sim
+        assert sim.ctx.sim is sim
 
-    def test_probes(self, sim: Simulator):
+    def test_probes(self, sim: Simulator, monkeypatch):
         dut = ExampleTop()
         dut.name = 'ExampleTop'
         dut._init()
-        PortList.filter = MagicMock()
+        monkeypatch.setattr(PortList, 'filter', MagicMock())
         sim.setProbes(['ExampleTop.inA', 'ExampleTop.B1_i'])
-        PortList.filter.assert_called_once_with(['ExampleTop.inA', 'ExampleTop.B1_i'])
+        PortList.filter.assert_called_once_with(
+            ['ExampleTop.inA', 'ExampleTop.B1_i'], sim.ctx)
 
     def test_queue(self, sim: Simulator):
         dut = ExampleTop()
         dut.name = 'ExampleTop'
         dut._init()
         # Clear pre-populated process queue; we want to test it in isolation here
-        sim._change_queue = deque()
+        sim._change_queue.clear()
         Clock.reset()
 
         dut.inA.write(42)
         dut.inB.write(43)
-        assert sim._change_queue == deque([dut.process, dut.A_i.process])
+        assert deque(sim._change_queue) == deque([dut.process, dut.A_i.process])
 
-        fn = sim._change_queue.popleft()
+        fn = sim._change_queue.pop()
         fn()
-        assert sim._change_queue == deque([dut.A_i.process])
+        assert deque(sim._change_queue) == deque([dut.A_i.process])
 
-        fn = sim._change_queue.popleft()
+        fn = sim._change_queue.pop()
         fn()
-        assert sim._change_queue == deque([dut.B1_i.process, dut.B2_i.process])
+        assert deque(sim._change_queue) == deque([dut.B1_i.process, dut.B2_i.process])
 
-        fn = sim._change_queue.popleft()
+        fn = sim._change_queue.pop()
         fn()
-        assert sim._change_queue == deque([dut.B2_i.process, dut.C_i.process])
+        assert deque(sim._change_queue) == deque([dut.B2_i.process, dut.C_i.process])
 
-        fn = sim._change_queue.popleft()
+        fn = sim._change_queue.pop()
         fn()
-        assert sim._change_queue == deque([dut.C_i.process])
+        assert deque(sim._change_queue) == deque([dut.C_i.process])
 
-        fn = sim._change_queue.popleft()
+        fn = sim._change_queue.pop()
         fn()
-        assert sim._change_queue == deque([])
+        assert deque(sim._change_queue) == deque([])
         assert dut.out.read() == 42 + 43
 
     def test_run(self, sim: Simulator):
@@ -250,18 +253,18 @@ class TestStep:
 
 class TestEventQueue:
     def test_init(self, eq: _EventQueue):
-        assert isinstance(eq._queue, PriorityQueue)
+        assert eq._queue == []
 
     def test_add_event(self, eq: _EventQueue):
         def callback():
             pass
 
-        eq.add_event(101, callback)
-        event = eq._queue.get(False)
-        time = event[0]
-        cb = event[2]
-        assert time == 101
-        assert cb == callback
+        handle = eq.add_event(101, callback)
+        event = eq.get_next_event()
+        assert event is handle
+        assert event.time == 101
+        assert event.callback == callback
+        assert event.period == 0
 
     def test_add_events_with_same_time(self, eq: _EventQueue):
         callback1 = MagicMock()
@@ -270,7 +273,7 @@ class TestEventQueue:
         eq.add_event(101, callback1)
         eq.add_event(101, callback2)
 
-        assert len(eq._queue.queue) == 2
+        assert eq._get_num_events() == 2
 
     def test_add_negative_time_event(self, eq: _EventQueue):
         with pytest.raises(Exception):
@@ -281,9 +284,9 @@ class TestEventQueue:
         eq.add_event(20, None)
         eq.add_event(3, None)
 
-        assert eq.get_next_event()[0] == 1
-        assert eq.get_next_event()[0] == 3
-        assert eq.get_next_event()[0] == 20
+        assert eq.get_next_event().time == 1
+        assert eq.get_next_event().time == 3
+        assert eq.get_next_event().time == 20
 
     def test_next_event_time(self, eq: _EventQueue):
         eq.add_event(42, None)
@@ -309,6 +312,53 @@ class TestEventQueue:
         with pytest.raises(Exception):
             eq.get_next_event()
 
+    def test_same_time_order(self, eq: _EventQueue):
+        callbacks = [MagicMock() for _ in range(10)]
+        for cb in callbacks:
+            eq.add_event(5, cb)
+
+        assert [eq.get_next_event().callback for _ in range(10)] == callbacks
+
+    def test_cancel(self, eq: _EventQueue):
+        e1 = eq.add_event(1, None)
+        e2 = eq.add_event(2, None)
+        e3 = eq.add_event(3, None)
+
+        e1.cancel()
+        e1.cancel()
+        assert e1.cancelled == True
+        assert eq._get_num_events() == 2
+        assert eq.next_event_time() == 2
+
+        e3.cancel()
+        assert eq._get_num_events() == 1
+        assert eq.get_next_event() is e2
+        assert eq.next_event_time() == -1
+        assert eq._get_num_events() == 0
+
+    def test_add_events(self, eq: _EventQueue):
+        eq.add_event(4, None)
+        handles = eq.add_events([(7, 'a'), (2, 'b'), (4, 'c')])
+        assert [e.time for e in handles] == [7, 2, 4]
+        assert eq._get_num_events() == 4
+
+        assert eq.get_next_event().callback == 'b'
+        assert eq.get_next_event().callback is None
+        assert eq.get_next_event().callback == 'c'
+        assert eq.get_next_event().callback == 'a'
+
+    def test_add_events_negative_time(self, eq: _EventQueue):
+        with pytest.raises(Exception):
+            eq.add_events([(3, None), (-1, None)])
+
+    def test_reschedule(self, eq: _EventQueue):
+        e = eq.add_event(3, None, 5)
+        assert eq.get_next_event() is e
+        eq.reschedule(e, 8)
+        assert eq.next_event_time() == 8
+        e.cancel()
+        assert eq.next_event_time() == -1
+
 
 class TestEvents:
     def test_event_queue_exists(self, sim: Simulator):
@@ -369,6 +419,82 @@ class TestEvents:
         callback4.assert_called_once()
         assert sim._event_queue.next_event_time() == -1
 
+    def test_post_returns_handle(self, sim: Simulator):
+        cb = MagicMock()
+        cb.__qualname__ = "cb"
+        e1 = sim.postEventAbs(3, cb)
+        e2 = sim.postEventRel(5, cb)
+        assert isinstance(e1, Event)
+        assert e2.time == 5
+
+        e1.cancel()
+        sim._cycles = 3
+        sim._process_events()
+        cb.assert_not_called()
+
+        sim._cycles = 5
+        sim._process_events()
+        cb.assert_called_once()
+
+    def test_post_events(self, sim: Simulator):
+        cbs = [MagicMock() for _ in range(3)]
+        for i, cb in enumerate(cbs):
+            cb.__qualname__ = f"cb{i}"
+        sim._cycles = 10
+
+        handles = sim.postEventsRel([(2, cbs[0]), (1, cbs[1])])
+        assert [e.time for e in handles] == [12, 11]
+        handles = sim.postEventsAbs([(11, cbs[2])])
+        assert handles[0].time == 11
+
+        order = []
+        for i, cb in enumerate(cbs):
+            cb.side_effect = lambda i=i: order.append(i)
+        sim._cycles = 11
+        sim._process_events()
+        sim._cycles = 12
+        sim._process_events()
+        assert order == [1, 2, 0]
+
+        with pytest.raises(Exception):
+            sim.postEventsAbs([(20, None), (5, None)])
+
+    def test_periodic_event(self, sim: Simulator):
+        cb = MagicMock()
+        cb.__qualname__ = "cb"
+        e = sim.postEventPeriodic(3, cb)
+        assert e.time == 3
+
+        sim.run(10)
+        assert cb.call_count == 3
+        assert e.time == 12
+
+        e.cancel()
+        sim.run(10, False)
+        assert cb.call_count == 3
+
+    def test_periodic_event_start(self, sim: Simulator):
+        cb = MagicMock()
+        cb.__qualname__ = "cb"
+        sim.postEventPeriodic(4, cb, start=1)
+        sim.run(6)
+        assert cb.call_count == 2
+
+    def test_periodic_event_cancel_in_callback(self, sim: Simulator):
+        cb = MagicMock()
+        cb.__qualname__ = "cb"
+        e = sim.postEventPeriodic(2, cb)
+        cb.side_effect = e.cancel
+        sim.run(10)
+        assert cb.call_count == 1
+        assert sim._event_queue._get_num_events() == 0
+
+    def test_invalid_periodic_event(self, sim: Simulator):
+        with pytest.raises(Exception):
+            sim.postEventPeriodic(0, None)
+        with pytest.raises(Exception):
+            sim.postEventPeriodic(2, None, start=0)
+
     def test_invalid_event_time(self, sim: Simulator):
         sim._cycles = 10
         with pytest.raises(Exception):
@@ -382,19 +508,460 @@ class TestOnStable:
     def test_stable_callbacks_are_triggered_during_cycle(self, sim: Simulator):
         cb1 = MagicMock()
         cb2 = MagicMock()
-        Simulator._stable_callbacks = [cb1, cb2]
+        sim.ctx.stable_callbacks = [cb1, cb2]
         sim._cycle()
         cb1.assert_called_once()
         cb2.assert_called_once()
 
     def test_stable_callbacks_are_cleared_on_sim_clear(self, sim: Simulator):
         sim.clear()
-        assert Simulator._stable_callbacks == []
+        assert sim.ctx.stable_callbacks == []
 
     def test_register_stable_callback(self, sim: Simulator):
         cb1 = MagicMock()
         cb2 = MagicMock()
         cb3 = MagicMock()
-        Simulator._stable_callbacks = [cb1, cb2]
+        sim.ctx.stable_callbacks = [cb1, cb2]
         Simulator.registerStableCallback(cb3)
-        assert Simulator._stable_callbacks == [cb1, cb2, cb3]
+        assert sim.ctx.stable_callbacks == [cb1, cb2, cb3]
+
+
+class TestChangeQueue:
+    def test_fifo_order(self):
+        def foo(): pass
+        def bar(): pass
+        def baz(): pass
+
+        q = _ChangeQueue()
+        q.add(foo)
+        q.add(bar)
+        q.add(baz)
+        assert list(q) == [foo, bar, baz]
+        assert q.pop() == foo
+        assert q.pop() == bar
+        assert q.pop() == baz
+        assert len(q) == 0
+
+    def test_no_duplicates(self):
+        def foo(): pass
+        def bar(): pass
+
+        q = _ChangeQueue()
+        assert q.add(foo) == True
+        assert q.add(bar) == True
+        assert q.add(foo) == False
+        assert list(q) == [foo, bar]
+        assert foo in q
+
+    def test_readd_after_pop(self):
+        def foo(): pass
+        def bar(): pass
+
+        q = _ChangeQueue()
+        q.add(foo)
+        q.add(bar)
+        q.pop()
+        assert foo not in q
+        assert q.add(foo) == True
+        assert list(q) == [bar, foo]
+
+    def test_bound_methods(self):
+        class Foo:
+            def process(self):
+                pass
+
+        a = Foo()
+        q = _ChangeQueue()
+        q.add(a.process)
+        assert q.add(a.process) == False
+        assert q.add(Foo().process) == True
+
+    def test_clear(self):
+        def foo(): pass
+
+        q = _ChangeQueue()
+        q.add(foo)
+        q.clear()
+        assert len(q) == 0
+        assert foo not in q
+
+    def test_add_all(self):
+        def foo(): pass
+        def bar(): pass
+        def baz(): pass
+
+        q = _ChangeQueue()
+        q.add(bar)
+        assert q.add_all((foo, bar, baz)) == 2
+        assert list(q) == [bar, foo, baz]
+        assert baz in q
+
+
+class TestLevelize:
+    def test_levelize(self, sim: Simulator):
+        dut = ExampleTop()
+        dut.name = 'ExampleTop'
+        dut._init()
+        info = sim.levelize()
+        assert info == {'methods': 5, 'cyclic': 0}
+        assert isinstance(sim._change_queue, _LevelizedChangeQueue)
+
+        Clock.reset()
+        dut.inA.write(42)
+        dut.inB.write(43)
+        sim.run_comb_logic()
+        assert dut.out.read() == 42 + 43
+
+        # Every method evaluated exactly once
+        stats = sim.getStats()
+        assert stats['levelized'] == True
+        assert stats['evals'] == 5
+        assert stats['fallbacks'] == 0
+
+    def test_same_result_as_dynamic(self, sim: Simulator):
+        dut = ExampleTop2()
+        dut.name = 'ExampleTop2'
+        dut._init()
+        sim.levelize()
+        sim.run(4)
+        assert dut.out.read() == -2225
+
+    def test_saves_reevaluations(self, sim: Simulator):
+        # A.outA is seen by C before B has updated C.inB, so the dynamic
+        # scheduler has to evaluate C twice.
+        class Diamond(Module):
+            def __init__(self):
+                super().__init__()
+                self.A_i = A()
+                self.B_i = B()
+                self.C_i = C()
+                self.C_i.inA << self.A_i.outA
+                self.B_i.inA << self.A_i.outB
+                self.C_i.inB << self.B_i.outA
+
+        dut = Diamond()
+        dut._init()
+        sim.run_comb_logic()
+
+        start = sim.getStats()
+        dut.A_i.inA.write(1)
+        dut.A_i.inB.write(2)
+        sim.run_comb_logic()
+        dyn = sim.getStats()
+        assert dut.C_i.outA.read() == 3
+        assert dyn['evals'] - start['evals'] == 4
+
+        sim.levelize()
+        start = sim.getStats()
+        dut.A_i.inA.write(3)
+        dut.A_i.inB.write(4)
+        sim.run_comb_logic()
+        lev = sim.getStats()
+        assert dut.C_i.outA.read() == 7
+        assert lev['evals'] - start['evals'] == 3
+        # Second trigger of C got absorbed, in addition to A's (both inputs)
+        assert lev['coalesced'] - start['coalesced'] == 2
+        assert lev['fallbacks'] == 0
+
+    def test_pending_methods_are_kept(self, sim: Simulator):
+        dut = ExampleTop()
+        dut.name = 'ExampleTop'
+        dut._init()
+        pending = set(sim._change_queue)
+        sim.levelize()
+        assert set(sim._change_queue) == pending
+
+
+class TestLevelizedChangeQueue:
+    def test_rank_order(self):
+        def foo(): pass
+        def bar(): pass
+        def baz(): pass
+
+        q = _LevelizedChangeQueue([foo, bar, baz])
+        q.add(baz)
+        q.add(foo)
+        q.add(bar)
+        assert q.add(foo) == False
+        assert list(q) == [foo, bar, baz]
+        assert q.pop() == foo
+        assert q.pop() == bar
+        assert q.pop() == baz
+        assert q.fallbacks == 0
+
+    def test_unknown_method(self):
+        def foo(): pass
+        def bar(): pass
+
+        q = _LevelizedChangeQueue([foo])
+        q.add(bar)
+        q.add(foo)
+        assert list(q) == [foo, bar]
+
+    def test_fallback(self):
+        def foo(): pass
+        def bar(): pass
+
+        q = _LevelizedChangeQueue([foo, bar])
+        q.add(bar)
+        assert q.pop() == bar
+        # bar triggers foo, which ranks before bar
+        q.add(foo)
+        assert q.pop() == foo
+        assert q.fallbacks == 1
+
+        # New pass
+        q.settled()
+        q.add(bar)
+        q.add(foo)
+        assert q.pop() == foo
+        assert q.pop() == bar
+        assert q.fallbacks == 1
+
+
+class Saturate(Module):
+    """Counts up to `limit`, then stays there. Input `add_i` is added on
+    top."""
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.add_i = Input(int)
+        self.cnt = Reg(int, 0)
+        self.cnt_w = Wire(int)
+        self.cnt_w << self.cnt.cur
+        self.out = Output(int)
+
+    def process(self):
+        cnt = self.cnt_w.read()
+        self.cnt.next.write(min(cnt + 1, self.limit))
+        self.out.write(cnt + self.add_i.read())
+
+
+class TestFastForward:
+    def test_skip_idle_cycles(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+        sim.run(100)
+        assert sim.getCycles() == 100
+        assert dut.out.read() == 5
+        assert sim.getStats()['skipped_cycles'] == 100 - 6
+
+    def test_same_state_as_full_run(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+        sim.fast_forward = False
+        sim.run(100)
+        assert sim.getStats()['skipped_cycles'] == 0
+        assert sim.getCycles() == 100
+        assert dut.out.read() == 5
+
+    def test_stop_at_events(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+
+        def cb():
+            dut.add_i.write(dut.add_i.read() + 10)
+        seen = []
+
+        sim.postEventAbs(50, cb)
+        sim.postEventAbs(70, cb)
+        sim.postEventAbs(70, lambda: seen.append(sim.getCycles()))
+        sim.run(100)
+        assert seen == [70]
+        assert dut.out.read() == 25
+        assert sim.getStats()['skipped_cycles'] == 100 - 6 - 2
+
+    @pytest.mark.parametrize('fast_forward', [False, True])
+    def test_stable_callbacks(self, sim: Simulator, fast_forward):
+        """Skipped cycles still call the "on stable" callbacks. A callback
+        that changes the design ends the skip."""
+        dut = Saturate(5)
+        dut._init()
+        seen = []
+        outs = []
+
+        def cb():
+            seen.append(sim.getCycles())
+            outs.append(dut.out.read())
+            if sim.getCycles() == 50:
+                dut.add_i.write(10)
+
+        Simulator.registerStableCallback(cb)
+        sim.fast_forward = fast_forward
+        sim.run(100)
+        assert seen == list(range(101))
+        assert outs == [0, 1, 2, 3, 4] + [5] * 46 + [15] * 50
+        skipped = sim.getStats()['skipped_cycles']
+        # Cycle 50 (woken up by the callback) and 51 are not skipped
+        assert skipped == (100 - 6 - 2 if fast_forward else 0)
+
+    def test_stable_callback_stops_run_until(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+
+        def cb():
+            if sim.getCycles() == 50:
+                sim.stop('cb')
+
+        Simulator.registerStableCallback(cb)
+        res = sim.run_until(max_cycles=100)
+        assert res.reason == 'cb'
+        assert sim.getCycles() == 50
+
+    def test_unknown_clocked_elements_are_never_idle(self, sim: Simulator):
+        class Foo(Clocked):
+            def __init__(self):
+                MemList.add_to_mem_list(self)
+
+            def _prepareNextVal(self):
+                pass
+
+            def _tick(self):
+                pass
+
+            def _reset(self):
+                pass
+
+        Foo()
+        sim.run(10)
+        assert sim.getStats()['skipped_cycles'] == 0
+
+
+class TestRunUntil:
+    def test_predicate(self, sim: Simulator):
+        dut = Saturate(50)
+        dut._init()
+        res = sim.run_until(lambda: dut.out.read() == 10)
+        assert res.reason == 'predicate'
+        assert res.cycles == 10
+        assert sim.getCycles() == 10
+        assert dut.out.read() == 10
+        assert res.wall_time > 0
+
+    def test_predicate_reason(self, sim: Simulator):
+        dut = Saturate(50)
+        dut._init()
+        res = sim.run_until(lambda: dut.out.read() == 3 and 'three')
+        assert res.reason == 'three'
+
+    def test_max_cycles(self, sim: Simulator):
+        dut = Saturate(50)
+        dut._init()
+        res = sim.run_until(lambda: False, max_cycles=20)
+        assert res.reason == 'max_cycles'
+        assert res.cycles == 20
+        assert dut.out.read() == 20
+
+        res = sim.run_until(max_cycles=5, reset_regs=False)
+        assert res.cycles == 5
+        assert sim.getCycles() == 25
+        assert dut.out.read() == 25
+
+    def test_stop(self, sim: Simulator):
+        dut = Saturate(50)
+        dut._init()
+        sim.postEventAbs(7, sim.stop)
+        sim.postEventAbs(9, lambda: sim.stop('foo'))
+        res = sim.run_until()
+        assert res.reason == 'stop'
+        assert res.cycles == 7
+        res = sim.run_until(reset_regs=False)
+        assert res.reason == 'foo'
+        assert sim.getCycles() == 9
+
+    def test_wall_time(self, sim: Simulator):
+        dut = Saturate(10**9)
+        dut._init()
+        res = sim.run_until(wall_time=0.05)
+        assert res.reason == 'wall_time'
+        assert res.wall_time >= 0.05
+        assert res.cycles > 0
+
+    def test_stop_during_tick_before_idle(self, sim: Simulator):
+        class StopOnTick(Clocked):
+            """Stops the simulation on its 3rd tick, then stays idle."""
+            def __init__(self):
+                RegList.add_to_reg_list(self)
+                self.ticks = 0
+
+            def _prepareNextVal(self):
+                pass
+
+            def _tick(self):
+                self.ticks += 1
+                if self.ticks == 3:
+                    sim.stop('tick')
+
+            def _reset(self):
+                pass
+
+            def _is_idle(self):
+                return self.ticks >= 3
+
+        dut = StopOnTick()
+        res = sim.run_until(max_cycles=1000)
+        assert res.reason == 'tick'
+        assert res.cycles == 3
+        assert dut.ticks == 3
+
+    def test_idle(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+        res = sim.run_until()
+        assert res.reason == 'idle'
+        assert res.cycles == 6
+        assert dut.out.read() == 5
+
+    def test_idle_skips_to_events(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+
+        def cb():
+            dut.add_i.write(dut.add_i.read() + 10)
+
+        sim.postEventAbs(500, cb)
+        res = sim.run_until(lambda: dut.out.read() == 15)
+        assert res.reason == 'predicate'
+        assert sim.getCycles() == 500
+        assert sim.getStats()['skipped_cycles'] == 500 - 6
+
+    def test_idle_with_budget(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+        res = sim.run_until(max_cycles=1000)
+        assert res.reason == 'max_cycles'
+        assert res.cycles == 1000
+
+
+class TestLogging:
+    def run_saturate(self, sim: Simulator):
+        dut = Saturate(50)
+        dut._init()
+        sim.postEventAbs(20, lambda: dut.add_i.write(100))
+        sim.run(40)
+        return dut.out.read(), sim.getStats()
+
+    def test_quiet_run_loop(self, sim: Simulator, caplog):
+        logging.disable()
+        quiet = self.run_saturate(sim)
+        assert caplog.records == []
+
+        logging.disable(logging.NOTSET)
+        Simulator.clear()
+        verbose = self.run_saturate(Simulator())
+        assert len(caplog.records) > 0
+        assert quiet == verbose
+        assert quiet[0] == 140
+
+    def test_no_port_reads_when_disabled(self, sim: Simulator):
+        dut = Saturate(5)
+        dut._init()
+        cls = type(dut.out)
+        with patch.object(cls, 'read', autospec=True,
+                          side_effect=cls.read) as read:
+            logging.disable()
+            sim.step()
+            assert dut.out not in [c.args[0] for c in read.call_args_list]
+            logging.disable(logging.NOTSET)
+            sim.step()
+            assert dut.out in [c.args[0] for c in read.call_args_list]
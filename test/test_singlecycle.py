@@ -1,7 +1,10 @@
+import sys
+
 import pytest
 
-from pyv.models.singlecycle import SingleCycle
+from pyv.models.singlecycle import SingleCycle, SingleCycleModel
 from pyv.simulator import Simulator
+from test.programs import loop_prog, make_model
 
 
 @pytest.fixture
@@ -118,3 +121,93 @@ class TestCSR:
         sim.run(2, False)
         assert core.regf.regs[5] == 0x4000_0100
         assert core.csr_unit.read(0x301) == 0x4000_0100
+
+
+class TestRunUntil:
+    @pytest.fixture
+    def model(self) -> SingleCycleModel:
+        return make_model(loop_prog())
+
+    def test_pc(self, model: SingleCycleModel):
+        res = model.run_until(pc=0x1c)
+        assert res.reason == 'pc'
+        assert model.readPC() == 0x1c
+        assert model.readReg(1) == 20
+        assert model.core.mem.mem[0x1000] == 0
+
+    def test_pc_or_predicate(self, model: SingleCycleModel):
+        res = model.run_until(lambda: model.readReg(1) == 5, pc=0x1c)
+        assert res.reason == 'predicate'
+        assert model.readReg(1) == 5
+
+    def test_mem_write(self, model: SingleCycleModel):
+        res = model.run_until(mem_write=0x1000)
+        assert res.reason == 'mem_write'
+        assert model.core.mem.mem[0x1000] == 20
+        assert model.readPC() == 0x20
+        assert model.core.mem._write_watches == []
+
+    def test_mem_write_before_idle_loop(self, model: SingleCycleModel):
+        # The store is directly followed by an idle self-loop
+        model.sim.fast_forward = True
+        res = model.run_until(mem_write=0x1000, max_cycles=1000)
+        assert res.reason == 'mem_write'
+        assert res.cycles < 100
+        assert model.core.mem.mem[0x1000] == 20
+        assert model.readPC() == 0x20
+
+    def test_idle(self, model: SingleCycleModel):
+        res = model.run_until(max_cycles=10)
+        assert res.reason == 'max_cycles'
+        res = model.run_until()
+        assert res.reason == 'idle'
+        assert model.readPC() == 0x20
+
+
+class TestInspect:
+    @pytest.fixture
+    def model(self) -> SingleCycleModel:
+        model = make_model(loop_prog())
+        model.run_until()
+        return model
+
+    def test_regs(self, model: SingleCycleModel):
+        regs = model.readRegs()
+        assert len(regs) == 32
+        assert regs[:3] == [0, 20, 20]
+        assert regs[5] == 0x1000
+        data = model.readRegsBytes()
+        assert len(data) == 128
+        assert data[4:12] == b'\x14\0\0\0\x14\0\0\0'
+
+    def test_data_mem(self, model: SingleCycleModel):
+        assert model.readDataBytes(0x1000, 4) == b'\x14\0\0\0'
+        assert model.readDataMem(0x1000, 2) == ['0x14', '0x0']
+        assert model.readDataWord(0x1000) == 20
+        assert model.readDataHalf(0x1a) == 0xfe20
+        assert model.readDataHalf(0x1a, signed=True) == 0xfe20 - (1 << 16)
+        view = model.viewDataMem(0x1000, 4)
+        assert view.readonly
+        assert bytes(view) == b'\x14\0\0\0'
+
+    def test_snapshot(self, model: SingleCycleModel):
+        state = model.snapshot()
+        assert state.pc == 0x20
+        assert state.cycles == model.getCycles()
+        assert state.regs[1] == 20
+        assert state.csrs == {0x301: 0x4000_0100}
+        assert state.mem[0][0x1000:0x1004] == b'\x14\0\0\0'
+
+    def test_arrays(self, model: SingleCycleModel):
+        np = pytest.importorskip('numpy')
+        regs = model.readRegsArray()
+        assert regs.dtype == np.uint32
+        assert list(regs[:3]) == [0, 20, 20]
+        words = model.readDataArray(0x1000, 8, '<u4')
+        assert list(words) == [20, 0]
+
+    def test_arrays_without_numpy(self, model: SingleCycleModel,
+                                  monkeypatch):
+        monkeypatch.setitem(sys.modules, 'numpy', None)
+        with pytest.raises(ImportError, match='NumPy'):
+            model.readRegsArray()
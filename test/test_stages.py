@@ -4,7 +4,7 @@ from pyv.csr import CSRUnit
 from pyv.simulator import Simulator
 from pyv.stages import IFStage, IDStage, EXStage, MEMStage, WBStage, BranchUnit, IFID_t, IDEX_t, EXMEM_t, MEMWB_t
 from pyv.reg import Regfile
-from pyv.util import MASK_32
+from pyv.util import MASK_32, is_immutable_type
 from pyv.mem import Memory
 
 
@@ -36,6 +36,22 @@ def test_data_types():
     attr_list = ['rd', 'we', 'alu_res', 'pc4', 'mem_rdata', 'wb_sel']
     check_attrs(foo, attr_list)
 
+    # Records are immutable port payloads
+    for typ in (IFID_t, IDEX_t, EXMEM_t, MEMWB_t):
+        assert is_immutable_type(typ)
+
+
+def test_record_eq():
+    a = EXMEM_t(rd=1, csr_write_val=2)
+    assert a == a
+    assert a == EXMEM_t(rd=1, csr_write_val=2)
+    assert a != EXMEM_t(rd=1, csr_write_val=3)
+    assert a != EXMEM_t(rd=2, csr_write_val=2)
+    assert a != MEMWB_t(rd=1, csr_write_val=2)
+    assert IFID_t(1, 2) != (1, 2)
+    with pytest.raises(TypeError):
+        hash(a)
+
 
 # ---------------------------------------
 # Test FETCH
@@ -699,6 +715,52 @@ class TestIDStage:
             we=1
         )
 
+    def test_decode_cache(self, sim: Simulator, decode: IDStage):
+        # addi x1, x1, 1
+        decode.regfile.regs[1] = 5
+        decode.IFID_i.write(IFID_t(0x00108093, 0x80000004))
+        sim.run_comb_logic()
+        assert decode.getDecodeStats() == {
+            'hits': 0, 'misses': 1, 'size': 1, 'max_size': 4096}
+
+        # Cached static fields, register reads stay dynamic
+        decode.regfile.regs[1] = 7
+        decode.IFID_i.write(IFID_t(0x00108093, 0x80000008))
+        sim.run_comb_logic()
+        out = decode.IDEX_o.read()
+        assert (out.rs1, out.imm, out.rd, out.pc) == (7, 1, 1, 0x80000008)
+        assert decode.getDecodeStats()['hits'] == 1
+
+        # CSR reads stay dynamic: csrrs x5, misa, x12
+        decode.regfile.regs[12] = 0
+        for pc, val in ((0x80000004, 0x42), (0x80000008, 0x43)):
+            decode.csr.csr_bank.csrs[0x301]._csr_reg.cur.write(val)
+            decode.IFID_i.write(IFID_t(0x301622f3, pc))
+            sim.run_comb_logic()
+            assert decode.IDEX_o.read().csr_read_val == val
+        assert decode.getDecodeStats()['misses'] == 2
+
+        decode.clearDecodeCache()
+        assert decode.getDecodeStats() == {
+            'hits': 0, 'misses': 0, 'size': 0, 'max_size': 4096}
+
+    def test_decode_cache_size(self, sim: Simulator):
+        decode = IDStage(Regfile(), CSRUnit(), decode_cache_size=2)
+        decode._init()
+        insts = (0x00108093, 0x00208093, 0x00308093, 0x00308093)
+        for pc, inst in enumerate(insts):
+            decode.IFID_i.write(IFID_t(inst, 4 * pc))
+            sim.run_comb_logic()
+            assert decode.IDEX_o.read().imm == inst >> 20
+        assert list(decode._decode_cache) == [0x00208093, 0x00308093]
+        assert decode.getDecodeStats()['hits'] == 1
+
+        decode = IDStage(Regfile(), CSRUnit(), decode_cache_size=0)
+        decode._init()
+        decode.IFID_i.write(IFID_t(0x00108093, 0))
+        sim.run_comb_logic()
+        assert decode.getDecodeStats()['size'] == 0
+
 
 # ---------------------------------------
 # Test EXECUTE
@@ -731,6 +793,9 @@ class TestEXStage:
 
         sim.step()
 
+        # The record is written once per input change
+        assert sim.getStats()['evals'] == 1
+
         out = ex.EXMEM_o.read()
         assert out.rd == 1
         assert out.we == 1
@@ -1806,7 +1871,7 @@ class TestMEMStage:
             funct3=1  # sh
         ))
         sim.step()
-        assert mem.mem[0:2] == [0xbe, 0xba]
+        assert list(mem.mem[0:2]) == [0xbe, 0xba]
 
         # SW
         mem_stage.EXMEM_i.write(EXMEM_t(
@@ -1816,7 +1881,7 @@ class TestMEMStage:
             funct3=2  # sw
         ))
         sim.step()
-        assert mem.mem[0:4] == [0xbe, 0xba, 0xad, 0xab]
+        assert list(mem.mem[0:4]) == [0xbe, 0xba, 0xad, 0xab]
 
     def test_exception(self, mem_stage, caplog, sim):
         mem_stage._init()
@@ -1,5 +1,8 @@
 import pytest
-from pyv.util import VContainer, getBit, getBits, getBitVector, VMap, PyVObj, VArray
+from dataclasses import dataclass
+from enum import Enum
+from pyv.util import VContainer, getBit, getBits, getBitVector, VMap, PyVObj, VArray, \
+    immutable, is_immutable_type, obj_attrs
 from unittest.mock import MagicMock
 from pyv.module import Module
 from pyv.port import Input
@@ -26,14 +29,60 @@ def test_getBitVector():
         assert getBitVector(0x39, 4) == [1, 0, 0, 1]
 
 
+def test_is_immutable_type():
+    @dataclass
+    class Mutable:
+        a: int = 0
+
+    @dataclass(frozen=True)
+    class Frozen:
+        a: int = 0
+
+    @immutable
+    @dataclass(slots=True)
+    class Record:
+        a: int = 0
+
+    # The declaration is not inherited
+    @dataclass
+    class MutableRecord(Record):
+        b: list = None
+
+    class Color(Enum):
+        RED = 1
+
+    for typ in (int, bool, float, str, bytes, Frozen, Record, Color):
+        assert is_immutable_type(typ)
+    for typ in (list, dict, Mutable, MutableRecord, object):
+        assert not is_immutable_type(typ)
+
+
+class Obj(PyVObj):
+    """A PyVObj with a `__dict__` (PyVObj itself is slotted)."""
+
+
+def test_obj_attrs():
+    class Slotted(PyVObj):
+        __slots__ = ('a', 'b')
+
+    s = Slotted()
+    s.a = 1
+    assert obj_attrs(s) == {'name': 'noName', '_visited': False,
+                            '_ctx': s._ctx, 'a': 1}
+
+    o = Obj()
+    o.x = 2
+    assert list(obj_attrs(o)) == ['name', '_visited', '_ctx', 'x']
+
+
 class TestVContainer:
     class DUT_Container(VContainer):
         def __init__(self):
             super().__init__()
 
-            self.obj1 = PyVObj()
+            self.obj1 = Obj()
             self.obj1._init = MagicMock()
-            self.obj2 = PyVObj()
+            self.obj2 = Obj()
             self.obj2._init = MagicMock()
             self.A_i = Input(int)
 
@@ -77,9 +126,9 @@ class TestVContainer:
 class TestVMap:
     @pytest.fixture
     def map(self) -> VMap:
-        obj1 = PyVObj()
+        obj1 = Obj()
         obj1._init = MagicMock()
-        obj2 = PyVObj()
+        obj2 = Obj()
         obj2._init = MagicMock()
         map_ = VMap({'foo': obj1, 'bar': obj2})
         return map_
@@ -151,9 +200,9 @@ class TestVMap:
 class TestVArray:
     @pytest.fixture
     def arr(self) -> VArray:
-        obj1 = PyVObj()
+        obj1 = Obj()
         obj1._init = MagicMock()
-        obj2 = PyVObj()
+        obj2 = Obj()
         obj2._init = MagicMock()
         arr_ = VArray(obj1, obj2)
         return arr_
@@ -0,0 +1,167 @@
+import gzip
+from dataclasses import dataclass
+
+import pytest
+
+from pyv.module import Module
+from pyv.port import Input, Output, Wire
+from pyv.reg import Reg
+from pyv.simulator import Simulator
+from pyv.vcd import VCDWriter, _id_code
+
+
+@dataclass
+class Pair:
+    a: int = 0
+    b: bool = False
+
+
+class Counter(Module):
+    """Counts up to `limit`, then stays there."""
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+        self.cnt = Reg(int, 0)
+        self.cnt_w = Wire(int)
+        self.cnt_w << self.cnt.cur
+        self.full_o = Output(bool)
+        self.pair_o = Output(Pair)
+        self.obj_i = Input(object)
+
+    def process(self):
+        cnt = self.cnt_w.read()
+        self.cnt.next.write(min(cnt + 1, self.limit))
+        self.full_o.write(cnt == self.limit)
+        self.pair_o.write(Pair(cnt * 2, cnt % 2 == 1))
+
+
+def make_counter(limit=3):
+    dut = Counter(limit)
+    dut.name = 'top'
+    dut._init()
+    return dut
+
+
+def parse(text: str):
+    """Returns `(vars, changes)`: `vars` maps names to codes, `changes` maps
+    times to lists of `(code, value)`."""
+    header, _, body = text.partition('$enddefinitions $end\n')
+    scope = []
+    vars = {}
+    for line in header.splitlines():
+        tok = line.split()
+        if tok[0] == '$scope':
+            scope.append(tok[2])
+        elif tok[0] == '$upscope':
+            scope.pop()
+        elif tok[0] == '$var':
+            vars['.'.join(scope + [tok[4]])] = (tok[3], tok[2])
+
+    changes = {}
+    t = None
+    for line in body.splitlines():
+        if line.startswith('#'):
+            t = int(line[1:])
+            changes[t] = []
+        elif line.startswith('$'):
+            continue
+        elif line[0] in 'brs':
+            val, code = line[1:].split()
+            changes[t].append((code, val))
+        else:
+            changes[t].append((line[1:], line[0]))
+    return vars, changes
+
+
+def test_id_codes():
+    codes = [_id_code(i) for i in range(10000)]
+    assert codes[0] == '!'
+    assert len(set(codes)) == len(codes)
+    assert all(33 <= ord(c) <= 126 for code in codes for c in code)
+
+
+def test_trace(sim: Simulator, tmp_path, caplog):
+    make_counter()
+    path = tmp_path / 'wave.vcd'
+    vcd = sim.trace_vcd(str(path))
+    assert "Not recording top.obj_i" in caplog.text
+    sim.run(10)
+    vcd.close(sim.getCycles())
+
+    vars, changes = parse(path.read_text())
+    cnt = vars['top.cnt.cur'][0]
+    # Connected ports share an identifier code
+    assert vars['top.cnt_w'][0] == cnt
+    assert vars['top.cnt.cur'][1] == '32'
+    assert vars['top.full_o'][1] == '1'
+    assert 'top.pair_o.a' in vars and 'top.pair_o.b' in vars
+    assert 'top.obj_i' not in vars
+
+    # Only changes are recorded
+    assert sorted(changes) == [0, 1, 2, 3, 10]
+    assert changes[10] == []
+    assert (cnt, '11') in changes[3]
+    assert (vars['top.full_o'][0], '1') in changes[3]
+    assert (vars['top.pair_o.a'][0], '110') in changes[3]
+    assert (vars['top.pair_o.b'][0], '0') in changes[2]
+    assert len(changes[0]) == len(set(code for code, _ in vars.values()))
+
+    # Writer is unregistered on close
+    assert sim.ctx.stable_callbacks == []
+
+
+def test_probes(sim: Simulator, tmp_path):
+    make_counter()
+    path = tmp_path / 'wave.vcd'
+    with sim.trace_vcd(str(path), ['full', 'pair_o']):
+        sim.run(5)
+    vars, _ = parse(path.read_text())
+    assert sorted(vars) == ['top.full_o', 'top.pair_o.a', 'top.pair_o.b']
+
+    sim.setProbes(['cnt.cur'])
+    with sim.trace_vcd(str(path)):
+        sim.run(5)
+    vars, _ = parse(path.read_text())
+    assert list(vars) == ['top.cnt.cur']
+
+
+@pytest.mark.parametrize("kwargs", [
+    {'threaded': True, 'buffer_size': 10},
+    {'buffer_size': 1},
+    {'int_width': 8},
+])
+def test_options(sim: Simulator, tmp_path, kwargs):
+    make_counter(300)
+    ref = tmp_path / 'ref.vcd'
+    path = tmp_path / 'wave.vcd'
+    with sim.trace_vcd(str(ref)), sim.trace_vcd(str(path), **kwargs):
+        sim.run(400)
+
+    ref_vars, ref_changes = parse(ref.read_text())
+    vars, changes = parse(path.read_text())
+    assert vars.keys() == ref_vars.keys()
+    if 'int_width' in kwargs:
+        cnt = vars['top.cnt.cur'][0]
+        assert vars['top.cnt.cur'][1] == '8'
+        assert (cnt, bin(299 & 0xff)[2:]) in changes[299]
+    else:
+        assert changes == ref_changes
+
+
+def test_gzip(sim: Simulator, tmp_path):
+    make_counter()
+    path = tmp_path / 'wave.vcd.gz'
+    with sim.trace_vcd(str(path)):
+        sim.run(5)
+    with gzip.open(path, 'rt') as f:
+        vars, changes = parse(f.read())
+    assert 'top.cnt.cur' in vars
+    assert sorted(changes) == [0, 1, 2, 3]
+
+
+def test_duplicate_names(tmp_path):
+    dut = make_counter()
+    path = tmp_path / 'wave.vcd'
+    VCDWriter(str(path), [dut.full_o, dut.full_o]).close()
+    vars, _ = parse(path.read_text())
+    assert sorted(vars) == ['top.full_o', 'top.full_o_1']